@@ -0,0 +1,192 @@
+import math
+import queue
+import threading
+import time
+from itertools import count
+from typing import Any, Callable, Optional, Set
+
+import capabilities.actions as actionOps
+from capabilities.actions import ActionCancelled
+from capabilities.navigation import Navigation
+from models.type import ActionState
+
+# Emergencies that preempt a running preemptible action.
+LOW_AIR_PREEMPT = 200.0
+MELEE_RANGE = 3.0
+# How often a paused action re-checks cancellation, its deadline and emergencies.
+PAUSE_SLICE = 0.05
+# Channels released after an action was interrupted.
+RELEASE_CHANNELS = ("move", "turn", "jump", "pitch", "attack", "use", "crouch")
+
+
+class ActionHandle:
+    # Completion future for one scheduled action. Cancellation is cooperative: it takes
+    # effect at the action's next pause().
+
+    def __init__(self, actionId: int, name: str, preemptible: bool = True, timeout: Optional[float] = None,
+                 after: Optional["ActionHandle"] = None):
+        self.id = actionId
+        self.name = name
+        self.preemptible = preemptible
+        self.after = after
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.state = ActionState.PENDING
+        self.reason = None
+        self._result = None
+        self._error = None
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._emergencies: Callable[[], Set[str]] = set
+        # Emergencies already present when the action started; it was chosen with them
+        # in view (fleeing, sheltering), so only new ones interrupt it.
+        self._known: Set[str] = set()
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def cancel(self, reason: str = "cancelled") -> bool:
+        if self.done():
+            return False
+        self.reason = reason
+        self._cancel.set()
+        return True
+
+    def succeeded(self) -> bool:
+        # The same test MeTTa applies: None and an empty list both arrive there as ().
+        return self.state == ActionState.DONE and self._result is not None and self._result != []
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def result(self, timeout: Optional[float] = None):
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"{self.name} still running after {timeout}s")
+        if self.state == ActionState.FAILED:
+            raise self._error
+        return self._result
+
+    def _stopReason(self) -> Optional[str]:
+        if self._cancel.is_set():
+            return self.reason
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return "timed out"
+        if self.preemptible:
+            for reason in self._emergencies():
+                if reason not in self._known:
+                    return reason
+        return None
+
+    def pause(self, seconds: float):
+        end = time.monotonic() + seconds
+        while True:
+            reason = self._stopReason()
+            if reason is not None:
+                self.reason = reason
+                raise ActionCancelled(reason)
+            left = end - time.monotonic()
+            if left <= 0:
+                return
+            self._cancel.wait(min(left, PAUSE_SLICE))
+
+    def _finish(self, state: ActionState, result=None, error=None):
+        self.state = state
+        self._result = result
+        self._error = error
+        self._done.set()
+
+
+class ActionScheduler:
+    # Runs actions one at a time on a worker thread, since they all drive the same body,
+    # and hands back an ActionHandle immediately. Submitting with preempt=True cancels
+    # whatever is running; a preemptible action is also interrupted when the latest
+    # observation shows low air or a hostile in melee range that was not already there
+    # when it started. An action submitted with
+    # after= only runs if that action succeeded, so a sequence can be queued up front.
+
+    def __init__(self, env):
+        self.env = env
+        self.running: Optional[ActionHandle] = None
+        self._queue = queue.Queue()
+        self._ids = count(1)
+        self._thread = None
+
+    def _ensureWorker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="action-scheduler", daemon=True)
+            self._thread.start()
+
+    def submit(self, name: str, fn: Callable[[], Any], preemptible: bool = True,
+               timeout: Optional[float] = None, preempt: bool = False,
+               after: Optional[ActionHandle] = None) -> ActionHandle:
+        handle = ActionHandle(next(self._ids), name, preemptible, timeout, after)
+        handle._emergencies = self.emergencies
+        if preempt:
+            self.cancelAll(f"preempted by {name}")
+        self._queue.put((handle, fn))
+        self._ensureWorker()
+        return handle
+
+    def cancelAll(self, reason: str = "cancelled"):
+        pending = []
+        while True:
+            try:
+                pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for handle, _ in pending:
+            handle.cancel(reason)
+            handle._finish(ActionState.CANCELLED)
+        running = self.running
+        if running is not None:
+            running.cancel(reason)
+
+    def emergencies(self) -> Set[str]:
+        frame = self.env.poller.latest
+        found = set()
+        if frame is None:
+            return found
+        air = frame.get("getAir")
+        if air is not None and float(air) < LOW_AIR_PREEMPT:
+            found.add("low air")
+        pos = frame.get("getAgentPos")
+        if pos:
+            for e in frame.get("getNearEntities", []):
+                if str(e.get("name", "")).lower() in Navigation.hostileEntities and math.dist(
+                    (e.get("x", 0), e.get("y", 0), e.get("z", 0)), pos[:3]
+                ) <= MELEE_RANGE:
+                    found.add("hostile in melee range")
+                    break
+        return found
+
+    def _release(self):
+        self.env.commands.stop(RELEASE_CHANNELS)
+
+    def _run(self):
+        while True:
+            handle, fn = self._queue.get()
+            if handle.done():
+                continue
+            if handle._cancel.is_set():
+                handle._finish(ActionState.CANCELLED)
+                continue
+            if handle.after is not None and not handle.after.succeeded():
+                handle.reason = f"{handle.after.name} did not succeed"
+                handle._finish(ActionState.CANCELLED)
+                continue
+            self.running = handle
+            handle.state = ActionState.RUNNING
+            handle._known = self.emergencies() if handle.preemptible else set()
+            actionOps._running.handle = handle
+            try:
+                handle._finish(ActionState.DONE, fn())
+            except ActionCancelled:
+                print(f"Action {handle.name} interrupted: {handle.reason}")
+                self._release()
+                handle._finish(ActionState.CANCELLED)
+            except Exception as e:
+                print(f"Action {handle.name} failed: {e}")
+                handle._finish(ActionState.FAILED, error=e)
+            finally:
+                actionOps._running.handle = None
+                self.running = None
+                self.env.invalidateObservation()
@@ -0,0 +1,124 @@
+import threading
+from contextlib import contextmanager
+
+# Continuous controls: each holds its last value until told otherwise, so sending the
+# same value again changes nothing in the game.
+CONTROL_CHANNELS = ("move", "strafe", "turn", "pitch", "jump", "crouch", "attack", "use", "sprint")
+
+
+def formatValue(value) -> str:
+    # Values are quantized to hundredths so that controllers recomputing a speed every
+    # tick do not resend it for noise.
+    try:
+        number = round(float(value), 2)
+    except (TypeError, ValueError):
+        return str(value)
+    if number == int(number):
+        return str(int(number))
+    return f"{number:g}"
+
+
+class CommandChannels:
+    # Output layer in front of RobustObserver.sendCommand. It remembers the last value
+    # sent on every control channel and drops sends that would not change it. Inside
+    # batch(), channel updates are only staged; when the batch ends, each changed
+    # channel is sent once with its final value. Batches are per thread, so one thread
+    # closing its batch never sends what another has staged. Other commands (chat,
+    # inventory) pass straight through, after anything the same thread has staged.
+    # While a thread holds takeover(), control values from every other thread are
+    # dropped, judged by the thread that set them.
+
+    def __init__(self, env):
+        self.env = env
+        self.sentValues = {}
+        self.sent = 0
+        self.dropped = 0
+        self.suppressed = 0
+        self._local = threading.local()
+        self._owner = None
+        self._lock = threading.RLock()
+
+    @property
+    def staged(self):
+        # Values staged by the calling thread's open batch: channel -> (value, thread).
+        staged = getattr(self._local, "staged", None)
+        if staged is None:
+            staged = self._local.staged = {}
+        return staged
+
+    @property
+    def _depth(self):
+        return getattr(self._local, "depth", 0)
+
+    def send(self, command: str):
+        parts = command.split(None, 1)
+        if len(parts) == 2 and parts[0] in CONTROL_CHANNELS:
+            self.set(parts[0], parts[1])
+            return
+        with self._lock:
+            self._flushStaged()
+            self.env.rob.sendCommand(command)
+            self.sent += 1
+
+    def set(self, channel: str, value):
+        value = formatValue(value)
+        thread = threading.get_ident()
+        if self._depth:
+            self.staged[channel] = (value, thread)
+            return
+        with self._lock:
+            self._emit(channel, value, thread)
+
+    def _emit(self, channel, value, thread):
+        if self._owner is not None and self._owner != thread:
+            self.suppressed += 1
+            return
+        if self.sentValues.get(channel) == value:
+            self.dropped += 1
+            return
+        self.sentValues[channel] = value
+        self.env.rob.sendCommand(f"{channel} {value}")
+        self.sent += 1
+
+    def _flushStaged(self):
+        staged, self._local.staged = self.staged, {}
+        for channel, (value, thread) in staged.items():
+            self._emit(channel, value, thread)
+
+    @contextmanager
+    def batch(self):
+        self._local.depth = self._depth + 1
+        try:
+            yield self
+        finally:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                with self._lock:
+                    self._flushStaged()
+
+    def stop(self, channels=("move", "turn", "jump", "pitch")):
+        with self.batch():
+            for channel in channels:
+                self.set(channel, 0)
+
+    @contextmanager
+    def takeover(self):
+        # Gives the calling thread sole use of the control channels, e.g. for a reflex
+        # overriding a running action, and stops every channel when it hands them back.
+        # What was sent before is then forgotten, so whoever takes over next is not
+        # deduplicated against values from before the takeover.
+        with self._lock:
+            self._owner = threading.get_ident()
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self.stop([c for c, v in self.sentValues.items() if v != "0"])
+                self._owner = None
+                self.reset()
+
+    def reset(self):
+        # Forget what was sent, e.g. after reconnecting or respawning, so the next
+        # values go out. Batches still open keep what they staged.
+        with self._lock:
+            self.sentValues.clear()
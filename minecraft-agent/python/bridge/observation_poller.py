@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from capabilities.entity_tracker import EntityTracker
+from capabilities.observation import DEFAULT_PROFILE, PROFILES, cropGrid
+from models.type import ObservationFrame
+
+POLL_HZ = float(os.getenv("OPENPSI_POLL_HZ", "20"))
+FRAME_BUFFER_SIZE = 8
+
+
+def gridSize(bounds):
+    return (bounds[0][1] - bounds[0][0] + 1) * (bounds[1][1] - bounds[1][0] + 1) * (bounds[2][1] - bounds[2][0] + 1)
+
+
+class ObservationPoller:
+    # Polls Vereya on a background thread into a small ring buffer of timestamped
+    # frames. Readers take `latest` (a single reference swap, so no lock on the read
+    # path); controllers that need a frame newer than the one they acted on wait on a
+    # condition that is notified per frame. Without a running thread every observe()
+    # polls synchronously, as before.
+
+    def __init__(self, env, rateHz: float = POLL_HZ, capacity: int = FRAME_BUFFER_SIZE):
+        self.env = env
+        self.period = 1.0 / rateHz
+        self.frames = deque(maxlen=capacity)
+        self.latest: Optional[ObservationFrame] = None
+        self.lock = threading.RLock()
+        self._newFrame = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self._seq = 0
+        self._profileSeq = 0
+        self.profile = PROFILES[DEFAULT_PROFILE]
+        self.recorder = None
+        self.tracker = EntityTracker()
+        self._dead = False
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="observation-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def setProfile(self, name):
+        # Frames polled under the previous profile are not handed out afterwards. Taking
+        # the lock keeps a poll that is under way from numbering its frame past the switch.
+        profile = PROFILES[name]
+        with self.lock:
+            self.profile = profile
+            self._profileSeq = self._seq
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Observation poll failed: {e}")
+            self._stop.wait(max(0.0, self.period - (time.monotonic() - started)))
+
+    def poll(self) -> ObservationFrame:
+        env = self.env
+        food = worldTime = actionStatus = None
+        with self.lock:
+            profile = self.profile
+            env.rob.observeProcCached()
+            values = {key: env.rob.getCachedObserve(key) for key in profile.keys}
+            if profile.fullStats:
+                food = env.mc.getFullStat("Food")
+                worldTime = env.mc.getFullStat("WorldTime")
+                actionStatus = env.mc.getActionStatus()
+            self._seq += 1
+            bounds = env.grid_bounds
+            rawGrid = values.get("getNearGrid")
+            if rawGrid and profile.bounds and len(rawGrid) == gridSize(bounds):
+                values["getNearGrid"] = cropGrid(rawGrid, bounds, profile.bounds)
+                bounds = profile.bounds
+            frame = ObservationFrame(
+                seq=self._seq,
+                timestamp=time.time(),
+                values=values,
+                food=float(food) if food is not None else None,
+                worldTime=int(worldTime) if worldTime is not None else None,
+                actionStatus=actionStatus,
+                bounds=bounds,
+                profile=profile.name,
+            )
+
+            # Still under the lock: a synchronous poll from observe() on another thread
+            # must not update the tracker or write the recording at the same time.
+            if "getNearEntities" in profile.keys:
+                self.tracker.update(values.get("getNearEntities"), frame.timestamp)
+            self._checkLife(values.get("getLife"))
+            self.frames.append(frame)
+            self.latest = frame
+            if self.recorder is not None:
+                self.recorder.append(frame)
+        with self._newFrame:
+            self._newFrame.notify_all()
+        return frame
+
+    def _checkLife(self, life):
+        # Dying and respawning release every control in the game, so the command
+        # channels forget what they sent, both when life drops to zero and when it is back.
+        if life is None:
+            return
+        dead = float(life) <= 0
+        if dead != self._dead:
+            self._dead = dead
+            print("Agent died." if dead else "Agent respawned.")
+            self.env.commands.reset()
+
+    def observe(self, newerThan: Optional[int] = None, timeout: float = 0.25) -> ObservationFrame:
+        if not self.running:
+            return self.poll()
+
+        floor = max(newerThan or 0, self._profileSeq)
+        frame = self.latest
+        if self._usable(frame, floor):
+            return frame
+        with self._newFrame:
+            self._newFrame.wait_for(lambda: self._usable(self.latest, floor), timeout)
+        frame = self.latest
+        return frame if self._usable(frame, self._profileSeq) else self.poll()
+
+    def waitForFrame(self, newerThan: Optional[int] = None, timeout: float = 0.25) -> Optional[ObservationFrame]:
+        # The first frame polled after newerThan, under any profile, or None after
+        # timeout. Unlike observe() this never polls itself, so a background reader
+        # does not touch the socket when the thread is not running.
+        floor = newerThan or 0
+        with self._newFrame:
+            self._newFrame.wait_for(lambda: self.latest is not None and self.latest.seq > floor, timeout)
+        frame = self.latest
+        return frame if frame is not None and frame.seq > floor else None
+
+    def _usable(self, frame, floor):
+        return frame is not None and frame.seq > floor and frame.profile == self.profile.name
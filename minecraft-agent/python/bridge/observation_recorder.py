@@ -0,0 +1,262 @@
+import json
+import math
+import os
+import threading
+import types
+from pathlib import Path
+
+import numpy as np
+
+from capabilities.block_summary import BlockSummarizer
+from capabilities.world_map import WorldMap
+from models.type import ObservationFrame
+import capabilities.observation as observationOps
+
+# Directory to record observation frames into; recording is off when unset.
+RECORD_PATH = os.getenv("OPENPSI_RECORD")
+FLUSH_EVERY = 20
+
+# One fixed-size row per frame. Missing values are NaN / -1; the variable-length
+# parts (entities, inventory, line of sight, action status) are JSON in extras.bin and
+# the grid is a row of grids.idx.
+FRAME_DTYPE = np.dtype([
+    ("seq", "<i8"),
+    ("timestamp", "<f8"),
+    ("pose", "<f8", (5,)),
+    ("life", "<f4"),
+    ("food", "<f4"),
+    ("air", "<f4"),
+    ("onGround", "i1"),
+    ("worldTime", "<i8"),
+    ("grid", "<i4"),
+    ("extraOffset", "<i8"),
+    ("extraLength", "<i4"),
+])
+# Grids are stored once per change as uint16 palette ids in grids.bin.
+GRID_DTYPE = np.dtype([
+    ("offset", "<i8"),
+    ("length", "<i4"),
+    ("bounds", "<i4", (6,)),
+])
+EXTRA_KEYS = ("getNearEntities", "getInventory", "getLineOfSights")
+
+
+def _num(value):
+    return float("nan") if value is None else float(value)
+
+
+def _opt(value):
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+class ObservationRecorder:
+    # Appends ObservationFrames to a columnar recording directory. A grid is written
+    # only when it differs from the previous one, and block names are interned into a
+    # shared palette, so a long session costs a fixed-size row plus a little JSON per
+    # frame. Frames may come from the poller thread and from a synchronous poll at the
+    # same time; a lock keeps each frame's writes together.
+
+    def __init__(self, path, timeStart=0):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        meta = self.path / "meta.json"
+        if not meta.exists():
+            meta.write_text(json.dumps({"version": 1, "timeStart": int(timeStart or 0)}))
+
+        paletteFile = self.path / "palette.txt"
+        self.palette = paletteFile.read_text().splitlines() if paletteFile.exists() else []
+        self.paletteIds = {name: i for i, name in enumerate(self.palette)}
+        self.gridCount = (self.path / "grids.idx").stat().st_size // GRID_DTYPE.itemsize \
+            if (self.path / "grids.idx").exists() else 0
+
+        self._frames = open(self.path / "frames.bin", "ab")
+        self._extras = open(self.path / "extras.bin", "ab")
+        self._grids = open(self.path / "grids.bin", "ab")
+        self._gridIndex = open(self.path / "grids.idx", "ab")
+        self._paletteFile = open(paletteFile, "a")
+        self._lastGrid = None
+        self._lastBounds = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _intern(self, name):
+        blockId = self.paletteIds[name] = len(self.palette)
+        self.palette.append(name)
+        self._paletteFile.write(f"{name}\n")
+        return blockId
+
+    def _writeGrid(self, rawGrid, bounds):
+        ids = self.paletteIds
+        for name in set(rawGrid).difference(ids):
+            self._intern(name)
+        encoded = np.array([ids[name] for name in rawGrid], dtype=np.uint16)
+        row = np.zeros(1, dtype=GRID_DTYPE)
+        row["offset"] = self._grids.tell() // 2
+        row["length"] = len(encoded)
+        row["bounds"] = [v for axis in bounds for v in axis]
+        self._grids.write(encoded.tobytes())
+        self._gridIndex.write(row.tobytes())
+        self.gridCount += 1
+
+    def append(self, frame: ObservationFrame):
+        with self._lock:
+            self._append(frame)
+
+    def _append(self, frame: ObservationFrame):
+        rawGrid = frame.get("getNearGrid")
+        bounds = frame.bounds
+        if rawGrid and (bounds != self._lastBounds or rawGrid is not self._lastGrid and rawGrid != self._lastGrid):
+            self._writeGrid(rawGrid, bounds)
+            self._lastGrid = rawGrid
+            self._lastBounds = [list(axis) for axis in bounds]
+
+        extra = {key: frame.get(key) for key in EXTRA_KEYS}
+        extra["actionStatus"] = frame.actionStatus
+        extra["profile"] = frame.profile
+        data = json.dumps(extra, separators=(",", ":"), default=str).encode()
+
+        row = np.zeros(1, dtype=FRAME_DTYPE)
+        pose = frame.get("getAgentPos")
+        row["seq"] = frame.seq
+        row["timestamp"] = frame.timestamp
+        row["pose"] = [_num(v) for v in pose[:5]] if pose else [math.nan] * 5
+        row["life"] = _num(frame.get("getLife"))
+        row["food"] = _num(frame.food)
+        row["air"] = _num(frame.get("getAir"))
+        onGround = frame.get("getOnGround")
+        row["onGround"] = -1 if onGround is None else int(bool(onGround))
+        row["worldTime"] = -1 if frame.worldTime is None else frame.worldTime
+        row["grid"] = self.gridCount - 1 if rawGrid else -1
+        row["extraOffset"] = self._extras.tell()
+        row["extraLength"] = len(data)
+        self._extras.write(data)
+        self._frames.write(row.tobytes())
+
+        self._pending += 1
+        if self._pending >= FLUSH_EVERY:
+            self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        # Rows reference palette, grid and extra bytes, so those are flushed first.
+        for f in (self._paletteFile, self._grids, self._gridIndex, self._extras, self._frames):
+            f.flush()
+        self._pending = 0
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            for f in (self._paletteFile, self._grids, self._gridIndex, self._extras, self._frames):
+                f.close()
+
+
+class ObservationReplay:
+    # Memory-maps a recording. Only rows whose bytes are complete are visible, so a
+    # recording can be replayed while it is still being written.
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.meta = json.loads((self.path / "meta.json").read_text())
+        self.palette = np.array((self.path / "palette.txt").read_text().splitlines(), dtype=object)
+        self.frames = self._map("frames.bin", FRAME_DTYPE)
+        self.gridIndex = self._map("grids.idx", GRID_DTYPE)
+        self.grids = self._map("grids.bin", np.dtype("<u2"))
+        self.extras = self._map("extras.bin", np.dtype("u1"))
+        self._gridCache = (None, None)
+
+    def _map(self, name, dtype):
+        file = self.path / name
+        count = file.stat().st_size // dtype.itemsize if file.exists() else 0
+        if count == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(file, dtype=dtype, mode="r", shape=(count,))
+
+    def __len__(self):
+        return len(self.frames)
+
+    def gridIds(self, index):
+        row = self.gridIndex[index]
+        offset, length = int(row["offset"]), int(row["length"])
+        return self.grids[offset:offset + length]
+
+    def gridBounds(self, index):
+        b = self.gridIndex[index]["bounds"].tolist()
+        return [[b[0], b[1]], [b[2], b[3]], [b[4], b[5]]]
+
+    def rawGrid(self, index):
+        # Consecutive frames usually share a grid; the decoded list is reused for them,
+        # which also lets WorldMap skip re-parsing it.
+        if self._gridCache[0] != index:
+            self._gridCache = (index, self.palette[self.gridIds(index)].tolist())
+        return self._gridCache[1]
+
+    def frame(self, i) -> ObservationFrame:
+        row = self.frames[i]
+        start = int(row["extraOffset"])
+        extra = json.loads(self.extras[start:start + int(row["extraLength"])].tobytes())
+        pose = row["pose"].tolist()
+        onGround = int(row["onGround"])
+        grid = int(row["grid"])
+        values = {
+            "getAgentPos": None if math.isnan(pose[0]) else pose,
+            "getLife": _opt(row["life"]),
+            "getAir": _opt(row["air"]),
+            "getOnGround": None if onGround < 0 else bool(onGround),
+            "getNearGrid": self.rawGrid(grid) if grid >= 0 else None,
+        }
+        for key in EXTRA_KEYS:
+            values[key] = extra.get(key)
+        worldTime = int(row["worldTime"])
+        return ObservationFrame(
+            seq=int(row["seq"]),
+            timestamp=float(row["timestamp"]),
+            values=values,
+            food=_opt(row["food"]),
+            worldTime=None if worldTime < 0 else worldTime,
+            actionStatus=extra.get("actionStatus"),
+            bounds=self.gridBounds(grid) if grid >= 0 else None,
+            profile=extra.get("profile", ""),
+        )
+
+
+class ReplayEnvironment:
+    # Stands in for VereyaEnvironment when building observations: observe() steps
+    # through the recording, so buildObservation and the bridge getters run unchanged.
+
+    def __init__(self, path):
+        self.replay = ObservationReplay(path)
+        self.connected = True
+        self.rob = self.replay
+        self.cursor = 0
+        self.grid_bounds = observationOps.missionGridBounds()
+        self.worldMap = WorldMap()
+        self.blockSummarizer = BlockSummarizer()
+        timeStart = self.replay.meta.get("timeStart", 0)
+        self.mission = types.SimpleNamespace(
+            serverSection=types.SimpleNamespace(initial_conditions=types.SimpleNamespace(time_start=timeStart))
+        )
+
+    @property
+    def finished(self):
+        return self.cursor >= len(self.replay)
+
+    def observe(self, newerThan=None) -> ObservationFrame:
+        if len(self.replay) == 0:
+            raise ValueError(f"Recording {self.replay.path} has no frames")
+        i = min(self.cursor, len(self.replay) - 1)
+        self.cursor += 1
+        frame = self.replay.frame(i)
+        if frame.bounds is not None:
+            self.grid_bounds = frame.bounds
+        return frame
+
+    def getObservation(self):
+        return observationOps.buildObservation(self)
+
+    def observations(self):
+        while not self.finished:
+            yield self.getObservation()
@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import List, Optional
+
+from capabilities.reflexes import REFLEXES
+from models.type import ReflexEvent
+
+REFLEXES_ENABLED = os.getenv("OPENPSI_REFLEXES", "1") != "0"
+REFLEX_HISTORY = 16
+# How long the reflex thread waits for a frame before checking whether it should stop.
+REFLEX_WAIT = 0.25
+
+
+class ReflexLayer:
+    # Checks every observation frame on its own thread and answers emergencies with a
+    # short reflex instead of waiting for the next cognitive step. A firing reflex
+    # cancels the running action if it is preemptible and takes over the control
+    # channels until it is done. Non-preemptible actions already respond to an
+    # emergency (swimming out, fleeing), so nothing fires while one of them runs.
+
+    def __init__(self, env, reflexes=REFLEXES):
+        self.env = env
+        self.reflexes = reflexes
+        self.events = deque(maxlen=REFLEX_HISTORY)
+        self._lastFired = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="reflexes", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self._thread = None
+
+    def recent(self, maxAge: float) -> List[ReflexEvent]:
+        since = time.time() - maxAge
+        return [e for e in list(self.events) if e.timestamp >= since]
+
+    def check(self, frame, previous=None) -> Optional[ReflexEvent]:
+        running = self.env.scheduler.running
+        if running is not None and not running.preemptible:
+            return None
+        now = time.monotonic()
+        for reflex in self.reflexes:
+            if now - self._lastFired.get(reflex.name, float("-inf")) < reflex.cooldown:
+                continue
+            reason = reflex.trigger(frame, previous)
+            if reason:
+                return self.fire(reflex, reason, frame)
+        return None
+
+    def fire(self, reflex, reason: str, frame) -> ReflexEvent:
+        self._lastFired[reflex.name] = time.monotonic()
+        interrupted = None
+        with self.env.commands.takeover():
+            running = self.env.scheduler.running
+            if running is not None and running.cancel(f"reflex {reflex.name}"):
+                interrupted = running.name
+            latency = time.time() - frame.timestamp
+            outcome = reflex.respond(self.env, frame)
+        event = ReflexEvent(reflex.name, reason, outcome, time.time(), latency, interrupted)
+        self.events.append(event)
+        print(f"Reflex {reflex.name} ({reason}): {outcome}, {latency * 1000:.0f} ms after the frame")
+        self.env.invalidateObservation()
+        return event
+
+    def _run(self):
+        poller = self.env.poller
+        previous = None
+        while not self._stop.is_set():
+            frame = poller.waitForFrame(previous.seq if previous else None, REFLEX_WAIT)
+            if frame is None:
+                continue
+            try:
+                self.check(frame, previous)
+            except Exception as e:
+                print(f"Reflex check failed: {e}")
+            previous = frame
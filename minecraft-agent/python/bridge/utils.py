@@ -1,7 +1,10 @@
 import math
+import os
 import re
 import sys
 import time
+from collections import Counter
+from itertools import count
 from pathlib import Path
 from typing import Optional
 
@@ -9,11 +12,30 @@ PYTHON_ROOT = Path(__file__).resolve().parents[1]
 if str(PYTHON_ROOT) not in sys.path:
     sys.path.insert(0, str(PYTHON_ROOT))
 
+from models.constants import DROPPED_ITEM, EDIBLE_ITEMS, HOSTILE_ENTITIES
 from models.type import ActionType, Observation
 from bridge.vereya_env import VereyaEnvironment, VEREYA_AVAILABLE
+from capabilities.navigation import Navigation
+from capabilities.reachability import fieldFor
 
 
 currentEnv = None
+# Multiset of the atoms last handed to MeTTa through getObservationDelta.
+emittedAtoms = Counter()
+symbolNameCache = {}
+# Actions started from MeTTa with submitAction, by id.
+actionHandles = {}
+MAX_ACTION_HANDLES = 64
+# Action waiting, as (id, name, args), to be queued behind the next one started.
+preparedAction = None
+preparedIds = count(1)
+
+# Most nearEntity atoms emitted per observation; the rest of the crowd is only visible
+# through the per-type entityCount summaries.
+PERCEPTION_BUDGET = int(os.getenv("OPENPSI_PERCEPTION_BUDGET", "24"))
+FOOD_ANIMALS = {"pig", "cow", "sheep", "chicken", "rabbit"}
+# Reflexes fired this recently are part of the observation, as (reflex name outcome).
+REFLEX_REPORT_SECONDS = 5.0
 
 
 def toSymbol(value) -> str:
@@ -51,12 +73,47 @@ def _getRawObservation() -> Optional[Observation]:
     except Exception:
         return None
 
+def _recentReflexes() -> list:
+    reflexes = getattr(currentEnv, "reflexes", None)
+    if reflexes is None:
+        return []
+    return reflexes.recent(REFLEX_REPORT_SECONDS)
+
 def getObservation() -> list:
     obs = _getRawObservation()
     if obs is not None:
-        return observationToMetta(obs)
+        atoms = observationToMetta(obs)
+        for event in _recentReflexes():
+            atoms.append(f"(reflex {event.name} {event.outcome})")
+            if event.interrupted:
+                atoms.append(f"(interruptedBy {event.interrupted} {event.name})")
+        return atoms
     return []
 
+def _perceptionPaused() -> bool:
+    # A pipelined action may hold a narrower observation profile (find_ground swims out
+    # under drowning); perception keeps its atoms until the profile is restored instead
+    # of being rebuilt from the little that profile reads.
+    return bool(currentEnv) and currentEnv.profileNarrowed()
+
+def _observationDelta(current) -> list:
+    global emittedAtoms
+    removed = list((emittedAtoms - current).elements())
+    added = list((current - emittedAtoms).elements())
+    emittedAtoms = current
+    return [removed, added]
+
+def getObservationDelta() -> list:
+    # Returns [removed added]: the atoms to drop from and to add to the perception
+    # space so it matches the current observation.
+    if _perceptionPaused():
+        return [[], []]
+    return _observationDelta(Counter(getObservation()))
+
+def resetObservationDelta() -> str:
+    emittedAtoms.clear()
+    return "ok"
+
 
 def serverCommand(command: str):
     if not currentEnv or not getattr(currentEnv, "mc", None):
@@ -90,76 +147,216 @@ def sleepSeconds(seconds: float = 0.3):
     time.sleep(delay)
     return "ok"
 
+def _submitAction(actionName: str, args, after=None):
+    normalized = re.sub(r'(?<!^)(?=[A-Z])', '_', actionName).lower()
+    key = normalized.upper()
+    actionMap = {
+        # motion + orientation
+        "move_forward": ActionType.MOVE_FORWARD,
+        "turn_left": ActionType.TURN_LEFT,
+        "turn_right": ActionType.TURN_RIGHT,
+        "jump": ActionType.JUMP,
+        "move_to": ActionType.MOVE_TO,
+
+        # interaction
+        "attack": ActionType.ATTACK,
+        "eat": ActionType.EAT,
+        "use": ActionType.USE,
+        "place": ActionType.PLACE,
+        "dig": ActionType.DIG,
+        "crouch": ActionType.CROUCH,
+        "drop": ActionType.DROP,
+        
+        # shelter
+        "build_shelter": ActionType.BUILD_SHELTER,
+        "seek_shelter": ActionType.SEEK_SHELTER,
+        "enter_shelter": ActionType.ENTER_SHELTER,
+        "find_ground": ActionType.FIND_GROUND,
+        "sleep_at_night": ActionType.SLEEP_AT_NIGHT,
+    }
+
+    if normalized in actionMap and actionMap[normalized] == ActionType.MOVE_TO:
+        if len(args) >= 3 and hasattr(currentEnv, 'moveTo'):
+            x, y, z = float(args[0]), float(args[1]), float(args[2])
+            return currentEnv.submit("move_to", lambda: currentEnv.moveTo(x, y, z), after=after)
+        print("Invalid arguments for move_to action. Expected 3 coordinates.")
+        return None
+
+    if normalized == "chat":
+        msg = args[0] if args else "Hello"
+        if currentEnv and hasattr(currentEnv, 'rob') and currentEnv.rob:
+            def chat():
+                currentEnv.commands.send(f"chat {msg}")
+                return f"Chatted: {msg}"
+            return currentEnv.submit("chat", chat, preemptible=False, after=after)
+        print("Current environment does not support chat command.")
+        return None
+
+    if normalized in actionMap:
+        return currentEnv.executeAction(actionMap[normalized], after=after)
+
+    if hasattr(ActionType, key):
+        return currentEnv.executeAction(getattr(ActionType, key), after=after)
+    
+    print(f"Action '{actionName}' not recognized or not implemented.")
+    return None
+
 def executeAction(actionName: str, *args):
+    # Runs the action through the scheduler and waits for it; an emergency may still
+    # interrupt it, in which case the result is ().
     print(f"Executing Action: {actionName} with args {args}")
     
     try:
-        def normalizeActionResult(result):
-            return [] if result is None else result
-
         if not currentEnv:
             print("No Minecraft environment connected.")
             return []
-        
-        normalized = re.sub(r'(?<!^)(?=[A-Z])', '_', actionName).lower()
-        key = normalized.upper()
-        actionMap = {
-            # motion + orientation
-            "move_forward": ActionType.MOVE_FORWARD,
-            "turn_left": ActionType.TURN_LEFT,
-            "turn_right": ActionType.TURN_RIGHT,
-            "jump": ActionType.JUMP,
-            "move_to": ActionType.MOVE_TO,
-
-            # interaction
-            "attack": ActionType.ATTACK,
-            "eat": ActionType.EAT,
-            "use": ActionType.USE,
-            "place": ActionType.PLACE,
-            "dig": ActionType.DIG,
-            "crouch": ActionType.CROUCH,
-            "drop": ActionType.DROP,
-            
-            # shelter
-            "build_shelter": ActionType.BUILD_SHELTER,
-            "seek_shelter": ActionType.SEEK_SHELTER,
-            "enter_shelter": ActionType.ENTER_SHELTER,
-            "find_ground": ActionType.FIND_GROUND,
-            "sleep_at_night": ActionType.SLEEP_AT_NIGHT,
-        }
-
-        if normalized in actionMap and actionMap[normalized] == ActionType.MOVE_TO:
-            if len(args) >= 3 and hasattr(currentEnv, 'moveTo'):
-                return normalizeActionResult(
-                    currentEnv.moveTo(float(args[0]), float(args[1]), float(args[2]))
-                )
-            print("Invalid arguments for move_to action. Expected 3 coordinates.")
-            return []
-
-        if normalized == "chat":
-            msg = args[0] if args else "Hello"
-            if currentEnv and hasattr(currentEnv, 'rob') and currentEnv.rob:
-                currentEnv.rob.sendCommand(f"chat {msg}")
-                return f"Chatted: {msg}"
-            print("Current environment does not support chat command.")
-            return []
-
-        if normalized in actionMap:
-            target_action = actionMap[normalized]
-            return normalizeActionResult(currentEnv.executeAction(target_action))
-
-        if hasattr(ActionType, key):
-            act = getattr(ActionType, key)
-            return normalizeActionResult(currentEnv.executeAction(act))
-        
-        print(f"Action '{actionName}' not recognized or not implemented.")
-        return []
 
+        handle = _submitAction(actionName, args)
+        if handle is not None:
+            _submitPrepared(handle)
+        result = handle.result() if handle is not None else None
+        return [] if result is None else result
 
-            
     except Exception as e:
         print(f"Error executing {actionName}: {e}")
         return []
+    finally:
+        if currentEnv and hasattr(currentEnv, "invalidateObservation"):
+            currentEnv.invalidateObservation()
+
+def _registerHandle(actionId, handle):
+    if len(actionHandles) >= MAX_ACTION_HANDLES:
+        for doneId in [k for k, h in actionHandles.items() if h.done()]:
+            del actionHandles[doneId]
+    actionHandles[actionId] = handle
+
+def submitAction(actionName: str, *args) -> str:
+    # Starts the action without waiting; returns an id for pollAction, awaitAction and
+    # cancelAction, or "none" when nothing was started.
+    if not currentEnv:
+        print("No Minecraft environment connected.")
+        return "none"
+    try:
+        handle = _submitAction(actionName, args)
+    except Exception as e:
+        print(f"Error submitting {actionName}: {e}")
+        return "none"
+    if handle is None:
+        return "none"
+    actionId = f"action{handle.id}"
+    _registerHandle(actionId, handle)
+    return actionId
+
+def prepareAction(actionName: str, *args) -> str:
+    # Pipelining for SEQ_AND: the action is submitted along with the next action that
+    # starts (through executeAction or awaitAction) and queued to run the moment that
+    # one succeeds, instead of after MeTTa has updated perception. Returns an id for
+    # awaitAction and cancelAction.
+    global preparedAction
+    actionId = f"prepared{next(preparedIds)}"
+    preparedAction = (actionId, actionName, args)
+    return actionId
+
+def _submitPrepared(after=None):
+    global preparedAction
+    if preparedAction is None:
+        return
+    actionId, actionName, args = preparedAction
+    preparedAction = None
+    try:
+        handle = _submitAction(actionName, args, after)
+    except Exception as e:
+        print(f"Error submitting {actionName}: {e}")
+        return
+    if handle is not None:
+        _registerHandle(actionId, handle)
+
+def pollAction(actionId) -> str:
+    handle = actionHandles.get(str(actionId))
+    return handle.state.name.lower() if handle is not None else "unknown"
+
+def awaitAction(actionId, timeout=None):
+    # The action's result, () if it was cancelled or failed, or "running" on timeout.
+    if preparedAction is not None and preparedAction[0] == str(actionId):
+        # Nothing ran to carry it along, so it starts now.
+        _submitPrepared()
+    handle = actionHandles.get(str(actionId))
+    if handle is None:
+        return []
+    _submitPrepared(handle)
+    if not handle.wait(None if timeout is None else float(timeout)):
+        return "running"
+    del actionHandles[str(actionId)]
+    try:
+        result = handle.result()
+    except Exception as e:
+        print(f"Error executing {handle.name}: {e}")
+        return []
+    return [] if result is None else result
+
+def cancelAction(actionId) -> str:
+    global preparedAction
+    if preparedAction is not None and preparedAction[0] == str(actionId):
+        preparedAction = None
+        return "True"
+    handle = actionHandles.get(str(actionId))
+    return "True" if handle is not None and handle.cancel() else "False"
+
+def toSymbolCached(value) -> str:
+    # toSymbol memoized per raw name: entity, item and block names repeat every step.
+    try:
+        return symbolNameCache[value]
+    except KeyError:
+        name = symbolNameCache[value] = toSymbol(value)
+        return name
+    except TypeError:
+        return toSymbol(value)
+
+def _entityPriority(entity) -> Optional[int]:
+    eType = str(entity.get('type', 'unknown'))
+    dropped = entity.get('dropped', eType == DROPPED_ITEM)
+    if eType in Navigation.hostileEntities:
+        return 0
+    # Food animals share names with their raw meat (chicken, rabbit); only a drop of
+    # that name counts as food.
+    if eType in EDIBLE_ITEMS and (dropped or eType not in FOOD_ANIMALS):
+        return 1
+    if dropped:
+        return 2
+    if eType in FOOD_ANIMALS:
+        return 3
+    return None
+
+def perceivedEntities(entities, budget=None):
+    # Level of detail for entity facts: hostiles, edible drops, other dropped items and
+    # food animals are reported individually in that order, nearest first, up to the
+    # budget. Every type also gets a summary (type, count, nearest distance), so the
+    # number of atoms is bounded by the budget plus the number of distinct types.
+    budget = PERCEPTION_BUDGET if budget is None else budget
+    ranked = []
+    summary = {}
+    for entity in entities or []:
+        if not isinstance(entity, dict):
+            continue
+        eType = str(entity.get('type', 'unknown'))
+        dist = entity.get('distance', 0)
+        count, nearest = summary.get(eType, (0, dist))
+        summary[eType] = (count + 1, min(nearest, dist))
+        priority = _entityPriority(entity)
+        if priority is not None:
+            ranked.append((priority, dist, len(ranked), entity))
+    ranked.sort(key=lambda r: r[:3])
+    individual = [r[3] for r in ranked[:budget]]
+    return individual, [(eType, count, nearest) for eType, (count, nearest) in summary.items()]
+
+def inventoryTotals(inventory) -> list:
+    # One (item, count) per item type, summed over inventory slots.
+    totals = {}
+    for item in inventory or []:
+        if isinstance(item, dict):
+            iType = toSymbolCached(item.get('item', 'unknown'))
+            totals[iType] = totals.get(iType, 0) + item.get('count', 1)
+    return list(totals.items())
 
 def observationToMetta(obs: Observation):
     atoms = []
@@ -175,37 +372,37 @@ def observationToMetta(obs: Observation):
     if isinstance(obs.actionStatus, dict):
         for cmd, val in obs.actionStatus.items():
             try:
-                atoms.append(f"(actionStatus {toSymbol(cmd)} {float(val)})")
+                atoms.append(f"(actionStatus {toSymbolCached(cmd)} {float(val)})")
             except Exception:
                 continue
     
     if obs.nearbyEntities:
-        for entity in obs.nearbyEntities:
-            if isinstance(entity, dict):
-                eType = toSymbol(entity.get('type', 'unknown'))
-                dist = entity.get('distance', 0)
-                pos = entity.get('position', [0,0,0])
-                atoms.append(f"(nearEntity {eType} {dist} {pos[0]} {pos[1]} {pos[2]})")
+        individual, summary = perceivedEntities(obs.nearbyEntities)
+        for entity in individual:
+            eType = toSymbolCached(entity.get('type', 'unknown'))
+            dist = entity.get('distance', 0)
+            pos = entity.get('position', [0,0,0])
+            atoms.append(f"(nearEntity {eType} {dist} {pos[0]} {pos[1]} {pos[2]})")
+        for eType, count, nearest in summary:
+            atoms.append(f"(entityCount {toSymbolCached(eType)} {count} {nearest})")
 
 
     if obs.nearbyBlocks:
          for block in obs.nearbyBlocks:
-             bType = block.get('type', 'stone')
-             atoms.append(f"(nearBlock {bType})")
+             bType = toSymbolCached(block.get('type', 'stone'))
+             pos = block.get('position', [0,0,0])
+             atoms.append(f"(nearBlock {bType} {block.get('count', 1)} {pos[0]} {pos[1]} {pos[2]} {block.get('direction', 'here')})")
              
     if obs.inventory:
-        for item in obs.inventory:
-            if isinstance(item, dict):
-                iType = toSymbol(item.get('item', 'unknown'))
-                count = item.get('count', 1)
-                atoms.append(f"(hasItem {iType} {count})")
+        for iType, count in inventoryTotals(obs.inventory):
+            atoms.append(f"(hasItem {iType} {count})")
 
     if obs.lineOfSightType is not None:
-        atoms.append(f"(lineOfSightType {toSymbol(obs.lineOfSightType)})")
+        atoms.append(f"(lineOfSightType {toSymbolCached(obs.lineOfSightType)})")
     if obs.lineOfSightDistance is not None:
         atoms.append(f"(lineOfSightDistance {obs.lineOfSightDistance})")
     if obs.lineOfSightHitType is not None:
-        atoms.append(f"(lineOfSightHitType {toSymbol(obs.lineOfSightHitType)})")
+        atoms.append(f"(lineOfSightHitType {toSymbolCached(obs.lineOfSightHitType)})")
     if isinstance(obs.lineOfSight, dict) and "inRange" in obs.lineOfSight:
         atoms.append(f"(lineOfSightInRange {str(obs.lineOfSight.get('inRange'))})")
                 
@@ -227,6 +424,17 @@ def getAirLevel() -> str:
     obs = _getRawObservation()
     return str(obs.air if obs is not None and obs.air is not None else 300.0)
 
+def setObservationProfile(name) -> str:
+    # vitals, navigation or drowning; see capabilities.observation.PROFILES.
+    if not currentEnv:
+        return "False"
+    try:
+        currentEnv.setObservationProfile(str(name))
+    except KeyError:
+        print(f"Unknown observation profile: {name}")
+        return "False"
+    return "True"
+
 def hasShelterKnown() -> str:
     if not currentEnv:
         return "False"
@@ -243,4 +451,96 @@ def sortEntities(*args) -> list:
         print(f"Error sorting entities in Python: {e}")
         return data
 
+def _reachabilityField():
+    if not currentEnv or not getattr(currentEnv, "connected", False):
+        return None
+    try:
+        return fieldFor(currentEnv)
+    except Exception as e:
+        print(f"Reachability unavailable: {e}")
+        return None
+
+def sortReachable(*args) -> list:
+    # Like sortEntities, for (x y z dist) candidates, but ordered by walking distance;
+    # candidates the agent cannot walk to are dropped.
+    if not args:
+        return []
+    data = list(args[0]) if len(args) == 1 and isinstance(args[0], (list, tuple)) else list(args)
+
+    field = _reachabilityField()
+    if field is None:
+        return sortEntities(data)
+    return _rankReachable(field, data)
+
+def _rankReachable(field, data) -> list:
+    ranked = []
+    for e in data:
+        try:
+            d = field.distanceToPoint(float(e[0]), float(e[1]), float(e[2]))
+        except Exception:
+            continue
+        if d is not None:
+            ranked.append((d, e))
+    ranked.sort(key=lambda item: item[0])
+    return [e for _, e in ranked]
+
+def getWalkingDistance(x, y, z) -> str:
+    field = _reachabilityField()
+    d = field.distanceToPoint(float(x), float(y), float(z)) if field is not None else None
+    return str(d) if d is not None else "unreachable"
+
+def _entityIndex():
+    obs = _getRawObservation()
+    return obs.entityIndex if obs is not None else None
 
+def _indexTypes(index, entityType) -> list:
+    # MeTTa names entity types by their symbol; map them back to the index buckets.
+    wanted = entityType if isinstance(entityType, (list, tuple)) else [entityType]
+    wanted = {toSymbolCached(t) for t in wanted}
+    return [t for t in index.types if toSymbolCached(t) in wanted]
+
+def _entityTuples(entries) -> list:
+    return [[e["position"][0], e["position"][1], e["position"][2], e["distance"]] for e in entries]
+
+def nearestEntities(entityType, k=1) -> list:
+    # Up to k (x y z dist) entries of the given type(s), nearest first.
+    index = _entityIndex()
+    if index is None:
+        return []
+    return _entityTuples(index.nearest(_indexTypes(index, entityType), int(k)))
+
+def entitiesWithin(entityType, radius) -> list:
+    index = _entityIndex()
+    if index is None:
+        return []
+    return _entityTuples(index.within(float(radius), _indexTypes(index, entityType)))
+
+def countEntities(entityType) -> int:
+    index = _entityIndex()
+    if index is None:
+        return 0
+    return index.count(_indexTypes(index, entityType))
+
+def countHostiles() -> int:
+    # Nearby mobs of any type in HOSTILE_ENTITIES, so MeTTa never spells the set out.
+    return countEntities(sorted(HOSTILE_ENTITIES))
+
+def nearestReachableEntity(entityType) -> list:
+    # (x y z) of the entity of the given type(s) with the shortest walking distance,
+    # or () when none can be walked to.
+    index = _entityIndex()
+    if index is None:
+        return []
+    candidates = _entityTuples(index.nearest(_indexTypes(index, entityType), len(index)))
+    field = _reachabilityField()
+    ranked = _rankReachable(field, candidates) if field is not None else candidates
+    return ranked[0][:3] if ranked else []
+
+def interceptEntity(entityType) -> list:
+    # (x y z) where the agent would meet the nearest entity of the given type(s) if it
+    # keeps moving as tracked, or () when none is being tracked.
+    if not currentEnv or not getattr(currentEnv, "connected", False):
+        return []
+    wanted = entityType if isinstance(entityType, (list, tuple)) else [entityType]
+    point = currentEnv.interceptPoint([str(t) for t in wanted])
+    return list(point) if point is not None else []
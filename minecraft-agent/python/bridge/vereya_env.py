@@ -1,6 +1,7 @@
 import time
 import math
 import sys
+from contextlib import contextmanager
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Callable
 
@@ -8,9 +9,19 @@ PYTHON_ROOT = Path(__file__).resolve().parents[1]
 if str(PYTHON_ROOT) not in sys.path:
     sys.path.insert(0, str(PYTHON_ROOT))
 
-from models.type import ActionType, Observation
+from models.type import ActionType, Observation, ObservationFrame, PlanQuality
+from capabilities.block_summary import BlockSummarizer
+from capabilities.cost_field import buildCostField, hostilePositions
 from capabilities.navigation import Navigation
+from capabilities.path_following import PurePursuit, smoothPath
+from capabilities.replanner import PathRepairer, REPAIR_INTERVAL_TICKS
+from capabilities.world_map import WorldMap, floorCell
+from bridge.action_scheduler import ActionHandle, ActionScheduler
+from bridge.command_channels import CommandChannels
 from bridge.network_utils import resolveClientIp
+from bridge.observation_poller import ObservationPoller
+from bridge.observation_recorder import ObservationRecorder, RECORD_PATH
+from bridge.reflex_layer import ReflexLayer, REFLEXES_ENABLED
 import capabilities.actions as actionOps
 import capabilities.breathing as breathingOps
 import capabilities.inventory as inventoryOps
@@ -25,6 +36,15 @@ except ImportError:
     VEREYA_AVAILABLE = False
 
 
+# Long actions a new emergency (low air, a hostile in melee range) may interrupt.
+# Actions that respond to emergencies (finding ground, sheltering) and the short flee
+# moves always run to completion.
+PREEMPTIBLE_ACTIONS = {
+    ActionType.EAT, ActionType.USE, ActionType.PLACE, ActionType.DIG, ActionType.CROUCH,
+    ActionType.SLEEP_AT_NIGHT, ActionType.MOVE_TO,
+}
+
+
 class VereyaEnvironment:
     def __init__(self):
         if not VEREYA_AVAILABLE:
@@ -35,9 +55,18 @@ class VereyaEnvironment:
         self.rob: Optional[RobustObserver] = None
         self.client_ip = resolveClientIp()
         
-        self.grid_bounds = [[-30, 30], [-5, 5], [-30, 30]]
+        self.grid_bounds = observationOps.missionGridBounds()
         self.obs = mb.Observations(bAll=True)
         self.obs.gridNear = self.grid_bounds
+        self.worldMap = WorldMap()
+        self.observationCache = observationOps.ObservationCache()
+        self.blockSummarizer = BlockSummarizer()
+        self.poller = ObservationPoller(self)
+        # Profiles in force before each observationProfile() still open, outermost first.
+        self._profileLeases = []
+        self.scheduler = ActionScheduler(self)
+        self.commands = CommandChannels(self)
+        self.reflexes = ReflexLayer(self)
         
         self.agentHandlers = mb.AgentHandlers(observations=self.obs)
         
@@ -77,11 +106,19 @@ class VereyaEnvironment:
         try:
             self.mc = MCConnector(self.mission, clientIp=self.client_ip)
             self.rob = RobustObserver(self.mc)
+            self.commands.reset()
             self.mc.safeStart()
                 
             print("Mission accepted. Waiting for spawn...")
             time.sleep(2)
             self.connected = True
+            if RECORD_PATH:
+                timeStart = self.mission.serverSection.initial_conditions.time_start
+                self.poller.recorder = ObservationRecorder(RECORD_PATH, timeStart)
+                print(f"Recording observations to {RECORD_PATH}")
+            self.poller.start()
+            if REFLEXES_ENABLED:
+                self.reflexes.start()
 
             # The following commands are for testing purposes only
             # to ensure the agent has food and can eat.
@@ -103,6 +140,12 @@ class VereyaEnvironment:
         return False
             
     def disconnect(self):
+        self.reflexes.stop()
+        self.scheduler.cancelAll("disconnected")
+        self.poller.stop()
+        if self.poller.recorder is not None:
+            self.poller.recorder.close()
+            self.poller.recorder = None
         self.connected = False
         print("Vereya environment disconnected.")
 
@@ -115,20 +158,53 @@ class VereyaEnvironment:
     def eatFromInventory(self):
         return inventoryOps.eatFromInventory(self)
 
-    def getObservation(self) -> Observation:
-        return observationOps.buildObservation(self)
+    def setObservationProfile(self, name: str):
+        self.poller.setProfile(name)
+        self.invalidateObservation()
 
-    def executeAction(self, actionType: ActionType):
+    @contextmanager
+    def observationProfile(self, name: str):
+        previous = self.poller.profile.name
+        self._profileLeases.append(previous)
+        self.setObservationProfile(name)
+        try:
+            yield
+        finally:
+            self.setObservationProfile(previous)
+            self._profileLeases.pop()
+
+    def profileNarrowed(self) -> bool:
+        # Whether an action is running under a profile other than the one in force
+        # before it, e.g. swimming out under drowning.
+        leases = self._profileLeases
+        return bool(leases) and self.poller.profile.name != leases[0]
+
+    def observe(self, newerThan: Optional[int] = None) -> ObservationFrame:
+        # Newest polled frame; pass the seq of the last frame acted on to wait for a fresh one.
+        return self.poller.observe(newerThan)
+
+    def getObservation(self, maxAge: Optional[float] = None) -> Observation:
+        return self.observationCache.get(lambda: observationOps.buildObservation(self), maxAge)
+
+    def invalidateObservation(self):
+        self.observationCache.invalidate()
+
+    def submit(self, name: str, fn, preemptible: bool = True, timeout: Optional[float] = None,
+               preempt: bool = False, after: Optional[ActionHandle] = None) -> ActionHandle:
+        return self.scheduler.submit(name, fn, preemptible, timeout, preempt, after)
+
+    def executeAction(self, actionType: ActionType, timeout: Optional[float] = None,
+                      preempt: bool = False, after: Optional[ActionHandle] = None) -> Optional[ActionHandle]:
+        # Returns at once with a handle to poll, wait on or cancel.
         if not self.connected:
             print("Not connected to Vereya environment.")
-            return []
+            return None
 
         handler = self.actionHandlers.get(actionType)
-        if handler is not None:
-            return handler()
-        
-        print(f"Unknown action type: {actionType}")
-        return []
+        if handler is None:
+            print(f"Unknown action type: {actionType}")
+            return None
+        return self.submit(actionType.name.lower(), handler, actionType in PREEMPTIBLE_ACTIONS, timeout, preempt, after)
 
     def doMoveForward(self):
         return actionOps.doMoveForward(self)
@@ -178,106 +254,129 @@ class VereyaEnvironment:
     def doSleepAtNight(self):
         return shelterOps.sleepAtNight(self)
     
+    def interceptPoint(self, entityTypes):
+        # Predicted meeting point with the nearest tracked entity of the given type(s).
+        pos = self.observe().get('getAgentPos')
+        if not pos:
+            return None
+        tracker = self.poller.tracker
+        track = tracker.nearest(entityTypes, pos[:3])
+        if track is None:
+            return None
+        return tracker.intercept(track, pos[:3], now=time.time())
+
     def moveTo(self, target_x, target_y, target_z):
         if not self.connected or not self.rob:
             print("Not connected to Vereya environment.")
             return []
 
-        self.rob.observeProcCached()
-        initialPos = self.rob.getCachedObserve('getAgentPos')
+        with self.observationProfile("navigation"):
+            return self._moveTo(target_x, target_y, target_z)
+
+    def _moveTo(self, target_x, target_y, target_z):
+
+        frame = self.observe()
+        initialPos = frame.get('getAgentPos')
         print(f"current position: {initialPos}")
 
 
         
-        rawGrid = self.rob.getCachedObserve('getNearGrid')
+        rawGrid = frame.get('getNearGrid')
         
         if not initialPos or not rawGrid:
             print("Failed to get initial position or grid data")
             return []
 
-        gridMap = Navigation.parseGrid(rawGrid, self.grid_bounds)
-        goal_rel = (
-            int(math.floor(target_x) - math.floor(initialPos[0])),
-            int(math.floor(target_y) - math.floor(initialPos[1])),
-            int(math.floor(target_z) - math.floor(initialPos[2]))
-        )
-        
-        goal_rel = (
-            max(self.grid_bounds[0][0], min(self.grid_bounds[0][1], goal_rel[0])),
-            max(self.grid_bounds[1][0], min(self.grid_bounds[1][1], goal_rel[1])),
-            max(self.grid_bounds[2][0], min(self.grid_bounds[2][1], goal_rel[2]))
-        )
-
-        path = Navigation.aStar((0, 0, 0), goal_rel, gridMap)
-        if not path:
-            print("No path found to target!")
-            return []
+        start = floorCell(initialPos[0], initialPos[1], initialPos[2])
+        self.worldMap.recordSnapshot(rawGrid, frame.bounds, start)
 
-        print(f"Executing path: {path}")
-        
-        for rel_step in path:
-            abs_target = (
-                math.floor(initialPos[0]) + rel_step[0] + 0.5,
-                math.floor(initialPos[1]) + rel_step[1],
-                math.floor(initialPos[2]) + rel_step[2] + 0.5
+        goal = floorCell(target_x, target_y, target_z)
+        if not self.worldMap.isKnown(goal):
+            goal = tuple(
+                max(start[i] + frame.bounds[i][0], min(start[i] + frame.bounds[i][1], goal[i]))
+                for i in range(3)
             )
-            
-            last_dist = 999
-            stuck_ticks = 0
-            
-            while True:
-                self.rob.observeProcCached()
-                curr = self.rob.getCachedObserve('getAgentPos')
-                if not curr: break
-                
-                dx = abs_target[0] - curr[0]
-                dy = abs_target[1] - curr[1]
-                dz = abs_target[2] - curr[2]
-                dist_h = math.sqrt(dx*dx + dz*dz)
-                
-                if dist_h < 0.35 and abs(dy) < 1.0:
-                    break
-                
-                if abs(dist_h - last_dist) < 0.01:
-                    stuck_ticks += 1
-                else:
-                    stuck_ticks = 0
-                last_dist = dist_h
-                
-                if stuck_ticks > 150:
-                    print("Stuck! Attempting to ")
-                    self.rob.sendCommand("jump 1")
-                    self.rob.sendCommand("move -1")
-                    time.sleep(0.2)
-                    self.rob.sendCommand("move 1")
-                    stuck_ticks = 0
-
-                if dy > 0.5:
-                    self.rob.sendCommand("jump 1")
-                else:
-                    self.rob.sendCommand("jump 0")
-
-                target_yaw = math.atan2(-dx, dz) * 180 / math.pi
-                curr_yaw = curr[4]
-                yaw_diff = (target_yaw - curr_yaw + 180) % 360 - 180
-                
-                turn_speed = 0
-                if abs(yaw_diff) > 10:
-                    turn_speed = max(0.3, min(abs(yaw_diff) / 45.0, 1.0))
-                    if yaw_diff < 0: 
-                        turn_speed *= -1
-                
-                self.rob.sendCommand(f"turn {turn_speed}")
 
-                if abs(yaw_diff) > 45:
-                    self.rob.sendCommand("move 0.2")
-                else:
-                    self.rob.sendCommand("move 1")
-                
-                time.sleep(0.05)
-        
-        self.rob.sendCommand("move 0")
-        self.rob.sendCommand("turn 0")
-        self.rob.sendCommand("jump 0")
+        grid = self.worldMap.planningWindow(start, goal)
+        ents = frame.get('getNearEntities', [])
+        grid.setCosts(buildCostField(grid, hostilePositions(ents)))
+        plan = Navigation.plan(start, goal, grid, Navigation.planBudgetSeconds)
+        if plan.quality == PlanQuality.FAILED:
+            print("No path found to target!")
+            return []
+
+        path = plan.path
+        if plan.quality == PlanQuality.PARTIAL:
+            # Head for the closest cell found within the budget; the caller re-plans from there.
+            print(f"Partial path towards target, ending at {plan.end}")
+            goal = plan.end
+
+        repairer = PathRepairer(self, grid, goal)
+        waypoints, cells = smoothPath(start, path, grid, Navigation.stepTo)
+        pursuit = PurePursuit(start, waypoints, cells)
+        print(f"Executing path: {waypoints}")
+
+        ticks = 0
+        stuck_ticks = 0
+        best_remaining = math.inf
+
+        while True:
+            frame = self.observe(newerThan=frame.seq)
+            curr = frame.get('getAgentPos')
+            if not curr: break
+            ticks += 1
+
+            if pursuit.finished(curr):
+                break
+
+            remaining = pursuit.remaining(curr)
+            if remaining < best_remaining - 0.01:
+                best_remaining = remaining
+                stuck_ticks = 0
+            else:
+                stuck_ticks += 1
+
+            if ticks % REPAIR_INTERVAL_TICKS == 0 or stuck_ticks > 150:
+                repaired = repairer.repair(frame)
+                if repaired is not None:
+                    cell = floorCell(curr[0], curr[1], curr[2])
+                    waypoints, cells = smoothPath(cell, repaired, grid, Navigation.stepTo)
+                    pursuit = PurePursuit(cell, waypoints, cells)
+                    best_remaining = math.inf
+                    print(f"Repaired path: {waypoints}")
+                    continue
+
+            if stuck_ticks > 150:
+                print("Stuck! Attempting to ")
+                self.commands.send("jump 1")
+                self.commands.send("move -1")
+                actionOps.pause(0.2)
+                self.commands.send("move 1")
+                stuck_ticks = 0
+
+            ground = pursuit.groundAhead(curr)
+            jump = 1 if ground is not None and ground > math.floor(curr[1]) else 0
+
+            tx, tz = pursuit.target(curr)
+            dx = tx - curr[0]
+            dz = tz - curr[2]
+            target_yaw = math.atan2(-dx, dz) * 180 / math.pi
+            yaw_diff = (target_yaw - curr[4] + 180) % 360 - 180
+
+            # Steer continuously in proportion to the heading error and only slow
+            # down for sharp turns instead of stopping to turn in place.
+            turn_speed = 0 if abs(yaw_diff) < 3 else max(-1.0, min(1.0, yaw_diff / 45.0))
+            # Only channels whose value changed this tick go out.
+            with self.commands.batch():
+                self.commands.set("jump", jump)
+                self.commands.set("turn", round(turn_speed, 1))
+                self.commands.set("move", 1 if abs(yaw_diff) < 60 else 0.3)
+
+            actionOps.pause(0.05)
+
+        self.commands.stop(("move", "turn", "jump"))
+        self.invalidateObservation()
+        if plan.quality == PlanQuality.PARTIAL:
+            return "Moved Toward Destination"
         return "Reached Destination"
 
@@ -1,14 +1,183 @@
+import math
+import threading
 import time
-from typing import Optional
-
-
-def sendHoldCommand(env, onCommand: str, holdSeconds: float, offCommand: Optional[str] = None, delay: float = 0.5):
-    env.rob.sendCommand(onCommand)
-    time.sleep(holdSeconds)
-    if offCommand:
-        env.rob.sendCommand(offCommand)
-    if delay > 0:
-        time.sleep(delay)
+from typing import Any, Callable, Optional
+
+from models.type import ObservationFrame
+
+# The action the current thread is running for the scheduler, if any.
+_running = threading.local()
+# How often waitUntil re-checks its predicate against the latest frame.
+WAIT_INTERVAL = 0.05
+# How far a mob without an id may move between frames and still be the one attacked.
+ENTITY_TRACK_RADIUS = 3.0
+
+
+class ActionCancelled(Exception):
+    pass
+
+
+def currentAction():
+    return getattr(_running, "handle", None)
+
+
+def pause(seconds: float):
+    # time.sleep for capabilities: inside a scheduled action the wait ends early, with
+    # ActionCancelled, when the action is cancelled, times out or is preempted.
+    handle = currentAction()
+    if handle is None:
+        time.sleep(seconds)
+    else:
+        handle.pause(seconds)
+
+
+def waitUntil(env, predicate: Callable[[ObservationFrame], bool], timeout: float, interval: float = WAIT_INTERVAL) -> bool:
+    # pause() that ends as soon as predicate holds for the latest observation frame.
+    # Returns whether it did; after timeout seconds it gives up and returns False.
+    end = time.monotonic() + timeout
+    while True:
+        frame = env.observe()
+        if frame is not None and predicate(frame):
+            return True
+        left = end - time.monotonic()
+        if left <= 0:
+            return False
+        pause(min(interval, left))
+
+
+def sightTarget(frame: ObservationFrame):
+    # What the crosshair is on: an entity by type, a block by type and cell.
+    los = frame.get("getLineOfSights")
+    if not isinstance(los, dict):
+        return None
+    if los.get("hitType") == "entity":
+        return ("entity", los.get("type"))
+    try:
+        cell = tuple(math.floor(float(los[k])) for k in ("x", "y", "z"))
+    except (KeyError, TypeError, ValueError):
+        cell = None
+    return (los.get("hitType"), los.get("type"), cell)
+
+
+def inventoryState(frame: ObservationFrame):
+    items = frame.get("getInventory")
+    if not isinstance(items, list):
+        return None
+    return sorted((i.get("index", 0), str(i.get("type")), i.get("quantity", 0)) for i in items if isinstance(i, dict))
+
+
+def changes(env, *readers) -> Callable[[ObservationFrame], bool]:
+    # Completion predicate: true once any reader gives something other than what it
+    # gave for the frame current when the predicate was made.
+    frame = env.observe()
+    baseline = [read(frame) for read in readers]
+    return lambda frame: any(read(frame) != before for read, before in zip(readers, baseline))
+
+
+def targetGone(env) -> Callable[[ObservationFrame], bool]:
+    # Completion of digging: the block in the crosshair is gone. Nothing in sight
+    # means nothing to finish, so the hold runs its full time.
+    before = sightTarget(env.observe())
+    return lambda frame: before is not None and sightTarget(frame) != before
+
+
+def _nearestEntity(frame: ObservationFrame, entityType, position, radius: float):
+    best = None
+    for e in frame.get("getNearEntities", []):
+        if not isinstance(e, dict) or str(e.get("name", "")).lower() != entityType:
+            continue
+        d = math.dist((float(e.get("x", 0)), float(e.get("y", 0)), float(e.get("z", 0))), position)
+        if d <= radius and (best is None or d < best[0]):
+            best = (d, e)
+    return best[1] if best is not None else None
+
+
+def entityGone(env) -> Callable[[ObservationFrame], bool]:
+    # Completion of an attack: the mob in the crosshair has left getNearEntities. It
+    # is followed by id when Vereya reports one, otherwise as the nearest mob of its
+    # type to where it was last seen, since knockback moves it out of the crosshair
+    # long before it dies. Without a mob in sight this is targetGone.
+    frame = env.observe()
+    los = frame.get("getLineOfSights")
+    if not isinstance(los, dict) or los.get("hitType") != "entity":
+        return targetGone(env)
+    entityType = str(los.get("type", "")).lower()
+    try:
+        hit = tuple(float(los[k]) for k in ("x", "y", "z"))
+    except (KeyError, TypeError, ValueError):
+        return targetGone(env)
+    target = _nearestEntity(frame, entityType, hit, ENTITY_TRACK_RADIUS)
+    if target is None:
+        return targetGone(env)
+    key = target.get("id")
+    last = [(float(target.get("x", 0)), float(target.get("y", 0)), float(target.get("z", 0)))]
+
+    def gone(frame):
+        entities = frame.get("getNearEntities")
+        if not isinstance(entities, list):
+            return False
+        if key is not None:
+            return not any(isinstance(e, dict) and e.get("id") == key for e in entities)
+        match = _nearestEntity(frame, entityType, last[0], ENTITY_TRACK_RADIUS)
+        if match is None:
+            return True
+        last[0] = (float(match.get("x", 0)), float(match.get("y", 0)), float(match.get("z", 0)))
+        return False
+
+    return gone
+
+
+def heldStack(index: Optional[int]) -> Callable[[ObservationFrame], Any]:
+    # Reader for the stack in the selected hotbar slot as (type, quantity); None when
+    # the slot or the inventory is unknown.
+    def read(frame):
+        items = frame.get("getInventory")
+        if index is None or not isinstance(items, list):
+            return None
+        for item in items:
+            if isinstance(item, dict) and int(item.get("index", -1)) == index:
+                return (str(item.get("type")), item.get("quantity", 0))
+        return ("air", 0)
+
+    return read
+
+
+def itemUsed(env) -> Callable[[ObservationFrame], bool]:
+    # Completion of using the held item: food went up, or the held stack changed
+    # (eaten, placed, emptied). Other inventory and food changes, such as picking
+    # something up or getting hungrier, do not count.
+    frame = env.observe()
+    foodBefore = frame.food
+    held = heldStack(env.getCurrentItemIndex())
+    heldBefore = held(frame)
+
+    def used(frame):
+        if foodBefore is not None and frame.food is not None and frame.food > foodBefore:
+            return True
+        now = held(frame)
+        return heldBefore is not None and now is not None and now != heldBefore
+
+    return used
+
+
+def sendHoldCommand(env, onCommand: str, holdSeconds: float, offCommand: Optional[str] = None,
+                    delay: float = 0.5, until: Optional[Callable[[ObservationFrame], bool]] = None) -> bool:
+    # Holds onCommand for holdSeconds, or only until the completion predicate holds.
+    # The settle delay is for the effect to show up in observations, so it is skipped
+    # when the predicate already saw it.
+    env.commands.send(onCommand)
+    completed = False
+    try:
+        if until is None:
+            pause(holdSeconds)
+        else:
+            completed = waitUntil(env, until, holdSeconds)
+    finally:
+        if offCommand:
+            env.commands.send(offCommand)
+    if delay > 0 and not completed:
+        pause(delay)
+    return completed
 
 
 def doMoveForward(env):
@@ -27,27 +196,27 @@ def doTurnRight(env):
 
 
 def doAttack(env):
-    sendHoldCommand(env, "attack 1", 2, "attack 0")
+    sendHoldCommand(env, "attack 1", 2, "attack 0", until=entityGone(env))
     return "Attacked"
 
 
 def doPlace(env):
-    sendHoldCommand(env, "use 1", 2, "use 0")
+    sendHoldCommand(env, "use 1", 2, "use 0", until=changes(env, inventoryState, sightTarget))
     return "Placed"
 
 
 def doUse(env):
-    sendHoldCommand(env, "use 1", 10, "use 0")
+    sendHoldCommand(env, "use 1", 10, "use 0", until=itemUsed(env))
     return "Used"
 
 
 def doDig(env):
-    sendHoldCommand(env, "attack 1", 2, "attack 0")
+    sendHoldCommand(env, "attack 1", 2, "attack 0", until=targetGone(env))
     return "Dug"
 
 
 def doChat(env):
-    env.rob.sendCommand("chat Hello")
+    env.commands.send("chat Hello")
     return "Chatted Hello"
 
 
@@ -62,5 +231,5 @@ def doJump(env):
 
 
 def doDrop(env):
-    env.rob.sendCommand("discardCurrentItem")
+    env.commands.send("discardCurrentItem")
     return "Dropped Item"
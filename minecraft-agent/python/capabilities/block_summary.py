@@ -0,0 +1,95 @@
+import math
+import os
+
+import numpy as np
+
+from capabilities.navigation import Navigation
+
+# Block classes reported as nearBlock facts. A block belongs to a class when its name
+# is the class name or ends in "_<class>" (flowing_water, oak_log, deepslate_iron_ore).
+NEAR_BLOCK_CLASSES = tuple(
+    c.strip() for c in os.getenv(
+        "OPENPSI_NEAR_BLOCKS",
+        "water,lava,log,coal_ore,iron_ore,copper_ore,gold_ore,redstone_ore,diamond_ore,bed,crafting_table",
+    ).split(",") if c.strip()
+)
+COMPASS = ("south", "southwest", "west", "northwest", "north", "northeast", "east", "southeast")
+
+
+def blockClass(name, classes):
+    name = Navigation.normalizeBlockName(name)
+    for i, c in enumerate(classes):
+        if name == c or name.endswith("_" + c):
+            return i
+    return -1
+
+
+def direction(dx, dy, dz):
+    # Coarse direction in Minecraft's frame (+z is south, +x is east).
+    if dx * dx + dz * dz < 1:
+        return "below" if dy < 0 else "above" if dy > 0 else "here"
+    yaw = math.degrees(math.atan2(-dx, dz))
+    return COMPASS[int(round(yaw / 45.0)) % 8]
+
+
+class BlockSummarizer:
+    # Summarises a snapshot grid centred on the agent in a fixed number of array passes:
+    # a palette lookup maps every cell to a class, bincount gives the per-class counts,
+    # and a cell order sorted by distance (computed once per grid shape) gives each
+    # class's nearest cell as the first occurrence of the class along that order.
+
+    def __init__(self, classes=NEAR_BLOCK_CLASSES):
+        self.classes = tuple(classes)
+        self._shape = None
+        self._origin = None
+        self._order = None
+        self._coords = None
+        self._palette = None
+        self._paletteLut = None
+
+    def _prepare(self, grid):
+        if grid.shape == self._shape and self._origin == grid.origin:
+            return
+        sy, sz, sx = grid.shape
+        ox, oy, oz = grid.origin
+        y, z, x = np.meshgrid(
+            np.arange(oy, oy + sy), np.arange(oz, oz + sz), np.arange(ox, ox + sx), indexing="ij"
+        )
+        self._coords = np.stack([x.ravel(), y.ravel(), z.ravel()], axis=1)
+        self._order = np.argsort((self._coords ** 2).sum(axis=1), kind="stable")
+        self._shape = grid.shape
+        self._origin = grid.origin
+
+    def _lut(self, palette):
+        if palette != self._palette:
+            # Blocks outside every class land in one extra bin after the last class.
+            lut = np.array([blockClass(name, self.classes) for name in palette], dtype=np.int16)
+            lut[lut < 0] = len(self.classes)
+            self._palette = list(palette)
+            self._paletteLut = lut
+        return self._paletteLut
+
+    def summarize(self, grid):
+        if grid is None or not self.classes:
+            return []
+        self._prepare(grid)
+        classOf = self._lut(grid.palette)[grid.ids.reshape(-1)]
+        counts = np.bincount(classOf, minlength=len(self.classes) + 1)
+        found, first = np.unique(classOf[self._order], return_index=True)
+
+        blocks = []
+        for cls, pos in zip(found.tolist(), first.tolist()):
+            if cls >= len(self.classes):
+                continue
+            dx, dy, dz = self._coords[self._order[pos]].tolist()
+            blocks.append(
+                {
+                    "type": self.classes[cls],
+                    "count": int(counts[cls]),
+                    "position": [dx, dy, dz],
+                    "distance": math.sqrt(dx * dx + dy * dy + dz * dz),
+                    "direction": direction(dx, dy, dz),
+                }
+            )
+        blocks.sort(key=lambda b: b["distance"])
+        return blocks
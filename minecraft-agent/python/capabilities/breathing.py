@@ -1,5 +1,13 @@
 import math
 import time
+from heapq import heappop, heappush
+from itertools import count
+
+import numpy as np
+
+from capabilities.actions import pause
+from capabilities.planners import DEADLINE_CHECK_INTERVAL
+from capabilities.world_map import floorCell
 
 
 WATER_BLOCKS = {"water", "flowing_water", "bubble_column"}
@@ -11,6 +19,16 @@ COMMON_PASSABLE = {
     "brown_mushroom", "red_mushroom", "sugar_cane",
 }
 
+# Rough swim timings in game ticks, used as planning costs and to spend the air budget.
+SWIM_TICKS_HORIZONTAL = 10
+SWIM_TICKS_UP = 6
+SWIM_TICKS_DOWN = 8
+MAX_AIR = 300
+SWIM_REPLAN_TICKS = 10
+SWIM_PLAN_TIMEOUT = 20.0
+# Wall-clock budget for one swim plan; the route is replanned every few ticks anyway.
+SWIM_PLAN_BUDGET = 0.1
+
 UNSAFE_SUPPORT_BLOCKS = {
     "cactus",
     "magma_block",
@@ -32,18 +50,15 @@ def isWater(name):
 
 
 def stopMotion(env):
-    env.rob.sendCommand("move 0")
-    env.rob.sendCommand("turn 0")
-    env.rob.sendCommand("jump 0")
-    env.rob.sendCommand("pitch 0")
+    env.commands.stop()
 
 
-def getGrid3D(env):
-    rawGrid = env.rob.getCachedObserve("getNearGrid")
+def getGrid3D(env, frame):
+    rawGrid = frame.get("getNearGrid")
     if not rawGrid:
         return None
 
-    bounds = env.grid_bounds
+    bounds = frame.bounds
     dimX = bounds[0][1] - bounds[0][0] + 1
     dimY = bounds[1][1] - bounds[1][0] + 1
     dimZ = bounds[2][1] - bounds[2][0] + 1
@@ -65,13 +80,13 @@ def getGrid3D(env):
 
 
 def getState(env):
-    env.rob.observeProcCached()
-    pos = env.rob.getCachedObserve("getAgentPos")
-    onGround = bool(env.rob.getCachedObserve("getOnGround"))
-    air = env.rob.getCachedObserve("getAir")
+    frame = env.observe()
+    pos = frame.get("getAgentPos")
+    onGround = bool(frame.get("getOnGround"))
+    air = frame.get("getAir")
     air = float(air) if air is not None else None
 
-    grid = getGrid3D(env)
+    grid = getGrid3D(env, frame)
     if not grid:
         return {
             "pos": pos,
@@ -185,7 +200,7 @@ def buildWorldTarget(pos, dx, yOff, dz):
 
 
 def aimToWorldTarget(env, target):
-    pos = env.rob.getCachedObserve("getAgentPos")
+    pos = env.observe().get("getAgentPos")
     if not pos:
         return None
     dx = float(target[0]) - float(pos[0])
@@ -200,7 +215,7 @@ def aimToWorldTarget(env, target):
         turnSpeed = max(0.22, min(abs(yawDiff) / 45.0, 1.0))
         if yawDiff < 0:
             turnSpeed *= -1
-    env.rob.sendCommand(f"turn {turnSpeed}")
+    env.commands.send(f"turn {turnSpeed}")
     return dist, abs(yawDiff), float(target[1]) - float(pos[1])
 
 
@@ -221,11 +236,173 @@ def confirmGroundReached(env, samples=6, required=4, requireDry=True):
         stableNow = state["onGround"] or state["dryStable"]
         if (isLanded(state) if requireDry else stableNow):
             ok += 1
-        time.sleep(0.08)
+        pause(0.08)
     return ok >= required
 
 
+def swimMasks(grid):
+    # Per-cell masks over a VoxelGrid: cells the agent can swim in, cells it can stand
+    # on dry land, and cells where its head is under water (air is being spent).
+    waterLut = np.array([name in WATER_BLOCKS for name in grid.palette], dtype=bool)
+    water = waterLut[grid.ids]
+    fluid = grid.passable | water
+
+    swim = np.zeros_like(water)
+    swim[:-1] = water[:-1] & fluid[1:]
+    dry = grid.standable.copy()
+    dry[1:] &= ~water[:-1]
+    headWet = np.zeros_like(water)
+    headWet[:-1] = water[1:]
+    return swim.tobytes(), dry.tobytes(), headWet.tobytes()
+
+
+def planSwimOut(grid, start, air=MAX_AIR, deadline=None):
+    # Fastest swim-plus-climb route from start to any dry_land cell. Air runs down
+    # while the head is under water and refills at the surface; routes that would run
+    # out are dropped. Since a slower route can still be the one with more air left,
+    # each cell keeps a Pareto set of (time, air left) labels and a new label is only
+    # dropped when an existing one is at least as fast with at least as much air.
+    # Returns the path (empty when already on dry land) or None, also when the
+    # deadline (time.monotonic()) passes first.
+    swim, dry, headWet = swimMasks(grid)
+    startIdx = grid.index(start)
+    if startIdx < 0:
+        return None
+    if dry[startIdx]:
+        return []
+
+    # Each heap entry is a label (time, air left) at a cell; labels keep their own
+    # parent so a reconstructed route is the one whose air budget was checked.
+    tie = count()
+    labels = [(start, -1)]
+    heap = [(0, next(tie), 0, air)]
+    front = {start: [(0, air, 0)]}
+    dominated = set()
+    pops = 0
+
+    while heap:
+        t, _, label, airLeft = heappop(heap)
+        if label in dominated:
+            continue
+        pops += 1
+        if deadline is not None and pops % DEADLINE_CHECK_INTERVAL == 0 and time.monotonic() > deadline:
+            print("Swim planning budget exhausted.")
+            return None
+        node = labels[label][0]
+        idx = grid.index(node)
+        if dry[idx]:
+            path = []
+            while label > 0:
+                node, label = labels[label]
+                path.append(node)
+            return path[::-1]
+        if label > 0 and not swim[idx]:
+            continue
+
+        x, y, z = node
+        moves = [((x, y + 1, z), SWIM_TICKS_UP), ((x, y - 1, z), SWIM_TICKS_DOWN)]
+        for dx, dz in ((0, 1), (0, -1), (1, 0), (-1, 0)):
+            moves.append(((x + dx, y, z + dz), SWIM_TICKS_HORIZONTAL))
+            moves.append(((x + dx, y + 1, z + dz), SWIM_TICKS_HORIZONTAL + SWIM_TICKS_UP))
+
+        for nxt, cost in moves:
+            nIdx = grid.index(nxt)
+            if nIdx < 0 or not (swim[nIdx] or dry[nIdx]):
+                continue
+            # Stepping up diagonally is only for climbing out onto the bank.
+            if nxt[1] > y and (nxt[0] != x or nxt[2] != z) and not dry[nIdx]:
+                continue
+            nt = t + cost
+            nAir = MAX_AIR if not headWet[nIdx] else airLeft - cost
+            if nAir < 0:
+                continue
+            labelsHere = front.get(nxt, [])
+            if any(ot <= nt and oAir >= nAir for ot, oAir, _ in labelsHere):
+                continue
+            kept = []
+            for other in labelsHere:
+                if nt <= other[0] and nAir >= other[1]:
+                    dominated.add(other[2])
+                else:
+                    kept.append(other)
+            labels.append((nxt, label))
+            kept.append((nt, nAir, len(labels) - 1))
+            front[nxt] = kept
+            heappush(heap, (nt, next(tie), len(labels) - 1, nAir))
+    return None
+
+
+def swimOutAlongPlan(env, timeoutSec=SWIM_PLAN_TIMEOUT):
+    # Plans an exit from the latest grid and swims it, replanning every few ticks as
+    # currents push the agent around. Returns None when no route was found.
+    endTime = time.time() + timeoutSec
+    path = None
+    index = 0
+    ticks = 0
+    stopMotion(env)
+
+    frame = None
+    while time.time() < endTime:
+        frame = env.observe(newerThan=frame.seq if frame else None)
+        pos = frame.get("getAgentPos")
+        rawGrid = frame.get("getNearGrid")
+        if not pos:
+            pause(0.05)
+            continue
+
+        if path is None or ticks % SWIM_REPLAN_TICKS == 0:
+            cell = floorCell(pos[0], pos[1], pos[2])
+            plan = None
+            if rawGrid:
+                snapshot = env.worldMap.recordSnapshot(rawGrid, frame.bounds, cell)
+                air = frame.get("getAir")
+                deadline = time.monotonic() + SWIM_PLAN_BUDGET
+                plan = planSwimOut(snapshot, (0, 0, 0), float(air) if air is not None else MAX_AIR, deadline)
+            if plan is not None:
+                path = [(cell[0] + c[0], cell[1] + c[1], cell[2] + c[2]) for c in plan]
+                index = 0
+            elif path is None:
+                stopMotion(env)
+                return None
+        ticks += 1
+
+        if index >= len(path):
+            if confirmGroundReached(env, samples=4, required=2, requireDry=True):
+                stopMotion(env)
+                return "Ground Reached"
+            path = None
+            continue
+
+        step = path[index]
+        aim = aimToWorldTarget(env, (step[0] + 0.5, step[1], step[2] + 0.5))
+        if aim is None:
+            pause(0.05)
+            continue
+        dist, yawAbs, dy = aim
+        if dist < 0.4 and abs(dy) < 0.8:
+            index += 1
+            continue
+
+        with env.commands.batch():
+            env.commands.set("move", 0.3 if yawAbs > 50 else 1)
+            # Holding jump swims upwards; letting go sinks towards deeper targets.
+            env.commands.set("jump", 0 if dy < -0.5 else 1)
+        pause(0.05)
+
+    stopMotion(env)
+    return None
+
+
 def findGroundWhileSwimming(env, timeoutSec=60.0):
+    startTime = time.time()
+    with env.observationProfile("drowning"):
+        result = swimOutAlongPlan(env, min(timeoutSec, SWIM_PLAN_TIMEOUT))
+        if result is not None:
+            return result
+        return findGroundReactive(env, timeoutSec - (time.time() - startTime))
+
+
+def findGroundReactive(env, timeoutSec=60.0):
     endTime = time.time() + timeoutSec
     landedStreak = 0
     targetLock = None
@@ -268,10 +445,10 @@ def findGroundWhileSwimming(env, timeoutSec=60.0):
             targetLockTicks = 0
             lastTargetDist = None
             closeDryTicks = 0
-            env.rob.sendCommand("turn 0.55")
-            env.rob.sendCommand("move 1")
-            env.rob.sendCommand("jump 1")
-            time.sleep(0.15)
+            env.commands.send("turn 0.55")
+            env.commands.send("move 1")
+            env.commands.send("jump 1")
+            pause(0.15)
             continue
 
         if targetLock is None or targetLockTicks <= 0:
@@ -297,7 +474,7 @@ def findGroundWhileSwimming(env, timeoutSec=60.0):
             tx, ty, tz, kind = targetLock
             aim = aimToWorldTarget(env, (tx, ty, tz))
             if aim is None:
-                time.sleep(0.1)
+                pause(0.1)
                 continue
             dist, yawAbs, dy = aim
             dryNow = (not state["feetWater"]) and (not state["headWater"])
@@ -311,24 +488,24 @@ def findGroundWhileSwimming(env, timeoutSec=60.0):
                 closeDryTicks = 0
 
             if kind == "dry_land" and dryNow and dist < 0.9:
-                env.rob.sendCommand("move 0.2" if yawAbs <= 25 else "0")
-                env.rob.sendCommand("jump 0")
-                env.rob.sendCommand("turn 0")
-                time.sleep(0.15)
+                env.commands.send("move 0.2" if yawAbs <= 25 else "0")
+                env.commands.send("jump 0")
+                env.commands.send("turn 0")
+                pause(0.15)
                 if confirmGroundReached(env, samples=4, required=2, requireDry=True):
                     stopMotion(env)
                     return "Ground Reached"
 
             moveSpeed = "0.3" if yawAbs > 50 else "1"
-            env.rob.sendCommand(f"move {moveSpeed}")
+            env.commands.send(f"move {moveSpeed}")
             if state["headWater"] or state["feetWater"]:
-                env.rob.sendCommand("jump 1")
+                env.commands.send("jump 1")
             elif dy > 0.6 and dist > 0.8:
-                env.rob.sendCommand("jump 1")
+                env.commands.send("jump 1")
             elif kind != "dry_land" and not isLanded(state):
-                env.rob.sendCommand("jump 1")
+                env.commands.send("jump 1")
             else:
-                env.rob.sendCommand("jump 0")
+                env.commands.send("jump 0")
 
             if kind == "dry_land" and isLanded(state):
                 targetLockTicks = 0
@@ -343,14 +520,14 @@ def findGroundWhileSwimming(env, timeoutSec=60.0):
         else:
             lastTargetDist = None
             closeDryTicks = 0
-            env.rob.sendCommand("turn 0.35")
+            env.commands.send("turn 0.35")
             if state["headWater"]:
-                env.rob.sendCommand("move 0")
-                env.rob.sendCommand("jump 1")
+                env.commands.send("move 0")
+                env.commands.send("jump 1")
             else:
-                env.rob.sendCommand("move 0.6")
-                env.rob.sendCommand("jump 1")
-        time.sleep(0.1)
+                env.commands.send("move 0.6")
+                env.commands.send("jump 1")
+        pause(0.1)
 
     stopMotion(env)
     return []
@@ -0,0 +1,71 @@
+import numpy as np
+
+from capabilities.breathing import WATER_BLOCKS
+from capabilities.navigation import Navigation
+
+# Extra cost of entering a cell, on top of the base move cost of 1.
+HAZARD_RADIUS = 3
+HAZARD_WEIGHT = 8.0
+WATER_COST = 2.0
+HOSTILE_RADIUS = 8.0
+HOSTILE_WEIGHT = 12.0
+# Standing where the feet, head or floor cell was never observed: such ground may not
+# exist, so it is used only when the seen terrain offers nothing much cheaper.
+UNKNOWN_COST = 4.0
+
+
+def _dilate(mask):
+    # One step of 26-neighbour growth, done as a separable max along each axis.
+    for axis in range(mask.ndim):
+        grown = mask.copy()
+        lo = [slice(None)] * mask.ndim
+        hi = [slice(None)] * mask.ndim
+        lo[axis] = slice(1, None)
+        hi[axis] = slice(None, -1)
+        grown[tuple(lo)] |= mask[tuple(hi)]
+        grown[tuple(hi)] |= mask[tuple(lo)]
+        mask = grown
+    return mask
+
+
+def chebyshevDistance(mask, radius):
+    # Distance to the nearest True cell, capped at radius + 1.
+    dist = np.full(mask.shape, radius + 1, dtype=np.int16)
+    dist[mask] = 0
+    reached = mask
+    for d in range(1, radius + 1):
+        reached = _dilate(reached)
+        dist[reached & (dist > d)] = d
+    return dist
+
+
+def hostilePositions(entities):
+    positions = []
+    for e in entities or []:
+        if str(e.get("name", "")).lower() in Navigation.hostileEntities:
+            positions.append((e.get("x", 0), e.get("y", 0), e.get("z", 0)))
+    return positions
+
+
+def buildCostField(grid, hostiles=()):
+    # Per-cell extra cost: a linear falloff around dangerous blocks, a flat charge for
+    # walking on water or on unobserved ground and a radial falloff around each hostile mob.
+    hazard = ~grid.safe
+    dist = chebyshevDistance(hazard, HAZARD_RADIUS)
+    costs = HAZARD_WEIGHT * np.clip(HAZARD_RADIUS + 1 - dist, 0, None).astype(np.float32) / (HAZARD_RADIUS + 1)
+
+    waterLut = np.array([name in WATER_BLOCKS for name in grid.palette], dtype=bool)
+    water = waterLut[grid.ids]
+    costs[1:][water[:-1]] += WATER_COST
+    costs[grid.assumed] += UNKNOWN_COST
+
+    if hostiles:
+        sy, sz, sx = grid.shape
+        ox, oy, oz = grid.origin
+        ys = (oy + np.arange(sy, dtype=np.float32))[:, None, None]
+        zs = (oz + 0.5 + np.arange(sz, dtype=np.float32))[None, :, None]
+        xs = (ox + 0.5 + np.arange(sx, dtype=np.float32))[None, None, :]
+        for hx, hy, hz in hostiles:
+            d = np.sqrt((xs - hx) ** 2 + (ys - hy) ** 2 + (zs - hz) ** 2)
+            costs += HOSTILE_WEIGHT * np.clip(1 - d / HOSTILE_RADIUS, 0, None)
+    return costs
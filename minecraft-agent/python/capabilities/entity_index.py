@@ -0,0 +1,117 @@
+import math
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from models.constants import DROPPED_ITEM, DROPPED_ITEM_FIELD
+
+# Edge length of the spatial hash buckets, in blocks.
+HASH_CELL = 8.0
+
+
+def isDroppedItem(entity) -> bool:
+    return DROPPED_ITEM_FIELD in entity or str(entity.get("name", "")).lower() == DROPPED_ITEM
+
+
+class EntityIndex:
+    # Per-frame index over the nearby entities. Distances to the agent are computed in
+    # one vectorized pass and every type bucket is kept sorted by that distance, so
+    # nearest-k is a slice and within-radius a binary search. Radius queries around
+    # other points go through a coarse spatial hash. Drops keep their item name as type
+    # and are also filed under DROPPED_ITEM.
+
+    def __init__(self, entities, origin):
+        entities = [e for e in entities or [] if isinstance(e, dict)]
+        self.names = [str(e.get("name", "unknown")).lower() for e in entities]
+        self.dropped = [isDroppedItem(e) for e in entities]
+        self.positions = np.array(
+            [(e.get("x", 0), e.get("y", 0), e.get("z", 0)) for e in entities], dtype=np.float64
+        ).reshape(-1, 3)
+        self.origin = tuple(origin)
+        self.distances = np.sqrt(((self.positions - np.asarray(self.origin, dtype=np.float64)) ** 2).sum(axis=1))
+
+        byType = defaultdict(list)
+        for i, name in enumerate(self.names):
+            byType[name].append(i)
+            if self.dropped[i] and name != DROPPED_ITEM:
+                byType[DROPPED_ITEM].append(i)
+        self.buckets = {}
+        for name, members in byType.items():
+            members = np.array(members, dtype=np.int64)
+            self.buckets[name] = members[np.argsort(self.distances[members], kind="stable")]
+        self._cells = None
+
+    @property
+    def cells(self):
+        # Built on the first radius query around a point other than the agent.
+        if self._cells is None:
+            self._cells = defaultdict(list)
+            for i, key in enumerate(map(tuple, np.floor(self.positions / HASH_CELL).astype(np.int64).tolist())):
+                self._cells[key].append(i)
+        return self._cells
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def types(self):
+        return list(self.buckets)
+
+    def _bucket(self, types):
+        if types is None:
+            return np.argsort(self.distances, kind="stable")
+        if isinstance(types, str):
+            return self.buckets.get(types.lower(), np.empty(0, dtype=np.int64))
+        parts = [self.buckets[t.lower()] for t in types if t.lower() in self.buckets]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        # Buckets overlap when both an item name and DROPPED_ITEM are asked for.
+        merged = np.unique(np.concatenate(parts))
+        return merged[np.argsort(self.distances[merged], kind="stable")]
+
+    def entry(self, i):
+        x, y, z = self.positions[i].tolist()
+        return {
+            "type": self.names[i], "distance": float(self.distances[i]), "position": [x, y, z],
+            "dropped": self.dropped[i],
+        }
+
+    def entries(self):
+        return [self.entry(i) for i in range(len(self.names))]
+
+    def nearest(self, types=None, k=1):
+        # Up to k entities of the given type(s), closest to the agent first.
+        return [self.entry(i) for i in self._bucket(types)[:k]]
+
+    def within(self, radius, types=None, center=None):
+        if center is None:
+            members = self._bucket(types)
+            end = np.searchsorted(self.distances[members], radius, side="right")
+            return [self.entry(i) for i in members[:end]]
+
+        wanted = None if types is None else ({types.lower()} if isinstance(types, str) else {t.lower() for t in types})
+        cx, cy, cz = (math.floor(c / HASH_CELL) for c in center)
+        reach = int(math.ceil(radius / HASH_CELL))
+        candidates = []
+        for dx in range(-reach, reach + 1):
+            for dy in range(-reach, reach + 1):
+                for dz in range(-reach, reach + 1):
+                    candidates.extend(self.cells.get((cx + dx, cy + dy, cz + dz), ()))
+        if wanted is not None:
+            candidates = [
+                i for i in candidates
+                if self.names[i] in wanted or (self.dropped[i] and DROPPED_ITEM in wanted)
+            ]
+        if not candidates:
+            return []
+        candidates = np.array(candidates, dtype=np.int64)
+        d = np.sqrt(((self.positions[candidates] - np.asarray(center, dtype=np.float64)) ** 2).sum(axis=1))
+        order = np.argsort(d, kind="stable")
+        return [self.entry(i) for i in candidates[order][d[order] <= radius]]
+
+    def count(self, types=None):
+        return int(self._bucket(types).size)
+
+    def countByType(self):
+        # Per entity type; drops are counted under their item name only.
+        return dict(Counter(self.names))
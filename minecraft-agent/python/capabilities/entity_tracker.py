@@ -0,0 +1,143 @@
+import math
+
+# Tracks are dropped when they have not been seen for this long, in seconds.
+TRACK_TTL = 1.0
+# Weight of a new velocity sample in the smoothed estimate.
+VELOCITY_ALPHA = 0.4
+# Fastest plausible mob speed (blocks/s); frames that would need a faster move are not
+# associated with the track.
+MAX_ENTITY_SPEED = 8.0
+ASSOCIATION_MARGIN = 1.0
+# Sustained walking speed of the agent in blocks/s, and how far ahead intercepts look.
+AGENT_SPEED = 4.3
+MAX_HORIZON = 3.0
+
+
+class Track:
+    __slots__ = ("key", "type", "position", "velocity", "lastSeen", "hits")
+
+    def __init__(self, key, entityType, position, timestamp):
+        self.key = key
+        self.type = entityType
+        self.position = position
+        self.velocity = (0.0, 0.0, 0.0)
+        self.lastSeen = timestamp
+        self.hits = 1
+
+    def predict(self, horizon):
+        # Horizontal dead reckoning; mobs follow the terrain, so the height is kept.
+        x, y, z = self.position
+        vx, _, vz = self.velocity
+        return (x + vx * horizon, y, z + vz * horizon)
+
+
+def interceptTime(rel, velocity, speed):
+    # Smallest t > 0 with |rel + velocity * t| = speed * t in the x/z plane, where rel
+    # is the target's offset from the agent; None when the target outruns the agent.
+    rx, rz = rel[0], rel[2]
+    vx, vz = velocity[0], velocity[2]
+    a = vx * vx + vz * vz - speed * speed
+    b = 2 * (rx * vx + rz * vz)
+    c = rx * rx + rz * rz
+    if abs(a) < 1e-9:
+        return -c / b if b < 0 else None
+    disc = b * b - 4 * a * c
+    if disc < 0:
+        return None
+    roots = [t for t in ((-b - math.sqrt(disc)) / (2 * a), (-b + math.sqrt(disc)) / (2 * a)) if t > 0]
+    return min(roots) if roots else None
+
+
+class EntityTracker:
+    # Associates nearby entities across frames, by id when Vereya reports one and
+    # otherwise greedily by type and distance, and keeps a smoothed velocity per track.
+    # update() runs on the poller thread and publishes a new dict of tracks, so readers
+    # never see a half-updated set.
+
+    def __init__(self):
+        self.tracks = {}
+        self._nextKey = 0
+
+    def _newKey(self):
+        self._nextKey += 1
+        return f"track{self._nextKey}"
+
+    def update(self, entities, timestamp):
+        previous = self.tracks
+        tracks = {}
+        unmatched = []
+        for e in entities or []:
+            if not isinstance(e, dict):
+                continue
+            position = (float(e.get("x", 0)), float(e.get("y", 0)), float(e.get("z", 0)))
+            entityType = str(e.get("name", "unknown")).lower()
+            key = e.get("id")
+            if key is not None and key in previous:
+                tracks[key] = self._observe(previous[key], position, timestamp)
+            elif key is not None:
+                tracks[key] = Track(key, entityType, position, timestamp)
+            else:
+                unmatched.append((entityType, position))
+
+        # Entities without ids: closest same-type pairs first, within the distance the
+        # entity could have covered since the track was last seen.
+        free = {k: t for k, t in previous.items() if k not in tracks}
+        pairs = []
+        for i, (entityType, position) in enumerate(unmatched):
+            for k, t in free.items():
+                if t.type != entityType:
+                    continue
+                gate = MAX_ENTITY_SPEED * max(timestamp - t.lastSeen, 0.05) + ASSOCIATION_MARGIN
+                d = math.dist(position, t.position)
+                if d <= gate:
+                    pairs.append((d, i, k))
+        pairs.sort()
+        usedEntities = set()
+        for _, i, k in pairs:
+            if i in usedEntities or k in tracks:
+                continue
+            usedEntities.add(i)
+            tracks[k] = self._observe(free[k], unmatched[i][1], timestamp)
+        for i, (entityType, position) in enumerate(unmatched):
+            if i not in usedEntities:
+                key = self._newKey()
+                tracks[key] = Track(key, entityType, position, timestamp)
+
+        # Keep briefly occluded tracks, coasting on their last velocity.
+        for k, t in previous.items():
+            if k not in tracks and timestamp - t.lastSeen <= TRACK_TTL:
+                tracks[k] = t
+        self.tracks = tracks
+
+    @staticmethod
+    def _observe(track, position, timestamp):
+        dt = timestamp - track.lastSeen
+        updated = Track(track.key, track.type, position, timestamp)
+        updated.hits = track.hits + 1
+        if dt > 1e-3:
+            sample = tuple((position[i] - track.position[i]) / dt for i in range(3))
+            updated.velocity = tuple(
+                VELOCITY_ALPHA * sample[i] + (1 - VELOCITY_ALPHA) * track.velocity[i] for i in range(3)
+            )
+        else:
+            updated.velocity = track.velocity
+        return updated
+
+    def nearest(self, types, origin):
+        wanted = {types.lower()} if isinstance(types, str) else {t.lower() for t in types}
+        best = None
+        for t in self.tracks.values():
+            if t.type in wanted:
+                d = math.dist(t.position, origin)
+                if best is None or d < best[0]:
+                    best = (d, t)
+        return best[1] if best else None
+
+    def intercept(self, track, origin, speed=AGENT_SPEED, now=None):
+        # Where to head to meet the entity: its position at the intercept time, or its
+        # position MAX_HORIZON seconds ahead when it cannot be caught sooner.
+        x, y, z = track.predict(max(0.0, now - track.lastSeen)) if now is not None else track.position
+        vx, _, vz = track.velocity
+        t = interceptTime((x - origin[0], y - origin[1], z - origin[2]), track.velocity, speed)
+        horizon = MAX_HORIZON if t is None else min(t, MAX_HORIZON)
+        return (x + vx * horizon, y, z + vz * horizon)
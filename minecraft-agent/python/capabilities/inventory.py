@@ -1,7 +1,7 @@
-import time
 import random
 from typing import Any, Dict, List, Optional
 
+from capabilities.actions import pause, waitUntil
 from models.constants import EDIBLE_ITEMS
 
 
@@ -36,12 +36,28 @@ def findEdibleInventoryItem(inventory: List[Dict[str, Any]]):
     return random.choice(candidates)
 
 
+def _itemCount(items, itemType, index: Optional[int] = None) -> int:
+    return sum(
+        int(item.get("quantity", 0) or 0)
+        for item in items
+        if isinstance(item, dict) and item.get("type") == itemType
+        and (index is None or int(item.get("index", -1)) == index)
+    )
+
+
+def _slotHolds(frame, index: int, itemType) -> bool:
+    items = frame.get("getInventory")
+    return isinstance(items, list) and _itemCount(items, itemType, index) > 0
+
+
 def eatFromInventory(env):
     if not env.connected or not env.rob or not env.mc:
         return
 
-    env.rob.observeProcCached()
-    inv = env.rob.waitNotNoneObserve("getInventory", updateReq=True, observeReq=True) or []
+    # A blocking read on the socket; the poller must not observe at the same time.
+    with env.poller.lock:
+        env.rob.observeProcCached()
+        inv = env.rob.waitNotNoneObserve("getInventory", updateReq=True, observeReq=True) or []
     if not inv:
         return
 
@@ -53,21 +69,32 @@ def eatFromInventory(env):
     current_idx = getCurrentItemIndex(env)
     dst_idx = current_idx if (current_idx is not None and current_idx >= 0) else 0
 
+    target_type = target.get("type")
     if target_idx != dst_idx:
-        env.rob.sendCommand(f"swapInventoryItems {dst_idx} {target_idx}")
-        time.sleep(1)
+        env.commands.send(f"swapInventoryItems {dst_idx} {target_idx}")
+        waitUntil(env, lambda frame: _slotHolds(frame, dst_idx, target_type), 1)
+
+    food_before = env.observe().food
+    count_before = _itemCount(inv, target_type)
 
-    food_before = env.mc.getFullStat("Food")
+    # Eating shows up as a higher food stat or as one item fewer in the inventory.
+    def ate(frame):
+        if food_before is not None and frame.food is not None and frame.food > food_before:
+            return True
+        items = frame.get("getInventory")
+        return isinstance(items, list) and _itemCount(items, target_type) < count_before
 
-    env.rob.sendCommand("use 1")
-    time.sleep(10.0)
-    env.rob.sendCommand("use 0")
-    time.sleep(0.4)
+    env.commands.send("use 1")
+    try:
+        waitUntil(env, ate, 10.0)
+    finally:
+        env.commands.send("use 0")
+    pause(0.4)
 
-    food_after = env.mc.getFullStat("Food")
+    food_after = env.observe().food
     print(f"Food before: {food_before}, Food after: {food_after}")
 
-    if food_before is not None and food_after is not None and float(food_after) > float(food_before):
+    if food_before is not None and food_after is not None and food_after > food_before:
         return f"Ate ({target.get('type', 'food')})"
 
     return
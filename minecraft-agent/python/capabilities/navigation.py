@@ -1,5 +1,12 @@
-from heapq import heappop, heappush
-import math
+import os
+import time
+
+import numpy as np
+
+from capabilities.planners import DIRECTIONS, PLANNERS
+from capabilities.voxel_grid import VoxelGrid
+from models.constants import DROPPED_ITEM, HOSTILE_ENTITIES
+from models.type import PlanQuality, PlanResult
 
 class Navigation:
     walkableBlocks = {
@@ -9,6 +16,12 @@ class Navigation:
         "redstone_wire", "tripwire", "tripwire_hook", "rail"
     }
     dangerBlocks = {"lava", "fire", "magma_block", "cactus", "sweet_berry_bush"}
+    nonBlockingEntities = {DROPPED_ITEM, "experience_orb", "arrow"}
+    hostileEntities = HOSTILE_ENTITIES
+    _blockTableCache = {}
+    planner = os.getenv("OPENPSI_NAV_PLANNER", "surface")
+    planBudgetSeconds = float(os.getenv("OPENPSI_NAV_BUDGET", "0.25"))
+    lastExpansions = 0
 
     @staticmethod
     def normalizeBlockName(blockType):
@@ -34,101 +47,77 @@ class Navigation:
         return Navigation.normalizeBlockName(blockType) not in Navigation.dangerBlocks
     
     @staticmethod
-    def getNeighbors(pos, gridMap):
+    def stepTo(pos, dx, dz, grid):
         x, y, z = pos
+        for dy in [0, 1, -1]:
+            target = (x + dx, y + dy, z + dz)
+            if grid.isStandable(target):
+                if dy == 1 and grid.hasLowCeiling(pos):
+                    return None
+                return target
+        return None
+
+    @staticmethod
+    def getNeighbors(pos, grid):
         neighbors = []
-        for dx, dz in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
-            nx, nz = x + dx, z + dz
-            
-            for dy in [0, 1, -1]:
-                ny = y + dy
-                target = (nx, ny, nz)
-                target_head = (nx, ny + 1, nz)
-                block_below_target = (nx, ny - 1, nz)
-                
-                if target not in gridMap or target_head not in gridMap or block_below_target not in gridMap or Navigation.is_passable(gridMap[block_below_target]):
-                    continue
-
-                if not (Navigation.is_passable(gridMap[target]) and Navigation.is_passable(gridMap[target_head])):
-                    continue
-                
-                if not Navigation.is_safe(gridMap[target]):
-                    continue
-
-
-                if dy == 1: 
-                    nextHeadPosition = (x, y + 2, z)
-                    if nextHeadPosition in gridMap and not Navigation.is_passable(gridMap[nextHeadPosition]):
-                        continue
-                
+        for dx, dz in DIRECTIONS:
+            target = Navigation.stepTo(pos, dx, dz, grid)
+            if target is not None:
                 neighbors.append(target)
-                
         return neighbors
 
     @staticmethod
-    def aStar(start, goal, grid_map):
-        if start not in grid_map or goal not in grid_map:
+    def setPlanner(name):
+        if name not in PLANNERS:
+            raise ValueError(f"Unknown planner '{name}'. Available: {', '.join(sorted(PLANNERS))}")
+        Navigation.planner = name
+
+    @staticmethod
+    def plan(start, goal, grid, budgetSeconds=None, planner=None) -> PlanResult:
+        if start not in grid:
+            return PlanResult([], PlanQuality.FAILED)
+
+        name = planner or Navigation.planner
+        search = PLANNERS.get(name)
+        if search is None:
+            print(f"Unknown planner '{name}', falling back to astar.")
+            search = PLANNERS["astar"]
+
+        deadline = None if budgetSeconds is None else time.monotonic() + budgetSeconds
+        result = search(start, goal, grid, Navigation.stepTo, deadline)
+        Navigation.lastExpansions = result.expansions
+        return result
+
+    @staticmethod
+    def aStar(start, goal, grid, planner=None):
+        if start not in grid or goal not in grid:
             return None
-        
-        def heuristic(a, b):
-            return math.sqrt((a[0]-b[0])**2 + (a[1]-b[1])**2 + (a[2]-b[2])**2)
+        result = Navigation.plan(start, goal, grid, planner=planner)
+        return result.path if result.quality == PlanQuality.COMPLETE else None
 
-        heap = []
-        heappush(heap, (0, start))
-        
-        visited = {}
-        g_score = {start: 0}
-        uniformCost = 1
-        
-        iterations = 0
-        MAX_ITER = 5000
-        while heap:
-            iterations += 1
-            
-            if iterations > MAX_ITER:
-                print("Pathfinding timed out.")
-                return None
-
-            _, current = heappop(heap)
-
-            if current == goal:
-                path = []
-                while current in visited:
-                    path.append(current)
-                    current = visited[current]
-
-                return path[::-1]
-
-            for neighbor in Navigation.getNeighbors(current, grid_map):
-                current_g_cost = g_score[current] + uniformCost
-                
-                if neighbor not in g_score or current_g_cost < g_score[neighbor]:
-                    visited[neighbor] = current
-                    g_score[neighbor] = current_g_cost
-                    f_score = current_g_cost + heuristic(neighbor, goal)
-                    heappush(heap, (f_score, neighbor))
-        
-        return None
+    @staticmethod
+    def blockTables(palette):
+        cache = Navigation._blockTableCache
+        passable = np.empty(len(palette), dtype=bool)
+        safe = np.empty(len(palette), dtype=bool)
+        for i, name in enumerate(palette):
+            entry = cache.get(name)
+            if entry is None:
+                entry = (Navigation.is_passable(name), Navigation.is_safe(name))
+                cache[name] = entry
+            passable[i], safe[i] = entry
+        return passable, safe
 
     @staticmethod
     def parseGrid(grid_list, grid_box):
-        grid_map = {}
         x_min, x_max = grid_box[0]
         y_min, y_max = grid_box[1]
         z_min, z_max = grid_box[2]
-        
+
         sz_x = x_max - x_min + 1
         sz_y = y_max - y_min + 1
         sz_z = z_max - z_min + 1
-        
-        idx = 0
-        N = len(grid_list)
-        for y_off in range(sz_y):
-            for z_off in range(sz_z):
-                for x_off in range(sz_x):
-                    if idx < N:
-                        pos = (x_min + x_off, y_min + y_off, z_min + z_off)
-                        block_name = grid_list[idx].replace("minecraft:", "")
-                        grid_map[pos] = block_name
-                        idx += 1
-        return grid_map
\ No newline at end of file
+
+        ids, palette = VoxelGrid.encodeBlocks(grid_list, sz_x * sz_y * sz_z)
+        passable, safe = Navigation.blockTables(palette)
+        return VoxelGrid(ids.reshape(sz_y, sz_z, sz_x), palette, (x_min, y_min, z_min), passable, safe)
@@ -1,6 +1,92 @@
-import math
+import os
+import time
+
+from capabilities.entity_index import EntityIndex
+from capabilities.world_map import floorCell
+from models.type import Observation, ObservationProfile
+
+# How long a built Observation may be reused, in seconds. Actions invalidate it earlier.
+OBSERVATION_TTL = float(os.getenv("OPENPSI_OBS_TTL", "0.25"))
+
+# What each observe reads, and how much of the near grid is parsed. The mission ships
+# the union of all profile grids (Vereya fixes the grid when the mission starts); a
+# profile with smaller bounds crops it before anything is parsed.
+VITALS_KEYS = ("getAgentPos", "getLife", "getAir", "getOnGround")
+PROFILES = {
+    "vitals": ObservationProfile("vitals", VITALS_KEYS + ("getInventory",)),
+    "navigation": ObservationProfile(
+        "navigation",
+        VITALS_KEYS + ("getNearGrid", "getNearEntities", "getInventory", "getLineOfSights"),
+        [[-30, 30], [-5, 5], [-30, 30]],
+    ),
+    # Tall and narrow: a drowning agent mostly gets out by swimming up, and its air
+    # budget rarely reaches exits more than a few blocks to the side.
+    "drowning": ObservationProfile("drowning", VITALS_KEYS + ("getNearGrid",), [[-8, 8], [-12, 12], [-8, 8]], False),
+}
+DEFAULT_PROFILE = os.getenv("OPENPSI_OBS_PROFILE", "navigation")
+
+
+def missionGridBounds():
+    bounds = [p.bounds for p in PROFILES.values() if p.bounds]
+    return [[min(b[i][0] for b in bounds), max(b[i][1] for b in bounds)] for i in range(3)]
+
+
+def cropGrid(rawGrid, bounds, window):
+    # Sub-grid of a flat y/z/x near grid, sliced row by row without parsing it.
+    if window == bounds:
+        return rawGrid
+    dimX = bounds[0][1] - bounds[0][0] + 1
+    dimZ = bounds[2][1] - bounds[2][0] + 1
+    x0 = window[0][0] - bounds[0][0]
+    x1 = window[0][1] - bounds[0][0] + 1
+    rows = []
+    for y in range(window[1][0] - bounds[1][0], window[1][1] - bounds[1][0] + 1):
+        for z in range(window[2][0] - bounds[2][0], window[2][1] - bounds[2][0] + 1):
+            start = (y * dimZ + z) * dimX
+            rows.extend(rawGrid[start + x0:start + x1])
+    return rows
+
+
+def dayTime(env, worldTime):
+    worldStart = int(env.mission.serverSection.initial_conditions.time_start or 0)
+    timeOffset = int(getattr(env, "timeAddOffset", 0))
+    return worldTime + worldStart + timeOffset
+
+
+def isNightTime(ticks):
+    return 13000 <= ticks % 24000 < 23000
+
+
+class ObservationCache:
+    # Single-slot snapshot cache. The version is bumped whenever something may have
+    # changed the world (an action ran, the agent was steered), so a snapshot is reused
+    # only while it is both younger than the TTL and built at the current version.
+
+    def __init__(self, ttl: float = OBSERVATION_TTL):
+        self.ttl = ttl
+        self.version = 0
+        self.builds = 0
+        self.hits = 0
+        self._snapshot = None
+        self._builtAt = 0.0
+        self._builtVersion = -1
+
+    def invalidate(self):
+        self.version += 1
+
+    def get(self, build, maxAge=None):
+        ttl = self.ttl if maxAge is None else maxAge
+        now = time.monotonic()
+        if self._snapshot is not None and self._builtVersion == self.version and now - self._builtAt <= ttl:
+            self.hits += 1
+            return self._snapshot
 
-from models.type import Observation
+        snapshot = build()
+        self._snapshot = snapshot
+        self._builtAt = now
+        self._builtVersion = self.version
+        self.builds += 1
+        return snapshot
 
 
 def getDefaultObservation() -> Observation:
@@ -14,9 +100,19 @@ def buildObservation(env) -> Observation:
     if not env.connected or not env.rob:
         return getDefaultObservation()
 
-    env.rob.observeProcCached()
+    frame = env.observe()
+    # Fields the frame's profile did not read keep their previous value instead of
+    # falling back to defaults. Frames without a known profile (older recordings)
+    # are taken to have read everything.
+    profile = PROFILES.get(frame.profile)
+    previous = getattr(env, "_lastObservation", None) or getDefaultObservation()
 
-    pos = env.rob.getCachedObserve("getAgentPos")  # [x, y, z, pitch, yaw]
+    def reads(key):
+        return profile is None or key in profile.keys
+
+    fullStats = profile is None or profile.fullStats
+
+    pos = frame.get("getAgentPos")  # [x, y, z, pitch, yaw]
     if pos:
         p = (pos[0], pos[1], pos[2])
         y = pos[4]
@@ -26,51 +122,42 @@ def buildObservation(env) -> Observation:
         y = 0.0
         pitch = 0.0
 
-    life = env.rob.getCachedObserve("getLife") or 20.0
+    life = frame.get("getLife") or 20.0
 
-    food = env.mc.getFullStat("Food")
-    food = float(food) if food is not None else 20.0
+    if fullStats:
+        food = frame.food if frame.food is not None else 20.0
+    else:
+        food = previous.hunger
 
-    air = env.rob.getCachedObserve("getAir")
+    air = frame.get("getAir")
     air = float(air) if air is not None else 300.0
 
-    on_ground = env.rob.getCachedObserve("getOnGround")
+    on_ground = frame.get("getOnGround")
     if on_ground is None:
         on_ground = True
 
-    action_status = env.mc.getActionStatus()
+    action_status = frame.actionStatus
     if action_status is None:
-        action_status = "unknown"
+        action_status = "unknown" if fullStats else previous.actionStatus
 
-    worldTime = env.mc.getFullStat("WorldTime")
-    worldStart = int(env.mission.serverSection.initial_conditions.time_start or 0)
+    worldTime = frame.worldTime
     if worldTime is not None:
-        worldTime = int(worldTime)
-        timeOffset = int(getattr(env, "timeAddOffset", 0))
-        dayTime = worldTime + worldStart + timeOffset
-        timeMod = dayTime % 24000
-        isNight = 13000 <= timeMod < 23000
-        is_day = not isNight
-        timeValue = dayTime
+        timeValue = dayTime(env, worldTime)
+        is_day = not isNightTime(timeValue)
+    elif not fullStats:
+        timeValue = previous.timeOfDay
+        is_day = previous.isDay
     else:
         timeValue = 6000
         is_day = True
 
-    ents = env.rob.getCachedObserve("getNearEntities") or []
-    parsedEnts = []
-    for e in ents:
-        ex, ey, ez = e.get("x", 0), e.get("y", 0), e.get("z", 0)
-        dist = math.sqrt((ex - p[0]) ** 2 + (ey - p[1]) ** 2 + (ez - p[2]) ** 2)
-        parsedEnts.append(
-            {
-                "type": e.get("name", "unknown").lower(),
-                "distance": dist,
-                "position": [ex, ey, ez],
-            }
-        )
-
-    rawInventory = env.rob.getCachedObserve("getInventory")
-    inv = []
+    if reads("getNearEntities") or previous.entityIndex is None:
+        entityIndex = EntityIndex(frame.get("getNearEntities", []), p)
+    else:
+        entityIndex = previous.entityIndex
+
+    rawInventory = frame.get("getInventory")
+    inv = [] if reads("getInventory") else list(previous.inventory)
     if rawInventory and isinstance(rawInventory, list):
         for item in rawInventory:
             inv.append(
@@ -80,9 +167,13 @@ def buildObservation(env) -> Observation:
                 }
             )
 
-    blocks = []
+    rawGrid = frame.get("getNearGrid")
+    blocks = [] if reads("getNearGrid") else previous.nearbyBlocks
+    if rawGrid and pos:
+        snapshot = env.worldMap.recordSnapshot(rawGrid, frame.bounds, floorCell(pos[0], pos[1], pos[2]))
+        blocks = env.blockSummarizer.summarize(snapshot)
 
-    line_of_sight = env.rob.getCachedObserve("getLineOfSights")
+    line_of_sight = frame.get("getLineOfSights") if reads("getLineOfSights") else previous.lineOfSight
     line_of_sight_type = None
     line_of_sight_distance = None
     line_of_sight_hit_type = None
@@ -91,7 +182,7 @@ def buildObservation(env) -> Observation:
         line_of_sight_distance = line_of_sight.get("distance")
         line_of_sight_hit_type = line_of_sight.get("hitType")
 
-    return Observation(
+    observation = Observation(
         position=p,
         yaw=y,
         pitch=pitch,
@@ -100,7 +191,7 @@ def buildObservation(env) -> Observation:
         isDay=is_day,
         timeOfDay=timeValue,
         inventory=inv,
-        nearbyEntities=parsedEnts,
+        nearbyEntities=entityIndex.entries(),
         nearbyBlocks=blocks,
         lineOfSight=line_of_sight,
         air=air,
@@ -109,4 +200,7 @@ def buildObservation(env) -> Observation:
         lineOfSightType=line_of_sight_type,
         lineOfSightDistance=line_of_sight_distance,
         lineOfSightHitType=line_of_sight_hit_type,
+        entityIndex=entityIndex,
     )
+    env._lastObservation = observation
+    return observation
@@ -0,0 +1,147 @@
+import math
+
+LOOK_AHEAD = 1.5
+ARRIVE_RADIUS = 0.35
+# Half the width of the player's hitbox; lines passing closer than this to a block corner
+# must clear both cells around it.
+CLEARANCE = 0.3
+
+
+def _sign(v):
+    return (v > 0) - (v < 0)
+
+
+def traverse(a, b, grid, step):
+    # Cells crossed by the straight line between the centres of a and b in the x/z
+    # plane, following the terrain with the planner's move model. Returns None when the
+    # line is not walkable or does not end on b.
+    dx, dz = b[0] - a[0], b[2] - a[2]
+    nx, nz = abs(dx), abs(dz)
+    sx, sz = _sign(dx), _sign(dz)
+    length = math.hypot(dx, dz)
+    cells = []
+    cur = a
+    ix = iz = 0
+    while ix < nx or iz < nz:
+        tX = (ix + 0.5) / nx if ix < nx else math.inf
+        tZ = (iz + 0.5) / nz if iz < nz else math.inf
+        nearCorner = tX != math.inf and tZ != math.inf and abs(tX - tZ) * nx * nz / length < CLEARANCE
+        if nearCorner:
+            # The hitbox overlaps all four cells around the corner, so both ways around
+            # it must be walkable and meet on the same cell. The line itself still
+            # crosses one boundary at a time.
+            viaX = step(cur, sx, 0, grid)
+            viaZ = step(cur, 0, sz, grid)
+            if viaX is None or viaZ is None:
+                return None
+            diagonal = step(viaX, 0, sz, grid)
+            if diagonal is None or diagonal != step(viaZ, sx, 0, grid):
+                return None
+        if tX <= tZ:
+            nxt = step(cur, sx, 0, grid)
+            ix += 1
+        else:
+            nxt = step(cur, 0, sz, grid)
+            iz += 1
+        if nxt is None:
+            return None
+        cells.append(nxt)
+        cur = nxt
+    return cells if cur == b else None
+
+
+def smoothPath(start, path, grid, step):
+    # Line-of-sight string pulling: from each anchor, skip ahead to the farthest path
+    # cell that can be reached in a straight line. On weighted grids a shortcut may not
+    # enter cells costlier than those of the path it replaces. Returns the waypoints and
+    # the cells the straightened path walks over.
+    nodes = [start] + list(path)
+    weighted = grid.costs is not None
+    waypoints = []
+    cells = []
+    anchor = 0
+    while anchor < len(nodes) - 1:
+        best = anchor + 1
+        bestCells = [nodes[best]]
+        limit = grid.stepCost(nodes[best])
+        for j in range(anchor + 2, len(nodes)):
+            line = traverse(nodes[anchor], nodes[j], grid, step)
+            if line is None:
+                break
+            if weighted:
+                limit = max(limit, grid.stepCost(nodes[j]))
+                if max(grid.stepCost(c) for c in line) > limit:
+                    break
+            best, bestCells = j, line
+        waypoints.append(nodes[best])
+        cells.extend(bestCells)
+        anchor = best
+    return waypoints, cells
+
+
+class PurePursuit:
+    # Continuous follower over a waypoint polyline: the agent steers at the point that
+    # lies lookAhead blocks further along the path than its own projection onto it.
+
+    def __init__(self, start, waypoints, cells, lookAhead=LOOK_AHEAD):
+        self.points = [(c[0] + 0.5, c[2] + 0.5) for c in [start] + list(waypoints)]
+        self.heights = {(c[0], c[2]): c[1] for c in [start] + list(cells)}
+        self.goal = waypoints[-1] if waypoints else start
+        self.lookAhead = lookAhead
+        self.segment = 0
+
+    def _project(self, x, z):
+        # The projection only moves forward, and at most over the next few segments so
+        # that a path folding back on itself is not short-cut.
+        best = None
+        for i in range(self.segment, min(self.segment + 3, len(self.points) - 1)):
+            (ax, az), (bx, bz) = self.points[i], self.points[i + 1]
+            vx, vz = bx - ax, bz - az
+            seg2 = vx * vx + vz * vz
+            t = 0.0 if seg2 == 0 else max(0.0, min(1.0, ((x - ax) * vx + (z - az) * vz) / seg2))
+            px, pz = ax + t * vx, az + t * vz
+            d = (x - px) ** 2 + (z - pz) ** 2
+            if best is None or d < best[0]:
+                best = (d, i, t)
+        if best is None:
+            return len(self.points) - 1, 0.0
+        self.segment = best[1]
+        return best[1], best[2]
+
+    def _advance(self, segment, t, distance):
+        # Point `distance` blocks along the path from (segment, t), plus the distance
+        # that was left over when the path ran out.
+        while segment < len(self.points) - 1:
+            (ax, az), (bx, bz) = self.points[segment], self.points[segment + 1]
+            seg = math.hypot(bx - ax, bz - az)
+            left = seg * (1 - t)
+            if distance <= left and seg > 0:
+                t += distance / seg
+                return (ax + t * (bx - ax), az + t * (bz - az)), 0.0
+            distance -= left
+            segment, t = segment + 1, 0.0
+        return self.points[-1], distance
+
+    def target(self, pos):
+        segment, t = self._project(pos[0], pos[2])
+        point, _ = self._advance(segment, t, self.lookAhead)
+        return point
+
+    def remaining(self, pos):
+        # Path length still ahead of the agent's projection; used to detect progress.
+        segment, t = self._project(pos[0], pos[2])
+        total = 0.0
+        for i in range(segment, len(self.points) - 1):
+            (ax, az), (bx, bz) = self.points[i], self.points[i + 1]
+            total += math.hypot(bx - ax, bz - az) * ((1 - t) if i == segment else 1)
+        return total
+
+    def groundAhead(self, pos, distance=1.0):
+        # Floor height of the path cell a short way ahead, used to decide when to jump.
+        segment, t = self._project(pos[0], pos[2])
+        (x, z), _ = self._advance(segment, t, distance)
+        return self.heights.get((math.floor(x), math.floor(z)))
+
+    def finished(self, pos):
+        gx, gz = self.points[-1]
+        return math.hypot(gx - pos[0], gz - pos[2]) < ARRIVE_RADIUS and abs(self.goal[1] - pos[1]) < 1.0
@@ -0,0 +1,663 @@
+import time
+from heapq import heappop, heappush
+from itertools import count
+
+import numpy as np
+
+from models.type import PlanQuality, PlanResult
+
+DIRECTIONS = ((0, 1), (0, -1), (1, 0), (-1, 0))
+MAX_EXPANSIONS = 5000
+DEADLINE_CHECK_INTERVAL = 64
+CLUSTER_SIZE = 10
+# Clusters kept by a ClusterGraph before those outside the current window are dropped.
+MAX_CACHED_CLUSTERS = 1024
+
+
+def heuristic(a, b):
+    # Every move changes x or z by one and y by at most one, so this never overestimates.
+    return max(abs(a[0] - b[0]) + abs(a[2] - b[2]), abs(a[1] - b[1]))
+
+
+def reconstruct(parents, node):
+    path = []
+    while node in parents:
+        path.append(node)
+        node = parents[node]
+    return path[::-1]
+
+
+def toPlanResult(path, found, expansions):
+    if found:
+        return PlanResult(path, PlanQuality.COMPLETE, expansions)
+    if path:
+        return PlanResult(path, PlanQuality.PARTIAL, expansions)
+    return PlanResult([], PlanQuality.FAILED, expansions)
+
+
+def bestFirstSearch(start, goal, successors, maxExpansions=MAX_EXPANSIONS, deadline=None):
+    # successors(node, parent) yields (next, cost) pairs. Returns the parent map, the
+    # goal (or, when the search gives up, the expanded node closest to it), whether the
+    # goal was reached and the number of expansions.
+    tie = count()
+    heap = [(heuristic(start, goal), 0, next(tie), start)]
+    parents = {}
+    gScore = {start: 0}
+    closed = set()
+    expansions = 0
+    best = start
+    bestKey = (heuristic(start, goal), 0)
+
+    while heap:
+        _, g, _, current = heappop(heap)
+        if current in closed:
+            continue
+        if current == goal:
+            return parents, goal, True, expansions
+
+        key = (heuristic(current, goal), g)
+        if key < bestKey:
+            best, bestKey = current, key
+
+        expansions += 1
+        if maxExpansions is not None and expansions > maxExpansions:
+            print("Pathfinding timed out.")
+            break
+        if deadline is not None and expansions % DEADLINE_CHECK_INTERVAL == 0 and time.monotonic() > deadline:
+            print("Pathfinding budget exhausted.")
+            break
+        closed.add(current)
+
+        for neighbor, cost in successors(current, parents.get(current)):
+            if neighbor in closed:
+                continue
+            tentative = g + cost
+            if tentative < gScore.get(neighbor, float("inf")):
+                parents[neighbor] = current
+                gScore[neighbor] = tentative
+                heappush(heap, (tentative + heuristic(neighbor, goal), tentative, next(tie), neighbor))
+
+    return parents, best, False, expansions
+
+
+def searchLimits(deadline):
+    # A wall-clock budget replaces the fixed expansion cap.
+    return {"maxExpansions": None if deadline is not None else MAX_EXPANSIONS, "deadline": deadline}
+
+
+def aStarSearch(start, goal, grid, step, deadline=None):
+    stepCost = grid.stepCost if grid.costs is not None else None
+
+    def successors(node, parent):
+        for dx, dz in DIRECTIONS:
+            neighbor = step(node, dx, dz, grid)
+            if neighbor is not None:
+                yield neighbor, 1 if stepCost is None else stepCost(neighbor)
+
+    parents, end, found, expansions = bestFirstSearch(start, goal, successors, **searchLimits(deadline))
+    return toPlanResult(reconstruct(parents, end), found, expansions)
+
+
+def _direction(parent, node):
+    dx = node[0] - parent[0]
+    dz = node[2] - parent[2]
+    return (dx > 0) - (dx < 0), (dz > 0) - (dz < 0)
+
+
+def jumpPointSearch(start, goal, grid, step, deadline=None):
+    # 4-connected JPS with a canonical "x first, then z" ordering, extended to terrain:
+    # any change of height ends a jump, so stairs and slopes become jump points.
+    # Jumps are only valid on uniform costs; weighted grids are searched with plain A*.
+    if grid.costs is not None:
+        return aStarSearch(start, goal, grid, step, deadline)
+
+    # Cells scanned by the jumps are not expanded, so the one closest to the goal is
+    # tracked here with the turns that lead to it from the expanded node.
+    origin = [start]
+    nearest = [heuristic(start, goal), start, ()]
+
+    def scanned(cell, via):
+        h = heuristic(cell, goal)
+        if h < nearest[0]:
+            nearest[:] = [h, origin[0], via + (cell,)]
+
+    def jumpZ(node, dz, via=()):
+        prev = node
+        cur = step(node, 0, dz, grid)
+        steps = 1
+        while cur is not None:
+            scanned(cur, via)
+            if cur == goal or cur[1] != prev[1]:
+                return cur, steps
+            for dx in (1, -1):
+                side = step(cur, dx, 0, grid)
+                if side is None:
+                    continue
+                prevSide = step(prev, dx, 0, grid)
+                if prevSide is None or prevSide[1] != side[1]:
+                    return cur, steps
+            prev, cur = cur, step(cur, 0, dz, grid)
+            steps += 1
+        return None
+
+    def jumpX(node, dx):
+        prev = node
+        cur = step(node, dx, 0, grid)
+        steps = 1
+        while cur is not None:
+            scanned(cur, ())
+            if cur == goal or cur[1] != prev[1]:
+                return cur, steps
+            if jumpZ(cur, 1, (cur,)) is not None or jumpZ(cur, -1, (cur,)) is not None:
+                return cur, steps
+            prev, cur = cur, step(cur, dx, 0, grid)
+            steps += 1
+        return None
+
+    def successors(node, parent):
+        origin[0] = node
+        if parent is None:
+            directions = DIRECTIONS
+        else:
+            dx, dz = _direction(parent, node)
+            if dx != 0:
+                directions = ((dx, 0), (0, 1), (0, -1))
+            else:
+                directions = ((0, dz), (1, 0), (-1, 0))
+        for dx, dz in directions:
+            jump = jumpX(node, dx) if dx != 0 else jumpZ(node, dz)
+            if jump is not None:
+                yield jump
+
+    parents, end, found, expansions = bestFirstSearch(start, goal, successors, **searchLimits(deadline))
+    jumpPoints = reconstruct(parents, end)
+    if not found and nearest[0] < heuristic(end, goal):
+        jumpPoints = reconstruct(parents, nearest[1]) + list(nearest[2])
+    return toPlanResult(expandJumps(jumpPoints, start), found, expansions)
+
+
+def expandJumps(jumpPoints, start):
+    path = []
+    prev = start
+    for node in jumpPoints:
+        dx, dz = _direction(prev, node)
+        x, y, z = prev
+        for _ in range(abs(node[0] - prev[0]) + abs(node[2] - prev[2]) - 1):
+            x, z = x + dx, z + dz
+            path.append((x, y, z))
+        path.append(node)
+        prev = node
+    return path
+
+
+class ClusterGraph:
+    # HPA*-style abstraction: the x/z plane is cut into square clusters, one entrance
+    # pair is kept per connected run of border crossings, and entrances of the same
+    # cluster are linked by paths that stay inside it. Clusters are aligned to world
+    # coordinates, so one graph lives on the WorldMap across planning windows: update()
+    # fingerprints the clusters a window covers and rebuilds only those whose cells or
+    # costs changed, together with the borders around them.
+
+    def __init__(self, step, clusterSize=CLUSTER_SIZE, maxClusters=MAX_CACHED_CLUSTERS):
+        self.step = step
+        self.clusterSize = clusterSize
+        self.maxClusters = maxClusters
+        self.grid = None
+        self.gridVersion = None
+        self.fingerprints = {}
+        # (clusterA, clusterB) with A < B -> crossing edges [(a, b, cost, path)].
+        self.borders = {}
+        self.crossing = {}
+        self.clusterNodes = {}
+        # cluster -> {node: {target: (cost, path)}} for paths inside the cluster.
+        self.inside = {}
+        self.active = set()
+        self.rebuilt = 0
+        self.expansions = 0
+
+    def clusterOf(self, pos):
+        return (pos[0] // self.clusterSize, pos[2] // self.clusterSize)
+
+    def _columns(self, grid, cluster):
+        # Slices of the grid's z and x axes that fall inside the cluster.
+        cs = self.clusterSize
+        sy, sz, sx = grid.shape
+        ox, _, oz = grid.origin
+        x0 = max(cluster[0] * cs - ox, 0)
+        z0 = max(cluster[1] * cs - oz, 0)
+        return slice(z0, min((cluster[1] + 1) * cs - oz, sz)), slice(x0, min((cluster[0] + 1) * cs - ox, sx))
+
+    def _fingerprint(self, grid, cluster):
+        zs, xs = self._columns(grid, cluster)
+        parts = [grid.standable[:, zs, xs].tobytes(), grid.lowCeiling[:, zs, xs].tobytes()]
+        if grid.costs is not None:
+            parts.append(grid.costs[:, zs, xs].tobytes())
+        ox, oy, oz = grid.origin
+        extent = (oz + zs.start, oz + zs.stop, ox + xs.start, ox + xs.stop)
+        return (oy, grid.shape[0]) + extent + (hash(b"|".join(parts)),)
+
+    @staticmethod
+    def _neighbors(cluster):
+        cx, cz = cluster
+        return ((cx + 1, cz), (cx - 1, cz), (cx, cz + 1), (cx, cz - 1))
+
+    def update(self, grid, deadline=None) -> bool:
+        # False when the deadline ran out; whatever was left unfinished is rebuilt by
+        # the next update.
+        self.expansions = 0
+        self.rebuilt = 0
+        if grid is self.grid and grid.version == self.gridVersion:
+            return True
+        self.grid = grid
+        self.gridVersion = None
+
+        cs = self.clusterSize
+        (x0, x1), _, (z0, z1) = grid.bounds
+        window = [(cx, cz) for cx in range(x0 // cs, x1 // cs + 1) for cz in range(z0 // cs, z1 // cs + 1)]
+        prints = {c: self._fingerprint(grid, c) for c in window}
+        self.active = set(window)
+        self._evict()
+
+        dirty = {c for c in window if self.fingerprints.get(c) != prints[c]}
+        borders = set()
+        for c in dirty:
+            for n in self._neighbors(c):
+                border = (min(c, n), max(c, n))
+                self._dropBorder(border)
+                if n in self.active:
+                    borders.add(border)
+        # Borders dropped while one side was outside the window.
+        for c in window:
+            for n in self._neighbors(c):
+                border = (min(c, n), max(c, n))
+                if n in self.active and border not in self.borders:
+                    borders.add(border)
+        touched = set(dirty).union(*borders) if borders else set(dirty)
+        # Forgotten until rebuilt, so an interrupted update leaves nothing stale behind.
+        for c in touched:
+            self.fingerprints.pop(c, None)
+
+        for border in borders:
+            self._buildBorder(border)
+        for c in touched:
+            nodes = self._nodesOf(c)
+            if c not in dirty and nodes == self.clusterNodes.get(c):
+                self.fingerprints[c] = prints[c]
+                continue
+            self.clusterNodes[c] = nodes
+            links = {}
+            for node in nodes:
+                found = self._searchInside(node, c, nodes, deadline=deadline)
+                if found is None:
+                    self.inside.pop(c, None)
+                    return False
+                links[node] = found
+            self.inside[c] = links
+            self.fingerprints[c] = prints[c]
+            self.rebuilt += 1
+        self.gridVersion = grid.version
+        return True
+
+    def _evict(self):
+        if len(self.fingerprints) <= self.maxClusters:
+            return
+        for c in [c for c in self.fingerprints if c not in self.active]:
+            del self.fingerprints[c]
+            self.inside.pop(c, None)
+            self.clusterNodes.pop(c, None)
+            for n in self._neighbors(c):
+                self._dropBorder((min(c, n), max(c, n)))
+
+    def _dropBorder(self, border):
+        for a, b, _, _ in self.borders.pop(border, ()):
+            edges = self.crossing.get(a)
+            if edges is not None:
+                edges.pop(b, None)
+                if not edges:
+                    del self.crossing[a]
+
+    def _nodesOf(self, cluster):
+        nodes = set()
+        for n in self._neighbors(cluster):
+            for a, b, _, _ in self.borders.get((min(cluster, n), max(cluster, n)), ()):
+                nodes.update(node for node in (a, b) if self.clusterOf(node) == cluster)
+        return frozenset(nodes)
+
+    def _buildBorder(self, border):
+        # Crossings are scanned from both sides so one-way drops are kept too.
+        grid = self.grid
+        ox, oy, oz = grid.origin
+        standable = grid.standable
+        low, high = border
+        edges = []
+        if low[1] == high[1]:
+            zs, _ = self._columns(grid, low)
+            for side, sign in ((high[0] * self.clusterSize - 1, 1), (high[0] * self.clusterSize, -1)):
+                ix = side - ox
+                cells = [(side, oy + int(iy), oz + zs.start + int(iz)) for iy, iz in np.argwhere(standable[:, zs, ix])]
+                self._addCrossings(cells, (sign, 0), (0, 1), edges)
+        else:
+            _, xs = self._columns(grid, low)
+            for side, sign in ((high[1] * self.clusterSize - 1, 1), (high[1] * self.clusterSize, -1)):
+                iz = side - oz
+                cells = [(ox + xs.start + int(ix), oy + int(iy), side) for iy, ix in np.argwhere(standable[:, iz, xs])]
+                self._addCrossings(cells, (0, sign), (1, 0), edges)
+        self.borders[border] = edges
+        for a, b, cost, path in edges:
+            self.crossing.setdefault(a, {})[b] = (cost, path)
+
+    def _addCrossings(self, cells, crossing, along, edges):
+        grid = self.grid
+        step = self.step
+
+        transitions = {}
+        for cell in cells:
+            other = step(cell, crossing[0], crossing[1], grid)
+            if other is not None:
+                transitions[cell] = other
+
+        def continues(a, b):
+            return (
+                step(a, along[0], along[1], grid) == b
+                and step(b, -along[0], -along[1], grid) == a
+                and step(transitions[a], along[0], along[1], grid) == transitions[b]
+                and step(transitions[b], -along[0], -along[1], grid) == transitions[a]
+            )
+
+        visited = set()
+        for cell in sorted(transitions, key=lambda c: (c[0] + c[2], c[1])):
+            if cell in visited:
+                continue
+            run = [cell]
+            visited.add(cell)
+            while True:
+                nxt = step(run[-1], along[0], along[1], grid)
+                if nxt is None or nxt not in transitions or nxt in visited or not continues(run[-1], nxt):
+                    break
+                run.append(nxt)
+                visited.add(nxt)
+
+            a = run[len(run) // 2]
+            b = transitions[a]
+            edges.append((a, b, grid.stepCost(b), [b]))
+
+    def _searchInside(self, source, cluster, targets, reverse=False, deadline=None, towards=None):
+        # Dijkstra restricted to one cluster. Returns {target: (cost, path)}, or None
+        # when the deadline passes first. With towards set, the whole cluster is searched
+        # and the cell closest to that point is returned as one more target.
+        grid = self.grid
+        step = self.step
+        tie = count()
+        heap = [(0, next(tie), source)]
+        dist = {source: 0}
+        parents = {}
+        found = {}
+        remaining = set(targets)
+        remaining.discard(source)
+        pops = 0
+        nearest = source
+        nearestKey = (heuristic(source, towards), 0) if towards is not None else None
+        while heap and (remaining or towards is not None):
+            d, _, node = heappop(heap)
+            if d > dist[node]:
+                continue
+            pops += 1
+            if deadline is not None and pops % DEADLINE_CHECK_INTERVAL == 0 and time.monotonic() > deadline:
+                self.expansions += pops
+                return None
+            if towards is not None and (heuristic(node, towards), d) < nearestKey:
+                nearest, nearestKey = node, (heuristic(node, towards), d)
+            if node in remaining:
+                remaining.discard(node)
+                found[node] = d
+            for dx, dz in DIRECTIONS:
+                if reverse:
+                    neighbor = self._predecessor(node, dx, dz)
+                else:
+                    neighbor = step(node, dx, dz, grid)
+                if neighbor is None or self.clusterOf(neighbor) != cluster:
+                    continue
+                nd = d + grid.stepCost(node if reverse else neighbor)
+                if nd < dist.get(neighbor, float("inf")):
+                    dist[neighbor] = nd
+                    parents[neighbor] = node
+                    heappush(heap, (nd, next(tie), neighbor))
+        self.expansions += pops
+        if nearest != source and nearest not in found:
+            found[nearest] = nearestKey[1]
+
+        result = {}
+        for target, cost in found.items():
+            path = reconstruct(parents, target)
+            if reverse:
+                path = (path[::-1] + [source])[1:]
+            result[target] = (cost, path)
+        return result
+
+    def _predecessor(self, node, dx, dz):
+        # A cell one column over from which a single move lands on node.
+        x, y, z = node
+        for dy in (0, 1, -1):
+            candidate = (x + dx, y + dy, z + dz)
+            if self.grid.isStandable(candidate) and self.step(candidate, -dx, -dz, self.grid) == node:
+                return candidate
+        return None
+
+    def search(self, start, goal, deadline=None):
+        # Expects update() to have run for the current grid.
+        startCluster = self.clusterOf(start)
+        goalCluster = self.clusterOf(goal)
+        clusterOf = self.clusterOf
+        active = self.active
+
+        targets = set(self.clusterNodes.get(startCluster, ()))
+        if startCluster == goalCluster:
+            targets.add(goal)
+        # The start cluster's cell closest to the goal is a node too, so an unreachable
+        # goal still gets a partial path when no entrance is any closer.
+        fromStart = self._searchInside(start, startCluster, targets, deadline=deadline, towards=goal)
+        toGoal = None
+        if fromStart is not None:
+            toGoal = self._searchInside(goal, goalCluster, self.clusterNodes.get(goalCluster, ()), True, deadline)
+        if toGoal is None:
+            print("Pathfinding budget exhausted.")
+            return PlanResult([], PlanQuality.FAILED, self.expansions)
+
+        def edgesFrom(node):
+            edges = dict(self.inside.get(clusterOf(node), {}).get(node, {}))
+            for target, edge in self.crossing.get(node, {}).items():
+                if clusterOf(target) in active:
+                    edges[target] = edge
+            if node == start:
+                for target, edge in fromStart.items():
+                    if target not in edges or edge[0] < edges[target][0]:
+                        edges[target] = edge
+            if node in toGoal and (goal not in edges or toGoal[node][0] < edges[goal][0]):
+                edges[goal] = toGoal[node]
+            return edges
+
+        def successors(node, parent):
+            for neighbor, (cost, _) in edgesFrom(node).items():
+                yield neighbor, cost
+
+        parents, end, found, expansions = bestFirstSearch(start, goal, successors, **searchLimits(deadline))
+
+        path = []
+        nodes = [start] + reconstruct(parents, end)
+        for a, b in zip(nodes, nodes[1:]):
+            path.extend(edgesFrom(a)[b][1])
+        if not found:
+            # Entrances sit on cluster borders; finish inside the last cluster at the
+            # cell closest to the goal, as A* would.
+            closer = self._searchInside(end, clusterOf(end), (), deadline=deadline, towards=goal)
+            for cost, tail in (closer or {}).values():
+                path.extend(tail)
+        return toPlanResult(path, found, self.expansions + expansions)
+
+
+def hierarchicalSearch(start, goal, grid, step, deadline=None):
+    # WorldMap.planningWindow hands its long-lived graph over on the grid; other grids
+    # get one of their own.
+    graph = getattr(grid, "clusterGraph", None)
+    if graph is None or graph.step is not step:
+        graph = ClusterGraph(step)
+        grid.clusterGraph = graph
+    if not graph.update(grid, deadline):
+        print("Pathfinding budget exhausted.")
+        return PlanResult([], PlanQuality.FAILED, graph.expansions)
+    return graph.search(start, goal, deadline)
+
+
+def _shiftedSlices(n, d):
+    # Source and destination slices for moving by d along an axis of length n.
+    return slice(max(0, -d), n - max(0, d)), slice(max(0, d), n + min(0, d))
+
+
+class SurfaceMap:
+    # 2.5D view of a VoxelGrid: one floor height per (x, z) column. Columns with no
+    # standable cell are blocked and columns with several (caves, overhangs) are
+    # "layered" and left to the 3D planner. Allowed moves are precomputed per direction
+    # with the same step-height and headroom rules as Navigation.stepTo.
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.version = grid.version
+        sy, sz, sx = grid.shape
+        self.width = sx
+
+        standable = grid.standable
+        count = standable.sum(axis=0)
+        top = (sy - 1 - np.argmax(standable[::-1], axis=0)).astype(np.int16)
+        single = count == 1
+        heights = np.where(single, top, -1).astype(np.int16)
+        topIndex = top[None].astype(np.intp)
+        lowCeiling = np.take_along_axis(grid.lowCeiling, topIndex, axis=0)[0]
+        if grid.costs is None:
+            self._costs = None
+        else:
+            self._costs = np.take_along_axis(grid.costs, topIndex, axis=0)[0].reshape(-1).tolist()
+
+        self.heights = heights
+        self.layered = count > 1
+        self._heights = heights.reshape(-1).tolist()
+
+        # (flat offset, allowed bytes) per direction.
+        self.moves = []
+        for dx, dz in DIRECTIONS:
+            allowed = np.zeros((sz, sx), dtype=bool)
+            srcZ, dstZ = _shiftedSlices(sz, dz)
+            srcX, dstX = _shiftedSlices(sx, dx)
+            src, dst = (srcZ, srcX), (dstZ, dstX)
+            dh = heights[dst].astype(np.int32) - heights[src]
+            allowed[src] = single[src] & single[dst] & (np.abs(dh) <= 1) & ~((dh == 1) & lowCeiling[src])
+            self.moves.append((dz * sx + dx, allowed.reshape(-1).tobytes()))
+
+    def column(self, pos):
+        # Flat column index if pos is the single floor cell of its column, else -1.
+        ox, oy, oz = self.grid.origin
+        sy, sz, sx = self.grid.shape
+        ix, iz = pos[0] - ox, pos[2] - oz
+        if ix < 0 or iz < 0 or ix >= sx or iz >= sz:
+            return -1
+        idx = iz * sx + ix
+        return idx if self._heights[idx] == pos[1] - oy else -1
+
+    def cell(self, idx):
+        ox, oy, oz = self.grid.origin
+        return (ox + idx % self.width, oy + self._heights[idx], oz + idx // self.width)
+
+    def search(self, start, goal, deadline=None):
+        # A* over column indices. Returns None when start or goal is not a surface cell.
+        s = self.column(start)
+        t = self.column(goal)
+        if s < 0 or t < 0:
+            return None
+
+        width = self.width
+        heights = self._heights
+        moves = self.moves
+        costs = self._costs
+        gx, gz, gy = t % width, t // width, heights[t]
+
+        def h(i):
+            return max(abs(i % width - gx) + abs(i // width - gz), abs(heights[i] - gy))
+
+        heap = [(h(s), 0, s)]
+        parents = {}
+        gScore = {s: 0}
+        closed = set()
+        expansions = 0
+        best, bestKey = s, (h(s), 0)
+        maxExpansions = None if deadline is not None else MAX_EXPANSIONS
+        found = False
+
+        while heap:
+            _, g, node = heappop(heap)
+            if node in closed:
+                continue
+            if node == t:
+                found = True
+                break
+
+            key = (h(node), g)
+            if key < bestKey:
+                best, bestKey = node, key
+
+            expansions += 1
+            if maxExpansions is not None and expansions > maxExpansions:
+                print("Pathfinding timed out.")
+                break
+            if deadline is not None and expansions % DEADLINE_CHECK_INTERVAL == 0 and time.monotonic() > deadline:
+                print("Pathfinding budget exhausted.")
+                break
+            closed.add(node)
+
+            for offset, allowed in moves:
+                if not allowed[node]:
+                    continue
+                neighbor = node + offset
+                ng = g + 1 if costs is None else g + 1 + costs[neighbor]
+                if neighbor in closed or ng >= gScore.get(neighbor, ng + 1):
+                    continue
+                parents[neighbor] = node
+                gScore[neighbor] = ng
+                heappush(heap, (ng + h(neighbor), ng, neighbor))
+
+        node = t if found else best
+        path = []
+        while node in parents:
+            path.append(self.cell(node))
+            node = parents[node]
+        return toPlanResult(path[::-1], found, expansions)
+
+
+def surfaceSearch(start, goal, grid, step, deadline=None):
+    # Plans on the heightmap and falls back to the full 3D search when the start or
+    # goal sits in a layered column, or the surface alone does not connect them.
+    surface = getattr(grid, "surfaceMap", None)
+    if surface is None or surface.version != grid.version:
+        surface = SurfaceMap(grid)
+        grid.surfaceMap = surface
+
+    result = surface.search(start, goal, deadline)
+    if result is not None and result.quality == PlanQuality.COMPLETE:
+        return result
+    if result is not None and deadline is not None and time.monotonic() > deadline:
+        return result
+
+    fallback = aStarSearch(start, goal, grid, step, deadline)
+    if result is None:
+        return fallback
+    fallback.expansions += result.expansions
+    if fallback.quality == PlanQuality.FAILED and result.path:
+        result.expansions = fallback.expansions
+        return result
+    return fallback
+
+
+PLANNERS = {
+    "astar": aStarSearch,
+    "jps": jumpPointSearch,
+    "hpa": hierarchicalSearch,
+    "surface": surfaceSearch,
+}
@@ -0,0 +1,74 @@
+from collections import deque
+
+import numpy as np
+
+from capabilities.navigation import Navigation
+from capabilities.planners import DIRECTIONS
+from capabilities.world_map import floorCell
+
+
+class ReachabilityField:
+    # Breadth-first flood fill from the agent over the planning move model. Walking
+    # distances to every reachable cell are kept in an int32 array shaped like the grid
+    # (-1 = unreachable), so each lookup afterwards is a single index. Only observed
+    # ground counts: cells the grid merely assumes standable are not entered.
+
+    def __init__(self, grid, start, step=Navigation.stepTo):
+        self.grid = grid
+        self.start = start
+        self.dist = np.full(grid.shape, -1, dtype=np.int32)
+        flat = self.dist.reshape(-1)
+        if start not in grid:
+            return
+
+        flat[grid.index(start)] = 0
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            d = flat[grid.index(node)] + 1
+            for dx, dz in DIRECTIONS:
+                neighbor = step(node, dx, dz, grid)
+                if neighbor is None or grid.isAssumed(neighbor):
+                    continue
+                idx = grid.index(neighbor)
+                if flat[idx] < 0:
+                    flat[idx] = d
+                    queue.append(neighbor)
+
+    def distance(self, pos):
+        idx = self.grid.index(pos)
+        if idx < 0:
+            return None
+        d = int(self.dist.flat[idx])
+        return d if d >= 0 else None
+
+    def distanceToPoint(self, x, y, z):
+        # Entities stand on, or float slightly above or below, a standable cell.
+        cx, cy, cz = floorCell(x, y, z)
+        for dy in (0, -1, 1):
+            d = self.distance((cx, cy + dy, cz))
+            if d is not None:
+                return d
+        return None
+
+
+def fieldFor(env):
+    # Computed at most once per observation: the field is cached on the environment
+    # until the world map takes a new snapshot or the agent changes cell.
+    pos = env.observe().get("getAgentPos") if env.rob else None
+    if not pos:
+        return None
+    start = floorCell(pos[0], pos[1], pos[2])
+    key = (env.worldMap.version, start)
+    cached = getattr(env, "_reachability", None)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    bounds = env.grid_bounds
+    grid = env.worldMap.window(
+        tuple(start[i] + bounds[i][0] for i in range(3)),
+        tuple(start[i] + bounds[i][1] for i in range(3)),
+    )
+    field = ReachabilityField(grid, start)
+    env._reachability = (key, field)
+    return field
@@ -0,0 +1,139 @@
+import math
+import time
+from typing import Callable, Optional
+
+from capabilities.actions import pause, waitUntil
+from capabilities.navigation import Navigation
+from models.type import ObservationFrame
+
+# Air below which falling air makes the agent swim up; the scheduler already preempts
+# long actions at 200, so this is for when nothing has answered by then.
+SURFACE_AIR = 150.0
+SURFACE_SECONDS = 1.5
+BACK_OFF_SECONDS = 0.6
+CREEPER_RANGE = 3.0
+# A creeper is escaped once it is this far away; creepers explode at about 3 blocks.
+FLEE_DISTANCE = 6.0
+FLEE_SECONDS = 1.5
+STEER_INTERVAL = 0.05
+
+
+class Reflex:
+    # trigger(frame, previous) returns why the reflex should fire, or None; respond runs
+    # it with the control channels already taken over and returns a one-word outcome.
+
+    def __init__(self, name: str, trigger: Callable[[ObservationFrame, Optional[ObservationFrame]], Optional[str]],
+                 respond: Callable[[object, ObservationFrame], str], cooldown: float = 2.0):
+        self.name = name
+        self.trigger = trigger
+        self.respond = respond
+        self.cooldown = cooldown
+
+
+def gridBlock(frame: ObservationFrame, dx: int, dy: int, dz: int) -> Optional[str]:
+    # Block at an offset from the agent's feet cell, straight from the flat y/z/x grid.
+    grid = frame.get("getNearGrid")
+    bounds = frame.bounds
+    if not grid or not bounds:
+        return None
+    (x0, x1), (y0, y1), (z0, z1) = bounds
+    if not (x0 <= dx <= x1 and y0 <= dy <= y1 and z0 <= dz <= z1):
+        return None
+    dimX = x1 - x0 + 1
+    dimZ = z1 - z0 + 1
+    index = ((dy - y0) * dimZ + (dz - z0)) * dimX + (dx - x0)
+    return grid[index] if index < len(grid) else None
+
+
+def lavaAhead(frame: ObservationFrame, previous=None) -> Optional[str]:
+    pos = frame.get("getAgentPos")
+    if not pos or len(pos) < 5:
+        return None
+    yaw = math.radians(float(pos[4]))
+    # The cell one step ahead in Minecraft's frame (+z south, yaw 0 facing south).
+    dx = int(round(-math.sin(yaw)))
+    dz = int(round(math.cos(yaw)))
+    for dy in (0, -1):
+        name = Navigation.normalizeBlockName(gridBlock(frame, dx, dy, dz) or "")
+        if name.endswith("lava"):
+            return "lava ahead"
+    return None
+
+
+def _nearestCreeper(frame: ObservationFrame):
+    pos = frame.get("getAgentPos")
+    if not pos:
+        return None
+    best = None
+    for e in frame.get("getNearEntities", []):
+        if not isinstance(e, dict) or str(e.get("name", "")).lower() != "creeper":
+            continue
+        d = math.dist((e.get("x", 0), e.get("y", 0), e.get("z", 0)), pos[:3])
+        if best is None or d < best[0]:
+            best = (d, e)
+    return best
+
+
+def creeperClose(frame: ObservationFrame, previous=None) -> Optional[str]:
+    nearest = _nearestCreeper(frame)
+    if nearest is not None and nearest[0] <= CREEPER_RANGE:
+        return "creeper in range"
+    return None
+
+
+def airFalling(frame: ObservationFrame, previous: Optional[ObservationFrame] = None) -> Optional[str]:
+    air = frame.get("getAir")
+    before = previous.get("getAir") if previous is not None else None
+    if air is None or before is None:
+        return None
+    if float(air) < SURFACE_AIR and float(air) < float(before):
+        return "air falling"
+    return None
+
+
+def backOff(env, frame: ObservationFrame) -> str:
+    with env.commands.batch():
+        env.commands.set("jump", 0)
+        env.commands.set("move", -1)
+    if waitUntil(env, lambda f: lavaAhead(f) is None, BACK_OFF_SECONDS):
+        return "clear"
+    return "blocked"
+
+
+def faceAway(env, frame: ObservationFrame) -> str:
+    # Turns away from the creeper while already moving away from it: backwards while
+    # it is still in front, forwards once it is behind.
+    end = time.monotonic() + FLEE_SECONDS
+    while time.monotonic() < end:
+        pos = frame.get("getAgentPos")
+        nearest = _nearestCreeper(frame)
+        if not pos or nearest is None or nearest[0] > FLEE_DISTANCE:
+            return "escaped"
+        creeper = nearest[1]
+        awayX = float(pos[0]) - float(creeper.get("x", 0))
+        awayZ = float(pos[2]) - float(creeper.get("z", 0))
+        yawDiff = (math.degrees(math.atan2(-awayX, awayZ)) - float(pos[4]) + 180.0) % 360.0 - 180.0
+        with env.commands.batch():
+            env.commands.set("turn", max(-1.0, min(1.0, yawDiff / 40.0)))
+            env.commands.set("move", 1 if abs(yawDiff) < 90 else -1)
+        pause(STEER_INTERVAL)
+        frame = env.observe(newerThan=frame.seq)
+    return "cornered"
+
+
+def surface(env, frame: ObservationFrame) -> str:
+    air = float(frame.get("getAir", 0))
+    with env.commands.batch():
+        env.commands.set("move", 0)
+        env.commands.set("jump", 1)
+    if waitUntil(env, lambda f: float(f.get("getAir", 0)) > air, SURFACE_SECONDS):
+        return "surfaced"
+    return "submerged"
+
+
+# In priority order: when several fire on the same frame only the first runs.
+REFLEXES = (
+    Reflex("backOff", lavaAhead, backOff, cooldown=1.0),
+    Reflex("faceAway", creeperClose, faceAway),
+    Reflex("surface", airFalling, surface),
+)
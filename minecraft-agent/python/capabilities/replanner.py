@@ -0,0 +1,209 @@
+from heapq import heappop, heappush
+from itertools import count
+
+from capabilities.cost_field import buildCostField, hostilePositions
+from capabilities.entity_index import isDroppedItem
+from capabilities.navigation import Navigation
+from capabilities.planners import DIRECTIONS, MAX_EXPANSIONS, heuristic
+from capabilities.world_map import floorCell
+
+INF = float("inf")
+# Fresh grid snapshots are folded into the plan every this many follow ticks (50 ms each).
+REPAIR_INTERVAL_TICKS = 10
+
+
+class DStarLite:
+    # Incremental planner (Koenig & Likhachev). It searches backwards from the goal, so
+    # when cells change only the affected part of the cost-to-goal field is repaired and
+    # the agent can keep its start cell moving along the path.
+
+    def __init__(self, grid, start, goal, step, maxExpansions=4 * MAX_EXPANSIONS):
+        self.grid = grid
+        self.step = step
+        self.start = start
+        self.goal = goal
+        self.last = start
+        self.maxExpansions = maxExpansions
+        self.km = 0
+        self.g = {}
+        self.rhs = {goal: 0}
+        self.heap = []
+        self.open = {}
+        self.tie = count()
+        self._push(goal)
+        self.computeShortestPath()
+
+    def _key(self, s):
+        m = min(self.g.get(s, INF), self.rhs.get(s, INF))
+        return (m + heuristic(self.start, s) + self.km, m)
+
+    def _push(self, s):
+        key = self._key(s)
+        self.open[s] = key
+        heappush(self.heap, (key, next(self.tie), s))
+
+    def successors(self, s):
+        for dx, dz in DIRECTIONS:
+            target = self.step(s, dx, dz, self.grid)
+            if target is not None:
+                yield target
+
+    def predecessors(self, s):
+        x, y, z = s
+        for dx, dz in DIRECTIONS:
+            for dy in (0, 1, -1):
+                candidate = (x + dx, y + dy, z + dz)
+                if candidate != self.start and not self.grid.isStandable(candidate):
+                    continue
+                if self.step(candidate, -dx, -dz, self.grid) == s:
+                    yield candidate
+                    break
+
+    def _refresh(self, u):
+        self.open.pop(u, None)
+        if self.g.get(u, INF) != self.rhs.get(u, INF):
+            self._push(u)
+
+    def updateVertex(self, u):
+        if u != self.goal:
+            if u != self.start and not self.grid.isStandable(u):
+                self.rhs[u] = INF
+            else:
+                cost = self.grid.stepCost
+                self.rhs[u] = min((cost(s) + self.g.get(s, INF) for s in self.successors(u)), default=INF)
+        self._refresh(u)
+
+    def computeShortestPath(self):
+        expansions = 0
+        while self.heap:
+            kOld, _, u = self.heap[0]
+            if self.open.get(u) != kOld:
+                heappop(self.heap)
+                continue
+            startKey = self._key(self.start)
+            if kOld >= startKey and self.rhs.get(self.start, INF) == self.g.get(self.start, INF):
+                break
+
+            expansions += 1
+            if expansions > self.maxExpansions:
+                print("Replanning timed out.")
+                return False
+
+            heappop(self.heap)
+            kNew = self._key(u)
+            if kOld < kNew:
+                self._push(u)
+            elif self.g.get(u, INF) > self.rhs.get(u, INF):
+                gNew = self.rhs[u]
+                self.g[u] = gNew
+                del self.open[u]
+                # Every edge into u costs the same: the cost of entering u.
+                cost = self.grid.stepCost(u)
+                for p in self.predecessors(u):
+                    if p != self.goal and cost + gNew < self.rhs.get(p, INF):
+                        self.rhs[p] = cost + gNew
+                    self._refresh(p)
+            else:
+                gOld = self.g.get(u, INF)
+                self.g[u] = INF
+                del self.open[u]
+                self.updateVertex(u)
+                cost = self.grid.stepCost(u)
+                for p in self.predecessors(u):
+                    if p != self.goal and self.rhs.get(p, INF) == cost + gOld:
+                        self.updateVertex(p)
+                    else:
+                        self._refresh(p)
+        return True
+
+    def updateStart(self, start):
+        if start == self.start:
+            return
+        self.km += heuristic(self.last, start)
+        self.last = start
+        self.start = start
+        self.updateVertex(start)
+
+    def notifyChanged(self, cells, costChanged=()):
+        # A cell affects standability of the three cells it can be feet, head or floor
+        # of, and the ceiling check of the cell two below; moves into or out of those
+        # columns come from their horizontal neighbours.
+        affected = set()
+        for x, y, z in cells:
+            for dy in (-2, -1, 0, 1):
+                affected.add((x, y + dy, z))
+                for dx, dz in DIRECTIONS:
+                    for ddy in (-1, 0, 1):
+                        affected.add((x + dx, y + dy + ddy, z + dz))
+        # A cost change only alters the edges into that cell, i.e. the rhs of its
+        # predecessors; cells the search never reached are left alone.
+        for cell in costChanged:
+            if cell in self.g:
+                for p in self.predecessors(cell):
+                    affected.add(p)
+        for u in affected:
+            if u in self.rhs or u in self.g or self.grid.isStandable(u):
+                self.updateVertex(u)
+        return self.computeShortestPath()
+
+    def path(self):
+        if min(self.g.get(self.start, INF), self.rhs.get(self.start, INF)) == INF:
+            return None
+        path = []
+        seen = {self.start}
+        node = self.start
+        while node != self.goal:
+            best = min(self.successors(node), key=lambda s: self.grid.stepCost(s) + self.g.get(s, INF), default=None)
+            if best is None or self.g.get(best, INF) == INF or best in seen:
+                return None
+            path.append(best)
+            seen.add(best)
+            node = best
+        return path
+
+
+class PathRepairer:
+    # Folds fresh observations into the planning grid while a path is being followed
+    # and repairs the remaining path with D* Lite when blocks or mobs moved.
+
+    def __init__(self, env, grid, goal):
+        self.env = env
+        self.grid = grid
+        self.goal = goal
+        self.replanner = None
+
+    def occupiedCells(self, cell, ents):
+        occupied = set()
+        for e in ents:
+            if isDroppedItem(e) or str(e.get("name", "")).lower() in Navigation.nonBlockingEntities:
+                continue
+            occupied.add(floorCell(e.get("x", 0), e.get("y", 0), e.get("z", 0)))
+        occupied.discard(cell)
+        occupied.discard(self.goal)
+        return occupied
+
+    def repair(self, frame):
+        pos = frame.get("getAgentPos")
+        rawGrid = frame.get("getNearGrid")
+        if not rawGrid or not pos:
+            return None
+
+        cell = floorCell(pos[0], pos[1], pos[2])
+        self.env.worldMap.recordSnapshot(rawGrid, frame.bounds, cell)
+        bounds = self.grid.bounds
+        latest = self.env.worldMap.window(
+            (bounds[0][0], bounds[1][0], bounds[2][0]),
+            (bounds[0][1], bounds[1][1], bounds[2][1]),
+        )
+        ents = frame.get("getNearEntities", [])
+        changed = self.grid.assign(latest, self.occupiedCells(cell, ents))
+        costChanged = self.grid.setCosts(buildCostField(self.grid, hostilePositions(ents)))
+        if not changed and not costChanged:
+            return None
+
+        if self.replanner is None:
+            self.replanner = DStarLite(self.grid, cell, self.goal, Navigation.stepTo)
+        else:
+            self.replanner.updateStart(cell)
+            self.replanner.notifyChanged(changed, costChanged)
+        return self.replanner.path()
@@ -1,10 +1,12 @@
 import math
-import time
+
+from capabilities.actions import pause, waitUntil
+from capabilities.observation import dayTime, isNightTime
+from models.constants import HOSTILE_ENTITIES
 
 SHELTER_RADIUS = 4
 SHELTER_HEIGHT = 3
 SHELTER_MATERIAL = "oak_planks"
-HOSTILE_TYPES = {"zombie", "skeleton"}
 SLEEP_INTERACT_RANGE = 4.5
 
 
@@ -61,7 +63,7 @@ def placeBlock(mc, x: int, y: int, z: int, block_type: str) -> bool:
     except AssertionError:
         print("  !! placement rejected (mission not running)")
         return False
-    time.sleep(0.05)
+    pause(0.05)
     return True
 
 
@@ -123,7 +125,7 @@ def _hasNearbyHostileObservation(obs, max_distance: float = 10.0) -> bool:
         if not isinstance(entity, dict):
             continue
         entity_name = entity.get("type", entity.get("name", ""))
-        if normalizeBlockName(entity_name) not in HOSTILE_TYPES:
+        if normalizeBlockName(entity_name) not in HOSTILE_ENTITIES:
             continue
         try:
             dist = float(entity.get("distance", 9999.0))
@@ -189,9 +191,10 @@ def aimAtPoint(env, target_x: float, target_y: float, target_z: float, max_steps
     if not env.rob:
         return
 
+    frame = None
     for _ in range(max_steps):
-        env.rob.observeProcCached()
-        pos = env.rob.getCachedObserve("getAgentPos")
+        frame = env.observe(newerThan=frame.seq if frame else None)
+        pos = frame.get("getAgentPos")
         if not pos:
             break
 
@@ -218,18 +221,20 @@ def aimAtPoint(env, target_x: float, target_y: float, target_z: float, max_steps
 
         turn_speed = max(-1.0, min(1.0, yaw_diff / 40.0))
         pitch_speed = max(-1.0, min(1.0, pitch_diff / 35.0))
-        env.rob.sendCommand(f"turn {turn_speed}")
-        env.rob.sendCommand(f"pitch {pitch_speed}")
-        time.sleep(0.08)
+        with env.commands.batch():
+            env.commands.set("turn", turn_speed)
+            env.commands.set("pitch", pitch_speed)
+        pause(0.08)
 
-    env.rob.sendCommand("turn 0")
-    env.rob.sendCommand("pitch 0")
+    env.commands.stop(("turn", "pitch"))
+    if hasattr(env, "invalidateObservation"):
+        env.invalidateObservation()
 
 
 def aimAtTarget(env, target_x: float, target_z: float):
     if not env.rob:
         return
-    pos = env.rob.getCachedObserve("getAgentPos")
+    pos = env.observe().get("getAgentPos")
     if not pos:
         return
     dx = target_x - float(pos[0])
@@ -238,9 +243,9 @@ def aimAtTarget(env, target_x: float, target_z: float):
     curr_yaw = float(pos[4])
     yaw_diff = (target_yaw - curr_yaw + 180.0) % 360.0 - 180.0
     turn_speed = max(-1.0, min(1.0, yaw_diff / 45.0))
-    env.rob.sendCommand(f"turn {turn_speed}")
-    time.sleep(0.2)
-    env.rob.sendCommand("turn 0")
+    env.commands.send(f"turn {turn_speed}")
+    pause(0.2)
+    env.commands.send("turn 0")
 
 
 def hasShelter(env) -> bool:
@@ -272,7 +277,7 @@ def enterShelter(env):
     if hasattr(env, "moveTo"):
         move_result = env.moveTo(float(target[0]), float(target[1]), float(target[2]) + 2)
 
-    time.sleep(0.2)
+    pause(0.2)
 
     entered = move_result == "Reached Destination"
     if entered:
@@ -292,8 +297,7 @@ def buildShelter(env):
     if not env.connected or not env.rob or not env.mc:
         return
 
-    env.rob.observeProcCached()
-    pos = env.rob.getCachedObserve("getAgentPos")
+    pos = env.observe().get("getAgentPos")
     if not pos:
         print("Cannot read agent position.")
         return
@@ -365,11 +369,8 @@ def sleepAtNight(env):
     if move_result != "Reached Destination":
         return None
 
-    env.rob.sendCommand("move 0")
-    env.rob.sendCommand("jump 0")
-    env.rob.sendCommand("turn 0")
-    env.rob.sendCommand("pitch 0")
-    time.sleep(0.1)
+    env.commands.stop()
+    pause(0.1)
 
     bed_target = (
         float(bed_foot[0]) + 0.5,
@@ -380,15 +381,16 @@ def sleepAtNight(env):
     if not isLookingAtBed(env):
         return None
 
-    env.rob.sendCommand("use 1")
-    time.sleep(0.45)
-    env.rob.sendCommand("use 0")
+    env.commands.send("use 1")
+    pause(0.45)
+    env.commands.send("use 0")
 
-    time.sleep(5)
+    # The night is skipped a few seconds after lying down.
+    waitUntil(env, lambda frame: frame.worldTime is not None and not isNightTime(dayTime(env, frame.worldTime)), 5)
 
     if isLookingAtBed(env):
-        env.rob.sendCommand("turn 0")
-        env.rob.sendCommand("pitch 0")
-        time.sleep(0.25)
+        env.commands.send("turn 0")
+        env.commands.send("pitch 0")
+        pause(0.25)
 
     return "Slept in Shelter"
@@ -0,0 +1,162 @@
+import numpy as np
+
+
+UNKNOWN_BLOCK = "unknown"
+
+
+class VoxelGrid:
+    # Dense block grid: uint16 ids indexed [y, z, x] plus a palette of block names.
+    # Per-cell navigation masks are derived once from per-palette lookup tables.
+    # Cells never observed (UNKNOWN_BLOCK) are optimistically taken as open for the feet
+    # and head and as solid for the floor, next to what was seen. Cells standable only
+    # under that assumption are flagged in `assumed`, so costs and queries can tell
+    # them from seen ground.
+
+    def __init__(self, ids, palette, origin, passableLut, safeLut):
+        self.ids = ids
+        self.palette = palette
+        self.origin = (int(origin[0]), int(origin[1]), int(origin[2]))
+        self.passableLut = passableLut
+        self.safeLut = safeLut
+        self.occupied = set()
+        self.costs = None
+        self._costsFlat = None
+        self.version = 0
+        self.refreshMasks()
+
+    @property
+    def shape(self):
+        return self.ids.shape
+
+    @property
+    def bounds(self):
+        sy, sz, sx = self.ids.shape
+        ox, oy, oz = self.origin
+        return [[ox, ox + sx - 1], [oy, oy + sy - 1], [oz, oz + sz - 1]]
+
+    def refreshMasks(self):
+        passable = self.passableLut[self.ids]
+        safe = self.safeLut[self.ids]
+        unknownLut = np.array([name == UNKNOWN_BLOCK for name in self.palette], dtype=bool)
+        unknown = unknownLut[self.ids]
+        free = passable | unknown
+
+        standable = np.zeros_like(passable)
+        # At least one of the feet and the floor must have been seen, so the assumption
+        # only extends the observed terrain instead of filling unseen space with ground.
+        standable[1:-1] = free[1:-1] & free[2:] & ~passable[:-2] & safe[1:-1] & ~(unknown[1:-1] & unknown[:-2])
+        for cell in self.occupied:
+            ix, iy, iz = (cell[i] - self.origin[i] for i in range(3))
+            standable[iy, iz, ix] = False
+        assumed = np.zeros_like(passable)
+        assumed[1:-1] = standable[1:-1] & (unknown[1:-1] | unknown[2:] | unknown[:-2])
+
+        # A step up from (x, y, z) needs the cell above the agent's head to be free.
+        lowCeiling = np.zeros_like(passable)
+        lowCeiling[:-2] = ~free[2:]
+
+        self.passable = passable
+        self.safe = safe
+        self.unknown = unknown
+        self.standable = standable
+        self.assumed = assumed
+        self.lowCeiling = lowCeiling
+        self._standableFlat = standable.tobytes()
+        self._assumedFlat = assumed.tobytes()
+        self._lowCeilingFlat = lowCeiling.tobytes()
+        self.version += 1
+
+    def assign(self, other, occupied=()):
+        # Takes over the blocks of a same-sized grid over a compatible palette and
+        # returns the cells whose block or occupancy changed.
+        changed = self._cellsWhere(self.ids != other.ids)
+        occupied = {cell for cell in occupied if cell in self}
+        changed.extend(self.occupied ^ occupied)
+
+        self.ids = other.ids
+        self.palette = other.palette
+        self.passableLut = other.passableLut
+        self.safeLut = other.safeLut
+        self.occupied = occupied
+        if changed:
+            self.refreshMasks()
+        return changed
+
+    def setCosts(self, costs):
+        # Extra per-cell cost of entering a cell (float array shaped like ids, or None
+        # for uniform costs). Returns the cells whose cost changed.
+        if costs is None:
+            changed = [] if self.costs is None else self._cellsWhere(self.costs != 0)
+        elif self.costs is None:
+            changed = self._cellsWhere(costs != 0)
+        else:
+            changed = self._cellsWhere(self.costs != costs)
+        self.costs = costs
+        self._costsFlat = None if costs is None else costs.reshape(-1).tolist()
+        self.version += 1
+        return changed
+
+    def _cellsWhere(self, mask):
+        ox, oy, oz = self.origin
+        iy, iz, ix = np.nonzero(mask)
+        return list(zip((ix + ox).tolist(), (iy + oy).tolist(), (iz + oz).tolist()))
+
+    def stepCost(self, pos):
+        if self._costsFlat is None:
+            return 1
+        idx = self.index(pos)
+        return 1 if idx < 0 else 1 + self._costsFlat[idx]
+
+    def index(self, pos):
+        sy, sz, sx = self.ids.shape
+        ix = pos[0] - self.origin[0]
+        iy = pos[1] - self.origin[1]
+        iz = pos[2] - self.origin[2]
+        if ix < 0 or iy < 0 or iz < 0 or ix >= sx or iy >= sy or iz >= sz:
+            return -1
+        return (iy * sz + iz) * sx + ix
+
+    def isStandable(self, pos):
+        idx = self.index(pos)
+        return idx >= 0 and self._standableFlat[idx] == 1
+
+    def isAssumed(self, pos):
+        idx = self.index(pos)
+        return idx >= 0 and self._assumedFlat[idx] == 1
+
+    def hasLowCeiling(self, pos):
+        idx = self.index(pos)
+        return idx >= 0 and self._lowCeilingFlat[idx] == 1
+
+    def blockId(self, pos):
+        idx = self.index(pos)
+        if idx < 0:
+            return None
+        return int(self.ids.flat[idx])
+
+    def __contains__(self, pos):
+        return self.index(pos) >= 0
+
+    def __getitem__(self, pos):
+        blockId = self.blockId(pos)
+        if blockId is None:
+            raise KeyError(pos)
+        return self.palette[blockId]
+
+    def get(self, pos, default=None):
+        blockId = self.blockId(pos)
+        return default if blockId is None else self.palette[blockId]
+
+    @staticmethod
+    def encodeBlocks(gridList, size):
+        paletteIndex = {}
+        assign = paletteIndex.setdefault
+        ids = np.fromiter(
+            (assign(name, len(paletteIndex)) for name in gridList[:size]),
+            dtype=np.uint16,
+        )
+        if len(ids) < size:
+            padding = assign(UNKNOWN_BLOCK, len(paletteIndex))
+            ids = np.concatenate([ids, np.full(size - len(ids), padding, dtype=np.uint16)])
+        palette = [str(name).replace("minecraft:", "") for name in paletteIndex]
+        return ids, palette
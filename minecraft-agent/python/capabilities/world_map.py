@@ -0,0 +1,149 @@
+import math
+import threading
+
+import numpy as np
+
+from capabilities.navigation import Navigation
+from capabilities.planners import ClusterGraph
+from capabilities.voxel_grid import VoxelGrid, UNKNOWN_BLOCK
+
+CHUNK_SIZE = 16
+# Chunks farther than this (in chunks, horizontally) from the latest snapshot are dropped.
+KEEP_RADIUS_CHUNKS = 16
+PLAN_MARGIN = (12, 6, 12)
+
+
+class WorldMap:
+    # Persistent block store in absolute coordinates, built from successive near-grid
+    # snapshots. Chunks are uint16 arrays [y, z, x] over a palette shared by the whole map;
+    # id 0 is reserved for cells that were never observed. Perception and the running
+    # action both record snapshots and cut windows, so those hold the map's lock.
+
+    def __init__(self, chunkSize: int = CHUNK_SIZE, keepRadius: int = KEEP_RADIUS_CHUNKS):
+        self.chunkSize = chunkSize
+        self.keepRadius = keepRadius
+        self.palette = [UNKNOWN_BLOCK]
+        self.paletteIndex = {UNKNOWN_BLOCK: 0}
+        self.chunks = {}
+        self.version = 0
+        self.lock = threading.RLock()
+        # Abstract graph for hierarchical planning, kept across planning windows; it
+        # rebuilds only the clusters whose cells changed.
+        self.clusterGraph = ClusterGraph(Navigation.stepTo)
+        self._lastRaw = None
+        self._lastSnapshot = None
+
+    def clear(self):
+        with self.lock:
+            self.chunks.clear()
+            self.clusterGraph = ClusterGraph(Navigation.stepTo)
+            self.version += 1
+
+    def paletteId(self, name):
+        # Called with the lock held.
+        blockId = self.paletteIndex.get(name)
+        if blockId is None:
+            blockId = len(self.palette)
+            self.palette.append(name)
+            self.paletteIndex[name] = blockId
+        return blockId
+
+    def chunkKey(self, x, y, z):
+        cs = self.chunkSize
+        return (x // cs, y // cs, z // cs)
+
+    def merge(self, grid: VoxelGrid, offset=(0, 0, 0)):
+        with self.lock:
+            remap = np.fromiter((self.paletteId(name) for name in grid.palette), dtype=np.uint16, count=len(grid.palette))
+            ids = remap[grid.ids]
+            lo = (grid.origin[0] + offset[0], grid.origin[1] + offset[1], grid.origin[2] + offset[2])
+            self._write(ids, lo)
+            centre = (lo[0] + ids.shape[2] // 2, lo[2] + ids.shape[1] // 2)
+            self._evictFar(centre)
+            self.version += 1
+
+    def recordSnapshot(self, rawGrid, bounds, origin) -> VoxelGrid:
+        # Observations hand back the same list object until the next observe, so a
+        # snapshot that was already merged is not parsed again.
+        with self.lock:
+            if rawGrid is self._lastRaw and self._lastSnapshot is not None:
+                return self._lastSnapshot
+            snapshot = Navigation.parseGrid(rawGrid, bounds)
+            self.merge(snapshot, origin)
+            self._lastRaw = rawGrid
+            self._lastSnapshot = snapshot
+            return snapshot
+
+    def _chunkRanges(self, lo, size):
+        cs = self.chunkSize
+        first = lo // cs
+        last = (lo + size - 1) // cs
+        for c in range(first, last + 1):
+            start = max(lo, c * cs)
+            stop = min(lo + size, (c + 1) * cs)
+            yield c, start, stop
+
+    def _write(self, ids, lo):
+        cs = self.chunkSize
+        sy, sz, sx = ids.shape
+        for cy, y0, y1 in self._chunkRanges(lo[1], sy):
+            for cz, z0, z1 in self._chunkRanges(lo[2], sz):
+                for cx, x0, x1 in self._chunkRanges(lo[0], sx):
+                    chunk = self.chunks.get((cx, cy, cz))
+                    if chunk is None:
+                        chunk = np.zeros((cs, cs, cs), dtype=np.uint16)
+                        self.chunks[(cx, cy, cz)] = chunk
+                    chunk[y0 - cy * cs:y1 - cy * cs, z0 - cz * cs:z1 - cz * cs, x0 - cx * cs:x1 - cx * cs] = \
+                        ids[y0 - lo[1]:y1 - lo[1], z0 - lo[2]:z1 - lo[2], x0 - lo[0]:x1 - lo[0]]
+
+    def _evictFar(self, centre):
+        cs = self.chunkSize
+        ccx, ccz = centre[0] // cs, centre[1] // cs
+        far = [key for key in self.chunks if max(abs(key[0] - ccx), abs(key[2] - ccz)) > self.keepRadius]
+        for key in far:
+            del self.chunks[key]
+
+    def blockId(self, pos):
+        cs = self.chunkSize
+        chunk = self.chunks.get(self.chunkKey(*pos))
+        if chunk is None:
+            return 0
+        return int(chunk[pos[1] % cs, pos[2] % cs, pos[0] % cs])
+
+    def isKnown(self, pos):
+        return self.blockId(pos) != 0
+
+    def get(self, pos, default=None):
+        blockId = self.blockId(pos)
+        return default if blockId == 0 else self.palette[blockId]
+
+    def window(self, lo, hi) -> VoxelGrid:
+        cs = self.chunkSize
+        size = (hi[0] - lo[0] + 1, hi[1] - lo[1] + 1, hi[2] - lo[2] + 1)
+        ids = np.zeros((size[1], size[2], size[0]), dtype=np.uint16)
+        with self.lock:
+            for cy, y0, y1 in self._chunkRanges(lo[1], size[1]):
+                for cz, z0, z1 in self._chunkRanges(lo[2], size[2]):
+                    for cx, x0, x1 in self._chunkRanges(lo[0], size[0]):
+                        chunk = self.chunks.get((cx, cy, cz))
+                        if chunk is None:
+                            continue
+                        ids[y0 - lo[1]:y1 - lo[1], z0 - lo[2]:z1 - lo[2], x0 - lo[0]:x1 - lo[0]] = \
+                            chunk[y0 - cy * cs:y1 - cy * cs, z0 - cz * cs:z1 - cz * cs, x0 - cx * cs:x1 - cx * cs]
+            palette = list(self.palette)
+        passable, safe = Navigation.blockTables(palette)
+        return VoxelGrid(ids, palette, lo, passable, safe)
+
+    def planningWindow(self, start, goal, margin=PLAN_MARGIN) -> VoxelGrid:
+        # Aligned to whole clusters across and whole chunks vertically, so windows over
+        # the same area cut the same slabs and the cluster graph can reuse its clusters.
+        align = (self.clusterGraph.clusterSize, self.chunkSize, self.clusterGraph.clusterSize)
+        lo = tuple((min(start[i], goal[i]) - margin[i]) // align[i] * align[i] for i in range(3))
+        hi = tuple(-(-(max(start[i], goal[i]) + margin[i] + 1) // align[i]) * align[i] - 1 for i in range(3))
+        grid = self.window(lo, hi)
+        grid.clusterGraph = self.clusterGraph
+        return grid
+
+
+def floorCell(x, y, z):
+    return (int(math.floor(x)), int(math.floor(y)), int(math.floor(z)))
@@ -1,7 +1,15 @@
+# Everything the agent will eat; kept in step with isEdible in metta/perception.metta.
 EDIBLE_ITEMS = {
     "apple",
     "bread",
     "glow_berries",
+    "sweet_berries",
+    "melon_slice",
+    "porkchop",
+    "beef",
+    "chicken",
+    "mutton",
+    "rabbit",
     "cooked_beef",
     "cooked_chicken",
     "cooked_mutton",
@@ -15,3 +23,15 @@ EDIBLE_ITEMS = {
     "golden_apple",
 }
 
+
+# Mobs the agent treats as hostile: path costs, shelter checks, emergencies and
+# hostileNearBy in metta/perception.metta (through utils.countHostiles) all use this set.
+HOSTILE_ENTITIES = {"zombie", "skeleton", "spider", "creeper"}
+
+
+# Vereya, like Malmo's ObservationFromNearbyEntities, reports a dropped item stack under
+# the item's own name (porkchop, oak_log) and adds its stack size as "quantity"; the
+# vanilla entity id "item" is only a fallback. Drops are recognised by that field and
+# can be queried together under DROPPED_ITEM.
+DROPPED_ITEM = "item"
+DROPPED_ITEM_FIELD = "quantity"
@@ -44,3 +44,63 @@ class Observation:
     lineOfSightType: Optional[str] = None
     lineOfSightDistance: Optional[float] = None
     lineOfSightHitType: Optional[str] = None
+    entityIndex: Optional[Any] = None
+
+
+class ActionState(Enum):
+    PENDING = auto()
+    RUNNING = auto()
+    DONE = auto()
+    FAILED = auto()
+    CANCELLED = auto()
+
+
+class PlanQuality(Enum):
+    COMPLETE = auto()
+    PARTIAL = auto()
+    FAILED = auto()
+
+
+@dataclass
+class PlanResult:
+    path: List[Tuple[int, int, int]]
+    quality: PlanQuality
+    expansions: int = 0
+
+    @property
+    def end(self) -> Optional[Tuple[int, int, int]]:
+        return self.path[-1] if self.path else None
+
+
+@dataclass
+class ObservationFrame:
+    seq: int
+    timestamp: float
+    values: Dict[str, Any]
+    food: Optional[float] = None
+    worldTime: Optional[int] = None
+    actionStatus: Any = None
+    bounds: Optional[List[List[int]]] = None
+    profile: str = ""
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.values.get(key)
+        return default if value is None else value
+
+
+@dataclass
+class ReflexEvent:
+    name: str
+    reason: str
+    outcome: str
+    timestamp: float
+    latency: float
+    interrupted: Optional[str] = None
+
+
+@dataclass
+class ObservationProfile:
+    name: str
+    keys: Tuple[str, ...]
+    bounds: Optional[List[List[int]]] = None
+    fullStats: bool = True
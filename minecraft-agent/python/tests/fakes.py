@@ -0,0 +1,137 @@
+import math
+import random
+import threading
+import types
+
+import bridge.vereya_env as vereya
+from capabilities.navigation import Navigation
+from capabilities.observation import missionGridBounds
+from capabilities.world_map import WorldMap
+
+GRID_BOUNDS = missionGridBounds()
+
+
+def flatWorld(bounds=GRID_BOUNDS, floorY=-1):
+    (x0, x1), (y0, y1), (z0, z1) = bounds
+    flat = ["stone" if y <= floorY else "air"
+            for y in range(y0, y1 + 1) for z in range(z0, z1 + 1) for x in range(x0, x1 + 1)]
+    return Navigation.parseGrid(flat, bounds)
+
+
+def layoutWorld(rows):
+    # A floor at y = -1 seen from above: each row is one z, each character one x, and
+    # "#" is a wall two blocks high.
+    bounds = [[0, len(rows[0]) - 1], [-1, 2], [0, len(rows) - 1]]
+    flat = ["stone" if y == -1 or y < 2 and row[x] == "#" else "air"
+            for y in range(-1, 3) for row in rows for x in range(len(row))]
+    return Navigation.parseGrid(flat, bounds)
+
+
+def randomWorld(seed, size=40, walls=0.2):
+    # Rolling terrain: plateaus up to two blocks high, scattered with walls two blocks
+    # tall, over a stone floor at y = -1.
+    rng = random.Random(seed)
+    heights = [[0] * size for _ in range(size)]
+    for _ in range(size // 4):
+        cx, cz, r = rng.randrange(size), rng.randrange(size), rng.randint(2, size // 5)
+        for z in range(max(0, cz - r), min(size, cz + r + 1)):
+            for x in range(max(0, cx - r), min(size, cx + r + 1)):
+                heights[z][x] = min(2, heights[z][x] + 1)
+    wall = [[rng.random() < walls for _ in range(size)] for _ in range(size)]
+    bounds = [[0, size - 1], [-1, 5], [0, size - 1]]
+    flat = ["stone" if y < heights[z][x] or wall[z][x] and y < heights[z][x] + 2 else "air"
+            for y in range(-1, 6) for z in range(size) for x in range(size)]
+    return Navigation.parseGrid(flat, bounds)
+
+
+def standableCells(grid):
+    ox, oy, oz = grid.origin
+    return [(ox + int(x), oy + int(y), oz + int(z)) for y, z, x in zip(*grid.standable.nonzero())]
+
+
+class FakeRob:
+    # Stands in for RobustObserver: a point agent walking on the standable cells of a
+    # VoxelGrid, driven by the continuous move/turn/jump commands it was sent.
+
+    def __init__(self, world, bounds=GRID_BOUNDS, pos=(0.5, 0, 0.5, 0, 0)):
+        self.world = world
+        self.bounds = bounds
+        self.pos = list(pos)
+        self.controls = {"move": 0.0, "turn": 0.0, "jump": 0.0, "pitch": 0.0}
+        self.commands = []
+        self.values = {"getLife": 20.0, "getAir": 300.0, "getOnGround": True, "getInventory": []}
+        self.entities = []
+        self.ticks = 0
+        self._grid = None
+        self.lock = threading.Lock()
+
+    def observeProcCached(self):
+        self.ticks += 1
+        self.pos[4] += self.controls["turn"] * 20
+        yaw = math.radians(self.pos[4])
+        speed = self.controls["move"] * 0.2
+        nx = self.pos[0] - math.sin(yaw) * speed
+        nz = self.pos[2] + math.cos(yaw) * speed
+        for dy in (0, 1, -1, -2):
+            cell = (math.floor(nx), math.floor(self.pos[1]) + dy, math.floor(nz))
+            if self.world.isStandable(cell):
+                self.pos[0], self.pos[1], self.pos[2] = nx, cell[1], nz
+                break
+
+    def getCachedObserve(self, key):
+        if key == "getAgentPos":
+            return list(self.pos)
+        if key == "getNearGrid":
+            cell = tuple(math.floor(v) for v in self.pos[:3])
+            if self._grid is None or self._grid[0] != cell:
+                fx, fy, fz = cell
+                (x0, x1), (y0, y1), (z0, z1) = self.bounds
+                self._grid = (cell, [self.world.get((fx + x, fy + y, fz + z), "air")
+                                     for y in range(y0, y1 + 1) for z in range(z0, z1 + 1) for x in range(x0, x1 + 1)])
+            return self._grid[1]
+        if key == "getNearEntities":
+            return list(self.entities)
+        return self.values.get(key)
+
+    def sendCommand(self, command):
+        with self.lock:
+            self.commands.append(command)
+        parts = command.split()
+        if len(parts) == 2 and parts[0] in self.controls:
+            self.controls[parts[0]] = float(parts[1])
+
+
+class FakeMC:
+    def __init__(self):
+        self.stats = {"Food": 20, "WorldTime": 1000}
+
+    def getFullStat(self, key):
+        return self.stats.get(key)
+
+    def getActionStatus(self):
+        return {}
+
+    def sendCommand(self, command):
+        pass
+
+
+def makeEnv(world=None, pos=(0.5, 0, 0.5, 0, 0)):
+    # A VereyaEnvironment wired to FakeRob/FakeMC without the tagilmo mission setup.
+    world = world if world is not None else flatWorld()
+    env = object.__new__(vereya.VereyaEnvironment)
+    env.connected = True
+    env.grid_bounds = GRID_BOUNDS
+    env.rob = FakeRob(world, GRID_BOUNDS, pos)
+    env.mc = FakeMC()
+    env.mission = types.SimpleNamespace(
+        serverSection=types.SimpleNamespace(initial_conditions=types.SimpleNamespace(time_start=None)))
+    env.worldMap = WorldMap()
+    env.observationCache = vereya.observationOps.ObservationCache()
+    env.blockSummarizer = vereya.BlockSummarizer()
+    env.poller = vereya.ObservationPoller(env)
+    env._profileLeases = []
+    env.scheduler = vereya.ActionScheduler(env)
+    env.commands = vereya.CommandChannels(env)
+    env.reflexes = vereya.ReflexLayer(env)
+    env.actionHandlers = {}
+    return env
@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+
+from capabilities.actions import pause
+from fakes import makeEnv
+from models.type import ActionState
+
+
+def test_actions_run_one_at_a_time_in_order():
+    env = makeEnv()
+    log = []
+    active = []
+
+    def action(i):
+        def run():
+            active.append(i)
+            assert len(active) == 1
+            time.sleep(0.01)
+            log.append(i)
+            active.pop()
+            return i
+        return run
+
+    started = time.monotonic()
+    handles = [env.submit(f"a{i}", action(i)) for i in range(5)]
+    assert time.monotonic() - started < 0.01
+    assert [h.result(2) for h in handles] == list(range(5))
+    assert log == list(range(5))
+    assert all(h.state == ActionState.DONE for h in handles)
+
+
+def test_cancel_interrupts_a_paused_action_and_releases_the_controls():
+    env = makeEnv()
+    env.commands.set("move", 1)
+    handle = env.submit("walk", lambda: pause(5) or "walked")
+    time.sleep(0.05)
+    assert handle.cancel("stop")
+    assert handle.wait(1)
+    assert handle.state == ActionState.CANCELLED and handle.reason == "stop"
+    assert env.rob.commands[0] == "move 1" and "move 0" in env.rob.commands[1:]
+    assert not handle.cancel()
+
+
+def test_timeout_cancels_the_action():
+    env = makeEnv()
+    handle = env.submit("wait", lambda: pause(5), timeout=0.1)
+    assert handle.wait(1)
+    assert handle.state == ActionState.CANCELLED and handle.reason == "timed out"
+
+
+def test_failures_are_raised_from_result():
+    env = makeEnv()
+
+    def broken():
+        raise RuntimeError("no path")
+
+    handle = env.submit("broken", broken)
+    with pytest.raises(RuntimeError, match="no path"):
+        handle.result(1)
+    assert handle.state == ActionState.FAILED and not handle.succeeded()
+
+
+def test_preempt_cancels_the_running_and_queued_actions():
+    env = makeEnv()
+    first = env.submit("first", lambda: pause(5))
+    queued = env.submit("queued", lambda: "never")
+    time.sleep(0.05)
+    urgent = env.submit("urgent", lambda: "done", preempt=True)
+    assert urgent.result(1) == "done"
+    assert first.state == ActionState.CANCELLED and first.reason == "preempted by urgent"
+    assert queued.state == ActionState.CANCELLED
+
+
+def test_after_runs_only_when_the_previous_action_succeeded():
+    env = makeEnv()
+    ok = env.submit("ok", lambda: "yes")
+    next1 = env.submit("next1", lambda: "ran", after=ok)
+    failed = env.submit("failed", lambda: [])
+    next2 = env.submit("next2", lambda: "ran", after=failed)
+    assert next1.result(1) == "ran"
+    assert next2.wait(1)
+    assert next2.state == ActionState.CANCELLED and next2.reason == "failed did not succeed"
+
+
+def test_new_emergencies_preempt_only_preemptible_actions():
+    env = makeEnv()
+    env.poller.poll()
+    gate = threading.Event()
+
+    def waitForAir():
+        gate.wait(1)
+        pause(0.2)
+        return "finished"
+
+    preemptible = env.submit("explore", waitForAir)
+    time.sleep(0.05)
+    env.rob.values["getAir"] = 100.0
+    env.poller.poll()
+    gate.set()
+    assert preemptible.wait(1)
+    assert preemptible.state == ActionState.CANCELLED and preemptible.reason == "low air"
+
+    # Already drowning when it starts, and not preemptible either way.
+    steady = env.submit("surface", lambda: pause(0.1) or "surfaced", preemptible=False)
+    assert steady.result(1) == "surfaced"
+    chosen = env.submit("swim", lambda: pause(0.1) or "swum")
+    assert chosen.result(1) == "swum"
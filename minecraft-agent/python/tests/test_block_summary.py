@@ -0,0 +1,70 @@
+import math
+import random
+
+import pytest
+
+from capabilities.block_summary import BlockSummarizer, blockClass, direction
+from capabilities.navigation import Navigation
+
+CLASSES = ("water", "log", "iron_ore", "crafting_table")
+NAMES = ("stone", "air", "dirt", "water", "flowing_water", "oak_log", "birch_log", "iron_ore",
+         "deepslate_iron_ore", "crafting_table", "minecraft:oak_log")
+BOUNDS = [[-6, 6], [-3, 3], [-6, 6]]
+
+
+def randomGrid(seed):
+    rng = random.Random(seed)
+    weights = [40, 40, 10] + [1] * (len(NAMES) - 3)
+    names = rng.choices(NAMES, weights, k=13 * 7 * 13)
+    return names, Navigation.parseGrid(names, BOUNDS)
+
+
+def test_block_classes_match_by_suffix():
+    assert blockClass("flowing_water", CLASSES) == 0
+    assert blockClass("minecraft:oak_log", CLASSES) == 1
+    assert blockClass("deepslate_iron_ore", CLASSES) == 2
+    assert blockClass("logs", CLASSES) == -1
+    assert blockClass("iron_ore_block", CLASSES) == -1
+
+
+def test_directions_use_minecraft_compass():
+    assert direction(0, 0, 5) == "south"
+    assert direction(0, 0, -5) == "north"
+    assert direction(5, 0, 0) == "east"
+    assert direction(-5, 0, 0) == "west"
+    assert direction(3, 0, 3) == "southeast"
+    assert direction(0, -2, 0) == "below"
+    assert direction(0, 0, 0) == "here"
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_summary_matches_a_cell_by_cell_count(seed):
+    names, grid = randomGrid(seed)
+    expected = {}
+    i = 0
+    for y in range(BOUNDS[1][0], BOUNDS[1][1] + 1):
+        for z in range(BOUNDS[2][0], BOUNDS[2][1] + 1):
+            for x in range(BOUNDS[0][0], BOUNDS[0][1] + 1):
+                cls = blockClass(names[i], CLASSES)
+                i += 1
+                if cls < 0:
+                    continue
+                count, nearest = expected.get(CLASSES[cls], (0, math.inf))
+                expected[CLASSES[cls]] = (count + 1, min(nearest, math.sqrt(x * x + y * y + z * z)))
+
+    summary = BlockSummarizer(CLASSES).summarize(grid)
+    assert {b["type"]: (b["count"], b["distance"]) for b in summary} == expected
+    assert [b["distance"] for b in summary] == sorted(b["distance"] for b in summary)
+    for block in summary:
+        assert blockClass(grid[tuple(block["position"])], CLASSES) == CLASSES.index(block["type"])
+        assert block["direction"] == direction(*block["position"])
+
+
+def test_summarizer_follows_palette_and_shape_changes():
+    summarizer = BlockSummarizer(CLASSES)
+    first = Navigation.parseGrid(["water"] + ["stone"] * 26, [[-1, 1], [-1, 1], [-1, 1]])
+    second = Navigation.parseGrid(["stone", "oak_log"] + ["air"] * 6, [[0, 1], [0, 1], [0, 1]])
+    assert [b["type"] for b in summarizer.summarize(first)] == ["water"]
+    assert summarizer.summarize(second) == [
+        {"type": "log", "count": 1, "position": [1, 0, 0], "distance": 1.0, "direction": "east"},
+    ]
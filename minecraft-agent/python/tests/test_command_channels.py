@@ -0,0 +1,133 @@
+import threading
+
+from bridge.command_channels import CommandChannels, formatValue
+
+
+class Recorder:
+    def __init__(self):
+        self.commands = []
+
+    def sendCommand(self, command):
+        self.commands.append(command)
+
+
+class Env:
+    def __init__(self):
+        self.rob = Recorder()
+
+
+def makeChannels():
+    env = Env()
+    return CommandChannels(env), env.rob.commands
+
+
+def test_format_value_quantizes():
+    assert formatValue(1.0) == "1"
+    assert formatValue(0.504) == "0.5"
+    assert formatValue("hello") == "hello"
+
+
+def test_repeated_values_are_dropped():
+    channels, sent = makeChannels()
+    channels.set("move", 1)
+    channels.send("move 1")
+    channels.set("move", 1.001)
+    assert sent == ["move 1"]
+    assert channels.dropped == 2
+
+
+def test_batch_sends_final_values_once():
+    channels, sent = makeChannels()
+    with channels.batch():
+        channels.set("move", 1)
+        channels.set("turn", 0.3)
+        channels.set("move", 0.5)
+        assert sent == []
+    assert sorted(sent) == ["move 0.5", "turn 0.3"]
+
+
+def test_other_commands_flush_staged_values_first():
+    channels, sent = makeChannels()
+    with channels.batch():
+        channels.set("move", 1)
+        channels.send("chat hi")
+    assert sent == ["move 1", "chat hi"]
+
+
+def test_batches_are_staged_per_thread():
+    channels, sent = makeChannels()
+    staged = threading.Event()
+    release = threading.Event()
+
+    def other():
+        with channels.batch():
+            channels.set("move", 1)
+            staged.set()
+            release.wait(2)
+
+    thread = threading.Thread(target=other)
+    thread.start()
+    staged.wait(2)
+    # Closing this thread's batch must not send what the other thread staged.
+    with channels.batch():
+        channels.set("turn", 1)
+    assert sent == ["turn 1"]
+    release.set()
+    thread.join(2)
+    assert sent == ["turn 1", "move 1"]
+
+
+def test_takeover_drops_other_threads_and_stops_channels():
+    channels, sent = makeChannels()
+    channels.set("move", 1)
+    inside = threading.Event()
+    done = threading.Event()
+
+    def reflex():
+        with channels.takeover():
+            channels.set("move", -1)
+            inside.set()
+            done.wait(2)
+
+    thread = threading.Thread(target=reflex)
+    thread.start()
+    inside.wait(2)
+    channels.set("move", 0.5)
+    with channels.batch():
+        channels.set("turn", 1)
+    done.set()
+    thread.join(2)
+    assert sent == ["move 1", "move -1", "move 0"]
+    assert channels.suppressed == 2
+
+
+def test_values_staged_before_a_takeover_are_not_sent_during_it():
+    channels, sent = makeChannels()
+    staged = threading.Event()
+    owned = threading.Event()
+
+    def action():
+        with channels.batch():
+            channels.set("move", 1)
+            staged.set()
+            owned.wait(2)
+
+    thread = threading.Thread(target=action)
+    thread.start()
+    staged.wait(2)
+    with channels.takeover():
+        owned.set()
+        thread.join(2)
+    assert "move 1" not in sent
+
+
+def test_takeover_and_reset_forget_sent_values():
+    channels, sent = makeChannels()
+    channels.set("move", 1)
+    channels.reset()
+    channels.set("move", 1)
+    assert sent == ["move 1", "move 1"]
+    with channels.takeover():
+        channels.set("jump", 1)
+    channels.set("jump", 0)
+    assert sent[2:] == ["jump 1", "move 0", "jump 0", "jump 0"]
@@ -0,0 +1,69 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from capabilities.cost_field import (
+    HAZARD_RADIUS, HAZARD_WEIGHT, HOSTILE_RADIUS, WATER_COST, buildCostField, chebyshevDistance, hostilePositions,
+)
+from capabilities.navigation import Navigation
+from fakes import layoutWorld
+from models.type import PlanQuality
+
+
+def withFloor(rows, blocks):
+    # layoutWorld with some floor cells (y = -1) swapped for other blocks, by x/z.
+    grid = layoutWorld(rows)
+    names = [grid.palette[i] for i in grid.ids.reshape(-1)]
+    sx, sz = len(rows[0]), len(rows)
+    for (x, z), name in blocks.items():
+        names[z * sx + x] = name
+    return Navigation.parseGrid(names, [[0, sx - 1], [-1, 2], [0, sz - 1]])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_chebyshev_distance_matches_brute_force(seed):
+    mask = np.random.default_rng(seed).random((5, 7, 9)) < 0.05
+    dist = chebyshevDistance(mask, 3)
+    marked = np.argwhere(mask)
+    for cell in itertools.product(*(range(n) for n in mask.shape)):
+        nearest = min((int(np.abs(marked - cell).max(axis=1).min()) if len(marked) else 4), 4)
+        assert dist[cell] == nearest
+
+
+def test_hazard_cost_falls_off_around_dangerous_blocks():
+    grid = withFloor(["." * 12], {(2, 0): "magma_block"})
+    costs = buildCostField(grid)
+    # Feet level (y = 0 is index 1), along x from the magma block.
+    row = costs[1, 0]
+    assert row[2] == pytest.approx(HAZARD_WEIGHT * HAZARD_RADIUS / (HAZARD_RADIUS + 1))
+    assert list(row[2:2 + HAZARD_RADIUS + 1]) == sorted(row[2:2 + HAZARD_RADIUS + 1], reverse=True)
+    assert row[2 + HAZARD_RADIUS + 1:].max() == 0
+
+
+def test_walking_on_water_costs_extra():
+    grid = withFloor(["." * 5], {(1, 0): "water"})
+    costs = buildCostField(grid)
+    assert costs[1, 0, 1] == WATER_COST
+    assert costs[1, 0, 0] == 0
+
+
+def test_hostile_cost_falls_off_with_distance():
+    grid = layoutWorld(["." * 30])
+    mobs = [{"name": "zombie", "x": 5.5, "y": 0.0, "z": 0.5}, {"name": "pig", "x": 20.5, "y": 0.0, "z": 0.5}]
+    positions = hostilePositions(mobs)
+    assert positions == [(5.5, 0.0, 0.5)]
+    row = buildCostField(grid, positions)[1, 0]
+    assert row[5] > row[7] > row[9] > 0
+    assert row[5 + int(HOSTILE_RADIUS):].max() == 0
+
+
+def test_weighted_plan_walks_around_a_hazard():
+    rows = ["." * 15 for _ in range(9)]
+    grid = withFloor(rows, {(7, z): "magma_block" for z in range(0, 6)})
+    grid.setCosts(buildCostField(grid))
+    start, goal = (2, 0, 2), (12, 0, 2)
+    result = Navigation.plan(start, goal, grid, planner="astar")
+    assert result.quality == PlanQuality.COMPLETE
+    assert not any(x == 7 and z <= 5 for x, _, z in result.path)
+    assert any(z > 5 for _, _, z in result.path)
@@ -0,0 +1,52 @@
+from capabilities.observation import PROFILES, buildObservation, missionGridBounds
+from fakes import makeEnv
+
+
+def test_mission_grid_covers_every_profile():
+    bounds = missionGridBounds()
+    for profile in PROFILES.values():
+        for axis, (lo, hi) in enumerate(profile.bounds or []):
+            assert bounds[axis][0] <= lo and hi <= bounds[axis][1]
+
+
+def test_drowning_profile_is_tall_and_narrow():
+    (x0, x1), (y0, y1), (z0, z1) = PROFILES["drowning"].bounds
+    navigation = PROFILES["navigation"].bounds
+    assert y1 - y0 > navigation[1][1] - navigation[1][0]
+    assert y1 - y0 > max(x1 - x0, z1 - z0)
+
+
+def test_drowning_grid_reaches_the_surface():
+    env = makeEnv()
+    env.setObservationProfile("drowning")
+    frame = env.observe()
+    assert frame.bounds == PROFILES["drowning"].bounds
+    (x0, x1), (y0, y1), (z0, z1) = frame.bounds
+    assert len(frame.get("getNearGrid")) == (x1 - x0 + 1) * (y1 - y0 + 1) * (z1 - z0 + 1)
+
+
+def test_fields_the_profile_did_not_read_keep_their_previous_value():
+    env = makeEnv()
+    env.rob.values["getInventory"] = [{"type": "bread", "quantity": 3}]
+    env.rob.entities = [{"name": "pig", "x": 3.0, "y": 0.0, "z": 1.0, "id": "p1"}]
+    env.mc.stats = {"Food": 7, "WorldTime": 15000}
+    before = buildObservation(env)
+    assert before.hunger == 7.0 and not before.isDay
+
+    env.setObservationProfile("drowning")
+    env.rob.values["getLife"] = 12.0
+    env.mc.stats = {}
+    during = buildObservation(env)
+    assert during.health == 12.0
+    assert during.hunger == before.hunger
+    assert (during.timeOfDay, during.isDay) == (before.timeOfDay, before.isDay)
+    assert during.inventory == [{"item": "bread", "count": 3}]
+    assert [e["type"] for e in during.nearbyEntities] == ["pig"]
+
+
+def test_fields_the_profile_read_are_not_carried_over():
+    env = makeEnv()
+    env.rob.values["getInventory"] = [{"type": "bread", "quantity": 3}]
+    buildObservation(env)
+    env.rob.values["getInventory"] = []
+    assert buildObservation(env).inventory == []
@@ -0,0 +1,69 @@
+import threading
+import time
+
+from fakes import makeEnv
+
+
+def test_post_processing_never_overlaps_between_polls():
+    # observe() polls on the caller's thread when it has to, next to the poller
+    # thread; the tracker and the recorder must still see one frame at a time.
+    env = makeEnv()
+    env.rob.entities = [{"name": "pig", "x": 3.0, "y": 0.0, "z": 1.0, "id": "p1"}]
+    poller = env.poller
+    active = []
+    overlaps = []
+    update = poller.tracker.update
+
+    def slowUpdate(entities, timestamp):
+        active.append(1)
+        overlaps.append(len(active))
+        time.sleep(0.002)
+        update(entities, timestamp)
+        active.pop()
+
+    poller.tracker.update = slowUpdate
+    poller.start()
+    try:
+        threads = [threading.Thread(target=lambda: [poller.poll() for _ in range(20)]) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+    finally:
+        poller.stop()
+    assert max(overlaps) == 1
+    seqs = [frame.seq for frame in poller.frames]
+    assert seqs == sorted(seqs) and len(set(seqs)) == len(seqs)
+    assert poller.latest.seq == seqs[-1]
+    assert list(poller.tracker.tracks) == ["p1"]
+
+
+def test_observe_never_returns_a_frame_from_the_previous_profile():
+    env = makeEnv()
+    poller = env.poller
+    poller.start()
+    try:
+        for i in range(20):
+            name = "drowning" if i % 2 else "navigation"
+            env.setObservationProfile(name)
+            assert env.observe().profile == name
+    finally:
+        poller.stop()
+
+
+def test_wait_for_frame_does_not_poll_without_the_thread():
+    env = makeEnv()
+    assert env.poller.waitForFrame(None, 0.05) is None
+    assert env.rob.ticks == 0
+
+
+def test_death_and_respawn_reset_the_command_channels():
+    env = makeEnv()
+    env.commands.set("move", 1)
+    env.poller.poll()
+    env.rob.values["getLife"] = 0.0
+    env.poller.poll()
+    env.rob.values["getLife"] = 20.0
+    env.poller.poll()
+    env.commands.set("move", 1)
+    assert env.rob.commands == ["move 1", "move 1"]
@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+
+from bridge.observation_recorder import ObservationRecorder, ObservationReplay, ReplayEnvironment
+from models.type import ObservationFrame
+
+BOUNDS = [[-1, 1], [-1, 1], [-1, 1]]
+
+
+def makeFrame(seq, grid=None, entities=None):
+    values = {
+        "getAgentPos": [0.5, 64.0, 0.5, 10.0, 90.0],
+        "getLife": 20.0,
+        "getAir": 300.0,
+        "getOnGround": True,
+        "getNearGrid": grid,
+        "getNearEntities": entities or [],
+    }
+    return ObservationFrame(seq=seq, timestamp=1000.0 + seq, values=values, food=18.0, worldTime=6000,
+                            bounds=BOUNDS if grid else None)
+
+
+def test_frames_round_trip(tmp_path):
+    grid = ["stone"] * 9 + ["air"] * 18
+    recorder = ObservationRecorder(tmp_path, timeStart=1000)
+    recorder.append(makeFrame(1, grid, [{"name": "pig", "x": 1.0, "y": 64.0, "z": 2.0}]))
+    recorder.append(makeFrame(2, list(grid)))
+    recorder.append(makeFrame(3))
+    recorder.close()
+
+    replay = ObservationReplay(tmp_path)
+    assert len(replay) == 3
+    assert len(replay.gridIndex) == 1  # unchanged grids are stored once
+    first = replay.frame(0)
+    assert first.seq == 1 and first.food == 18.0 and first.worldTime == 6000
+    assert first.get("getAgentPos") == [0.5, 64.0, 0.5, 10.0, 90.0]
+    assert first.get("getNearGrid") == grid and first.bounds == BOUNDS
+    assert first.get("getNearEntities") == [{"name": "pig", "x": 1.0, "y": 64.0, "z": 2.0}]
+    assert replay.frame(2).get("getNearGrid") is None
+    assert replay.meta["timeStart"] == 1000
+
+
+def test_concurrent_appends_keep_extras_consistent(tmp_path):
+    recorder = ObservationRecorder(tmp_path)
+
+    def write(base):
+        for i in range(100):
+            seq = base + i
+            recorder.append(makeFrame(seq, entities=[{"name": "pig", "seq": seq}]))
+
+    threads = [threading.Thread(target=write, args=(base,)) for base in (0, 1000, 2000)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    recorder.close()
+
+    replay = ObservationReplay(tmp_path)
+    assert len(replay) == 300
+    for i in range(len(replay)):
+        frame = replay.frame(i)
+        assert frame.get("getNearEntities")[0]["seq"] == frame.seq
+
+
+def test_replay_environment_builds_observations(tmp_path):
+    grid = ["stone"] * 9 + ["air"] * 18
+    recorder = ObservationRecorder(tmp_path)
+    for seq in range(1, 4):
+        recorder.append(makeFrame(seq, grid))
+    recorder.close()
+
+    observations = list(ReplayEnvironment(tmp_path).observations())
+    assert len(observations) == 3
+    assert observations[0].hunger == 18.0
+    assert observations[0].position == (0.5, 64.0, 0.5)
+
+
+def test_empty_recording_raises_a_clear_error(tmp_path):
+    ObservationRecorder(tmp_path).close()
+    env = ReplayEnvironment(tmp_path)
+    assert env.finished
+    with pytest.raises(ValueError, match="no frames"):
+        env.observe()
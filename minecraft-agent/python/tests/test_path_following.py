@@ -0,0 +1,99 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from capabilities.navigation import Navigation
+from capabilities.path_following import PurePursuit, smoothPath, traverse
+from fakes import layoutWorld, randomWorld, standableCells
+from models.type import PlanQuality
+
+step = Navigation.stepTo
+
+
+def completeTrip(seed):
+    rng = random.Random(seed)
+    grid = randomWorld(seed)
+    cells = standableCells(grid)
+    while True:
+        start, goal = rng.sample(cells, 2)
+        result = Navigation.plan(start, goal, grid, planner="astar")
+        if result.quality == PlanQuality.COMPLETE:
+            return grid, start, result.path
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_smoothed_path_walks_the_same_terrain(seed):
+    grid, start, path = completeTrip(seed)
+    waypoints, cells = smoothPath(start, path, grid, step)
+    assert waypoints[-1] == path[-1]
+    assert set(waypoints) <= set(path)
+    assert len(waypoints) <= len(path)
+    assert len(cells) <= len(path)
+    for a, b in zip([start] + cells, cells):
+        assert step(a, b[0] - a[0], b[2] - a[2], grid) == b
+
+
+def test_open_ground_is_smoothed_to_a_straight_line():
+    grid = layoutWorld(["." * 20 for _ in range(20)])
+    start, goal = (1, 0, 1), (15, 0, 8)
+    path = Navigation.plan(start, goal, grid, planner="astar").path
+    waypoints, _ = smoothPath(start, path, grid, step)
+    assert waypoints == [goal]
+
+
+def test_lines_do_not_cut_wall_corners():
+    grid = layoutWorld([
+        "....",
+        ".#..",
+        "....",
+    ])
+    assert traverse((0, 0, 0), (2, 0, 2), grid, step) is None
+    assert traverse((0, 0, 0), (0, 0, 2), grid, step) == [(0, 0, 1), (0, 0, 2)]
+
+
+def test_lines_passing_a_corner_early_still_see_the_walls_after_it():
+    # The line from (1, 7) to (0, 0) runs near the corner at z = 6 but only crosses to
+    # x = 0 at z = 4, through the wall.
+    rows = ["..."] * 8
+    rows[4] = ".#."
+    grid = layoutWorld(rows)
+    assert traverse((1, 0, 7), (0, 0, 0), grid, step) is None
+
+
+def test_shortcuts_avoid_costlier_cells():
+    grid = layoutWorld(["." * 10 for _ in range(10)])
+    costs = np.zeros(grid.shape)
+    costs[1, 2:8, 2:8] = 10.0
+    grid.setCosts(costs)
+    start, goal = (0, 0, 0), (9, 0, 9)
+    path = Navigation.plan(start, goal, grid, planner="astar").path
+    _, cells = smoothPath(start, path, grid, step)
+    assert max(grid.stepCost(c) for c in cells) == 1
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_pure_pursuit_brings_the_agent_to_the_goal(seed):
+    grid, start, path = completeTrip(seed)
+    waypoints, cells = smoothPath(start, path, grid, step)
+    follower = PurePursuit(start, waypoints, cells)
+    x, z, floor = start[0] + 0.5, start[2] + 0.5, start[1]
+    remaining = follower.remaining((x, floor, z))
+    for _ in range(20 * len(path) + 20):
+        # Corners may be cut within the look-ahead, but never through a wall.
+        cell = (math.floor(x), math.floor(z))
+        if cell in follower.heights:
+            floor = follower.heights[cell]
+        else:
+            floor = next(y for y in (floor, floor + 1, floor - 1) if grid.isStandable((cell[0], y, cell[1])))
+        if follower.finished((x, floor, z)):
+            break
+        tx, tz = follower.target((x, floor, z))
+        d = math.hypot(tx - x, tz - z)
+        speed = min(0.2, d)
+        x, z = x + (tx - x) / d * speed, z + (tz - z) / d * speed
+        left = follower.remaining((x, floor, z))
+        assert left <= remaining + 1e-9
+        remaining = left
+    assert follower.finished((x, floor, z))
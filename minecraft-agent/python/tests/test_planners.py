@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+from capabilities.navigation import Navigation
+from capabilities.planners import PLANNERS, ClusterGraph, heuristic
+from fakes import layoutWorld, randomWorld, standableCells
+from models.type import PlanQuality
+
+SEEDS = range(30)
+
+
+def walkable(start, path, grid):
+    cells = [start] + path
+    return all(Navigation.stepTo(a, b[0] - a[0], b[2] - a[2], grid) == b for a, b in zip(cells, cells[1:]))
+
+
+def randomTrip(seed):
+    grid = randomWorld(seed)
+    start, goal = random.Random(seed).sample(standableCells(grid), 2)
+    return grid, start, goal
+
+
+def boxedGoal():
+    rows = ["." * 30 for _ in range(30)]
+    for z in range(18, 23):
+        rows[z] = "." * 18 + ("#####" if z in (18, 22) else "#...#") + "." * 7
+    return layoutWorld(rows), (1, 0, 1), (20, 0, 20)
+
+
+def walledRoom():
+    rows = ["." * 30 for _ in range(30)]
+    for z in range(8):
+        rows[z] = ("#" * 8 if z in (0, 7) else "#......#") + "." * 22
+    return layoutWorld(rows), (2, 0, 2), (25, 0, 25)
+
+
+def deadEnd():
+    rows = ["#" * 30 for _ in range(30)]
+    rows[2] = "#" + "." * 20 + "#" * 9
+    return layoutWorld(rows), (1, 0, 2), (25, 0, 10)
+
+
+@pytest.mark.parametrize("planner", sorted(PLANNERS))
+@pytest.mark.parametrize("layout", [boxedGoal, walledRoom, deadEnd])
+def test_unreachable_goal_gives_a_partial_path_as_close_as_astar(planner, layout):
+    grid, start, goal = layout()
+    reference = Navigation.plan(start, goal, grid, planner="astar")
+    result = Navigation.plan(start, goal, grid, planner=planner)
+    assert result.quality == PlanQuality.PARTIAL
+    assert walkable(start, result.path, grid)
+    assert heuristic(result.path[-1], goal) == heuristic(reference.path[-1], goal)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_jps_paths_are_as_short_as_astar(seed):
+    grid, start, goal = randomTrip(seed)
+    reference = Navigation.plan(start, goal, grid, planner="astar")
+    result = Navigation.plan(start, goal, grid, planner="jps")
+    assert result.quality == reference.quality
+    assert walkable(start, result.path, grid)
+    if reference.quality == PlanQuality.COMPLETE:
+        assert result.path[-1] == goal
+        assert len(result.path) == len(reference.path)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_hpa_reaches_every_goal_astar_reaches(seed):
+    grid, start, goal = randomTrip(seed)
+    reference = Navigation.plan(start, goal, grid, planner="astar")
+    result = Navigation.plan(start, goal, grid, planner="hpa")
+    assert result.quality == reference.quality
+    assert walkable(start, result.path, grid)
+    if reference.quality == PlanQuality.COMPLETE:
+        assert result.path[-1] == goal
+        assert len(reference.path) <= len(result.path) <= 1.5 * len(reference.path)
+
+
+def test_cluster_graph_rebuilds_only_the_clusters_that_changed():
+    rows = ["." * 40 for _ in range(40)]
+    grid = layoutWorld(rows)
+    graph = ClusterGraph(Navigation.stepTo)
+    assert graph.update(grid)
+    assert graph.rebuilt == 16
+
+    rows[15] = "." * 10 + "#" * 10 + "." * 20
+    walled = layoutWorld(rows)
+    assert graph.update(walled)
+    # The changed cluster and the four around it, whose shared borders were rebuilt.
+    assert 1 <= graph.rebuilt <= 5
+
+    fresh = ClusterGraph(Navigation.stepTo)
+    fresh.update(walled)
+    for start, goal in (((15, 0, 5), (15, 0, 25)), ((0, 0, 0), (39, 0, 39))):
+        assert len(graph.search(start, goal).path) == len(fresh.search(start, goal).path)
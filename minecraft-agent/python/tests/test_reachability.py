@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+from capabilities.navigation import Navigation
+from capabilities.reachability import ReachabilityField, fieldFor
+from fakes import layoutWorld, makeEnv, randomWorld, standableCells
+from models.type import PlanQuality
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_distances_match_astar_path_lengths(seed):
+    rng = random.Random(seed)
+    grid = randomWorld(seed)
+    cells = standableCells(grid)
+    start = rng.choice(cells)
+    field = ReachabilityField(grid, start)
+    for goal in rng.sample(cells, 10):
+        result = Navigation.plan(start, goal, grid, planner="astar")
+        if result.quality == PlanQuality.COMPLETE:
+            assert field.distance(goal) == len(result.path)
+        else:
+            assert field.distance(goal) is None
+
+
+def test_points_resolve_to_the_cell_they_stand_on():
+    grid = layoutWorld(["....", ".#..", "...."])
+    field = ReachabilityField(grid, (0, 0, 0))
+    assert field.distance((0, 0, 0)) == 0
+    assert field.distanceToPoint(3.5, 0.0, 2.5) == 5
+    assert field.distanceToPoint(3.5, 0.9, 2.5) == 5
+    assert field.distanceToPoint(1.5, 2.0, 1.5) is None
+    assert field.distance((100, 0, 0)) is None
+
+
+def test_field_is_reused_until_the_agent_moves_or_the_map_changes():
+    env = makeEnv()
+    env.poller.poll()
+    env.worldMap.recordSnapshot(env.rob.getCachedObserve("getNearGrid"), env.grid_bounds, (0, 0, 0))
+    field = fieldFor(env)
+    assert field is not None and fieldFor(env) is field
+
+    env.rob.pos[0] += 1
+    moved = fieldFor(env)
+    assert moved is not field and moved.start == (1, 0, 0)
+
+    env.worldMap.recordSnapshot(env.rob.getCachedObserve("getNearGrid"), env.grid_bounds, (1, 0, 0))
+    assert fieldFor(env) is not moved
@@ -0,0 +1,97 @@
+import threading
+import time
+
+from capabilities.actions import pause
+from capabilities.reflexes import Reflex
+from fakes import makeEnv
+
+ACTION_VALUES = {"move 1", "move 0.5"}
+
+
+def recordOwners(env):
+    # Every command sent, with the thread that held the channels at the time.
+    sent = []
+    send = env.rob.sendCommand
+
+    def record(command):
+        sent.append((command, env.commands._owner))
+        send(command)
+
+    env.rob.sendCommand = record
+    return sent
+
+
+def test_no_action_command_goes_out_while_a_reflex_owns_the_channels():
+    env = makeEnv()
+    sent = recordOwners(env)
+    stop = threading.Event()
+
+    def action():
+        value = 1
+        while not stop.is_set():
+            with env.commands.batch():
+                env.commands.set("move", value)
+                time.sleep(0.001)
+            value = 0.5 if value == 1 else 1
+
+    def respond(env, frame):
+        for i in range(20):
+            with env.commands.batch():
+                env.commands.set("turn", (i % 5 + 1) / 10)
+                time.sleep(0.002)
+        return "done"
+
+    layer = env.reflexes
+    reflex = Reflex("spin", lambda frame, previous: "test", respond, cooldown=0)
+    thread = threading.Thread(target=action)
+    thread.start()
+    try:
+        for _ in range(10):
+            layer.fire(reflex, "test", env.observe())
+    finally:
+        stop.set()
+        thread.join(2)
+
+    owned = [command for command, owner in sent if owner is not None]
+    assert any(command.startswith("turn") for command in owned)
+    assert not ACTION_VALUES & set(owned)
+    # None of the reflexes' own values were lost to the action thread's flushes.
+    assert sum(command.startswith("turn") and command != "turn 0" for command in owned) == 200
+
+
+def test_reflex_cancels_a_preemptible_action_and_is_reported():
+    env = makeEnv()
+    started = threading.Event()
+
+    def longUse():
+        started.set()
+        pause(5)
+        return "Used"
+
+    handle = env.submit("use", longUse, preemptible=True)
+    started.wait(2)
+    env.reflexes.reflexes = (Reflex("backOff", lambda frame, previous: "lava ahead", lambda env, frame: "clear"),)
+    event = env.reflexes.check(env.observe())
+    assert event.name == "backOff" and event.interrupted == "use"
+    handle.wait(2)
+    assert handle.state.name == "CANCELLED"
+    assert env.reflexes.recent(5) == [event]
+    env.scheduler.cancelAll("test over")
+
+
+def test_reflexes_do_not_fire_during_non_preemptible_actions():
+    env = makeEnv()
+    started = threading.Event()
+    release = threading.Event()
+
+    def escape():
+        started.set()
+        release.wait(2)
+        return "Ground Reached"
+
+    handle = env.submit("find_ground", escape, preemptible=False)
+    started.wait(2)
+    env.reflexes.reflexes = (Reflex("surface", lambda frame, previous: "air falling", lambda env, frame: "surfaced"),)
+    assert env.reflexes.check(env.observe()) is None
+    release.set()
+    assert handle.result(2) == "Ground Reached"
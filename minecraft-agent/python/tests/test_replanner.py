@@ -0,0 +1,83 @@
+import random
+
+import numpy as np
+import pytest
+
+from capabilities.navigation import Navigation
+from capabilities.planners import aStarSearch
+from capabilities.replanner import DStarLite
+from capabilities.voxel_grid import VoxelGrid
+from fakes import randomWorld, standableCells
+from models.type import PlanQuality
+
+SEEDS = range(30)
+
+
+def pathCost(path, grid):
+    return sum(grid.stepCost(cell) for cell in path)
+
+
+def freshCost(start, goal, grid):
+    result = aStarSearch(start, goal, grid, Navigation.stepTo)
+    return pathCost(result.path, grid) if result.quality == PlanQuality.COMPLETE else None
+
+
+def plannedTrip(seed):
+    # A random trip A* can complete, with its D* Lite planner.
+    rng = random.Random(seed)
+    grid = randomWorld(seed)
+    cells = standableCells(grid)
+    while True:
+        start, goal = rng.sample(cells, 2)
+        if freshCost(start, goal, grid) is not None:
+            return rng, grid, DStarLite(grid, start, goal, Navigation.stepTo)
+
+
+def walled(grid, cells):
+    # A copy of grid with a two-block stone wall on each of the given floor cells.
+    ids = grid.ids.copy()
+    stone = grid.palette.index("stone")
+    ox, oy, oz = grid.origin
+    for x, y, z in cells:
+        ids[y - oy:y - oy + 2, z - oz, x - ox] = stone
+    return VoxelGrid(ids, grid.palette, grid.origin, grid.passableLut, grid.safeLut)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_initial_plan_costs_the_same_as_astar(seed):
+    _, grid, planner = plannedTrip(seed)
+    path = planner.path()
+    assert path[-1] == planner.goal
+    assert pathCost(path, grid) == freshCost(planner.start, planner.goal, grid)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_repair_after_blocking_the_path_costs_the_same_as_a_fresh_astar(seed):
+    rng, grid, planner = plannedTrip(seed)
+    path = planner.path()
+    # Walk a few steps, then wall off part of what is left.
+    moved = path[min(3, len(path) - 2)] if len(path) > 2 else planner.start
+    planner.updateStart(moved)
+    ahead = path[path.index(moved) + 1:-1] if moved in path else path[:-1]
+    blocked = rng.sample(ahead, min(2, len(ahead)))
+    planner.notifyChanged(grid.assign(walled(grid, blocked)))
+
+    expected = freshCost(moved, planner.goal, grid)
+    repaired = planner.path()
+    if expected is None:
+        assert repaired is None
+    else:
+        assert repaired[-1] == planner.goal
+        assert pathCost(repaired, grid) == expected
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_repair_after_a_cost_change_costs_the_same_as_a_fresh_astar(seed):
+    rng, grid, planner = plannedTrip(seed)
+    costs = np.zeros(grid.shape)
+    for x, y, z in rng.sample(planner.path(), max(1, len(planner.path()) // 3)):
+        ox, oy, oz = grid.origin
+        costs[y - oy, z - oz, x - ox] = rng.choice((2.0, 5.0, 20.0))
+    planner.notifyChanged([], grid.setCosts(costs))
+
+    assert pathCost(planner.path(), grid) == freshCost(planner.start, planner.goal, grid)
@@ -0,0 +1,59 @@
+import random
+
+import numpy as np
+import pytest
+
+from capabilities.navigation import Navigation
+from capabilities.planners import SurfaceMap, surfaceSearch
+from fakes import layoutWorld, randomWorld, standableCells
+from models.type import PlanQuality
+
+
+def pathCost(path, grid):
+    return sum(grid.stepCost(cell) for cell in path)
+
+
+def withBridge(size=20):
+    # Flat ground with a stone slab at y = 3 over x 5..14, z 8..11: the columns under
+    # it have two floors.
+    grid = layoutWorld(["." * size for _ in range(size)])
+    ids = np.concatenate([grid.ids, np.repeat(grid.ids[-1:], 3, axis=0)])
+    stone = grid.palette.index("stone")
+    ids[4, 8:12, 5:15] = stone
+    return Navigation.parseGrid([grid.palette[i] for i in ids.reshape(-1)],
+                                [[0, size - 1], [-1, 5], [0, size - 1]])
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_surface_paths_cost_the_same_as_astar(seed):
+    rng = random.Random(seed)
+    grid = randomWorld(seed)
+    start, goal = rng.sample(standableCells(grid), 2)
+    if seed % 2:
+        noise = np.random.default_rng(seed).random((2,) + grid.shape)
+        grid.setCosts(np.where(noise[0] < 0.7, 0.0, noise[1] * 4))
+    reference = Navigation.plan(start, goal, grid, planner="astar")
+    result = surfaceSearch(start, goal, grid, Navigation.stepTo)
+    assert result.quality == reference.quality
+    if reference.quality == PlanQuality.COMPLETE:
+        assert result.path[-1] == goal
+        assert pathCost(result.path, grid) == pytest.approx(pathCost(reference.path, grid))
+
+
+def test_columns_with_two_floors_are_layered():
+    grid = withBridge()
+    surface = SurfaceMap(grid)
+    assert surface.layered[8, 5] and surface.layered[11, 14]
+    assert not surface.layered[7, 5] and not surface.layered[8, 4]
+    assert surface.column((6, 0, 9)) == -1
+    assert surface.column((6, 0, 2)) >= 0
+
+
+def test_layered_start_falls_back_to_the_3d_planner():
+    grid = withBridge()
+    start, goal = (6, 0, 9), (18, 0, 18)
+    assert SurfaceMap(grid).search(start, goal) is None
+    result = surfaceSearch(start, goal, grid, Navigation.stepTo)
+    reference = Navigation.plan(start, goal, grid, planner="astar")
+    assert result.quality == PlanQuality.COMPLETE
+    assert len(result.path) == len(reference.path)
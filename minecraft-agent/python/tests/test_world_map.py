@@ -0,0 +1,58 @@
+import numpy as np
+
+from capabilities.cost_field import UNKNOWN_COST, buildCostField
+from capabilities.navigation import Navigation
+from capabilities.reachability import ReachabilityField
+from capabilities.world_map import WorldMap
+from models.type import PlanQuality
+
+# Seen from y = -1 to y = 1 only: a stone floor and, across x = 5, a one-block step
+# whose top is at the edge of what was observed. Row z = 0 has a gap in the step.
+BOUNDS = [[0, 9], [-1, 1], [0, 4]]
+
+
+def observedMap(gap=False):
+    names = []
+    for y in range(-1, 2):
+        for z in range(5):
+            for x in range(10):
+                step = x == 5 and y == 0 and not (gap and z == 0)
+                names.append("stone" if y == -1 or step else "air")
+    worldMap = WorldMap()
+    worldMap.recordSnapshot(names, BOUNDS, (0, 0, 0))
+    return worldMap
+
+
+def test_window_marks_never_observed_cells():
+    grid = observedMap().window((0, -1, 0), (9, 3, 4))
+    assert grid.unknown[-1].all() and not grid.unknown[:3].any()
+    # Standing on the step needs headroom nobody has seen yet.
+    assert grid.isStandable((5, 1, 2)) and grid.isAssumed((5, 1, 2))
+    assert grid.isStandable((4, 0, 2)) and not grid.isAssumed((4, 0, 2))
+    # Nothing is assumed where neither the feet nor the floor were seen.
+    assert not grid.standable[4].any()
+
+
+def test_unknown_cells_are_not_treated_as_solid():
+    grid = observedMap().window((0, -1, 0), (9, 3, 4))
+    grid.setCosts(buildCostField(grid))
+    result = Navigation.plan((1, 0, 2), (8, 0, 2), grid, planner="astar")
+    assert result.quality == PlanQuality.COMPLETE
+    assert any(grid.isAssumed(cell) for cell in result.path)
+    assert grid.stepCost((5, 1, 2)) == 1 + UNKNOWN_COST
+
+
+def test_seen_ground_is_preferred_over_assumed_ground():
+    grid = observedMap(gap=True).window((0, -1, 0), (9, 3, 4))
+    grid.setCosts(buildCostField(grid))
+    result = Navigation.plan((1, 0, 1), (8, 0, 1), grid, planner="astar")
+    assert result.quality == PlanQuality.COMPLETE
+    assert not any(grid.isAssumed(cell) for cell in result.path)
+
+
+def test_walking_distances_only_cover_observed_ground():
+    grid = observedMap().window((0, -1, 0), (9, 3, 4))
+    field = ReachabilityField(grid, (1, 0, 2))
+    assert field.distance((4, 0, 2)) == 3
+    assert field.distance((8, 0, 2)) is None
+    assert np.all(field.dist[grid.assumed] < 0)